@@ -0,0 +1,3 @@
+# 性能基准：解析、采样与 st/xy 查询热点路径的可重复计时，
+# 结果以 JSON 输出（吞吐量、p50/p99 延迟、峰值 RSS），并可与保存的基线对比。
+# 用法：python -m benchmarks --help
@@ -0,0 +1,69 @@
+import os
+import sys
+import fnmatch
+import logging
+import argparse
+import tempfile
+from benchmarks import harness, synthetic
+from benchmarks.cases import CASES
+
+# python -m benchmarks [--only 'xy_to_st/*'] [--output results.json] [--baseline baseline.json] [--save-baseline baseline.json]
+
+def add_arguments():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument("--xodr", type=str, default="lv20230504.xodr")
+    parser.add_argument("--tiles", type=int, default=8, help="copies of --xodr in the tiled network")
+    parser.add_argument("--random-roads", type=int, default=500, help="roads in the random line/arc/spiral network")
+    parser.add_argument("--repeat", type=int, default=10, help="timed repetitions per case (single-point cases scale this up)")
+    parser.add_argument("--points", type=int, default=10000, help="query points of the batch cases")
+    parser.add_argument("--only", type=str, default="*", help="glob of case names to run")
+    parser.add_argument("--list", action="store_true", help="list case names and exit")
+    parser.add_argument("--output", type=str, default="", help="write the results as JSON")
+    parser.add_argument("--baseline", type=str, default="", help="compare against a stored results JSON")
+    parser.add_argument("--save-baseline", type=str, default="", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p50 slowdown before a case counts as a regression")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    args = add_arguments()
+    names = [name for name in CASES if fnmatch.fnmatch(name, args.only)]
+    if args.list:
+        print('\n'.join(names))
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory(prefix='py_xodr_bench') as work_dir:
+        config = {
+            'xodr':os.path.abspath(args.xodr),
+            'tiled':synthetic.tile_network(args.xodr, os.path.join(work_dir, 'tiled.xodr'), args.tiles),
+            'random':synthetic.random_network(os.path.join(work_dir, 'random.xodr'), args.random_roads),
+            'repeat':args.repeat,
+            'points':args.points,
+        }
+        results = {}
+        for name in names:
+            results[name] = harness.run_isolated(CASES[name], config)
+            result = results[name]
+            print(f"{name:32s} p50 {result['p50_ms']:10.3f} ms  p99 {result['p99_ms']:10.3f} ms  "
+                  f"{result['throughput']:12.1f} items/s  rss {result['peak_rss_mb']:7.1f} MB", flush=True)
+
+    report = {
+        'environment':harness.environment(),
+        'config':{'xodr':args.xodr, 'tiles':args.tiles, 'random_roads':args.random_roads, 'repeat':args.repeat, 'points':args.points},
+        'results':results,
+    }
+    regressions = []
+    if args.baseline:
+        baseline = harness.load_json(args.baseline)
+        if baseline.get('config') != report['config']:
+            logging.warning(f"baseline was recorded with {baseline.get('config')}, timings may not be comparable")
+        report['comparison'] = harness.compare(results, baseline, args.tolerance)
+        for name, comparison in report['comparison'].items():
+            print(f"{name:32s} {comparison['p50_ratio']:6.2f}x baseline{'  REGRESSION' if comparison['regression'] else ''}")
+            if comparison['regression']:
+                regressions.append(name)
+    if args.output:
+        harness.write_json(args.output, report)
+    if args.save_baseline:
+        harness.write_json(args.save_baseline, report)
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,340 @@
+import os
+import re
+import time
+import asyncio
+import tempfile
+import numpy as np
+import constants
+import geometry_math
+import road_network
+import map_server
+import map_client
+from benchmarks.harness import measure, summarize
+
+# 基准用例：case(config) -> measure() 结果（可附加精度等字段）。
+# config 键：xodr（样例地图），tiled（平铺地图），random（随机螺旋路网），repeat，points
+
+CASES = {}
+
+def case(name:str):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+def _parsed(xodr_file:str) -> road_network.RoadNetwork:
+    network = road_network.RoadNetwork(xodr_file)
+    if network.parse_xodr() != constants.ErrorCode.OK:
+        raise RuntimeError(f'failed to parse {xodr_file}')
+    return network
+
+def _parse(xodr_file:str, repeat:int, workers:int=1) -> dict:
+    network = _parsed(xodr_file)
+    result = measure(lambda: road_network.RoadNetwork(xodr_file, workers=workers).parse_xodr(), repeat, items=len(network.odr_doc['roads']))
+    result['roads'] = len(network.odr_doc['roads'])
+    return result
+
+def _sample(xodr_file:str, repeat:int, max_error:float=None) -> dict:
+    network = _parsed(xodr_file)
+    result = measure(lambda: network.sample_roads(plot=False, max_error=max_error), repeat, items=len(network.odr_doc['roads']))
+    result['points'] = sum(len(samples.s) for samples in network.road_samples.values())
+    result['max_chord_error'] = network.sample_error
+    return result
+
+@case('parse_xodr/map')
+def parse_map(config:dict) -> dict:
+    return _parse(config['xodr'], config['repeat'])
+
+@case('parse_xodr/tiled')
+def parse_tiled(config:dict) -> dict:
+    return _parse(config['tiled'], max(config['repeat'] // 2, 1))
+
+@case('parse_xodr/tiled_workers2')
+def parse_tiled_workers2(config:dict) -> dict:
+    return _parse(config['tiled'], max(config['repeat'] // 2, 1), workers=2)
+
+@case('parse_xodr/tiled_workers4')
+def parse_tiled_workers4(config:dict) -> dict:
+    return _parse(config['tiled'], max(config['repeat'] // 2, 1), workers=4)
+
+@case('parse_xodr/random')
+def parse_random(config:dict) -> dict:
+    return _parse(config['random'], config['repeat'])
+
+@case('parse_xodr/tiled_lazy')
+def parse_tiled_lazy(config:dict) -> dict:
+    # startup of the on-demand loader plus one locate, which materializes only the roads near the point
+    def load():
+        network = road_network.RoadNetwork(config['tiled'])
+        network.parse_xodr(lazy=True)
+        network.locate(0.0, 0.0, 50.0)
+        return network
+    network = load()
+    result = measure(load, config['repeat'], items=len(network.odr_doc['roads']))
+    result['roads'] = len(network.odr_doc['roads'])
+    result['materialized'] = network.lazy_roads.materialized_count
+    return result
+
+@case('sample_roads/map')
+def sample_map(config:dict) -> dict:
+    return _sample(config['xodr'], config['repeat'])
+
+@case('sample_roads/map_adaptive')
+def sample_map_adaptive(config:dict) -> dict:
+    return _sample(config['xodr'], config['repeat'], max_error=0.01)
+
+@case('sample_roads/tiled')
+def sample_tiled(config:dict) -> dict:
+    return _sample(config['tiled'], max(config['repeat'] // 2, 1))
+
+@case('sample_roads/random')
+def sample_random(config:dict) -> dict:
+    return _sample(config['random'], config['repeat'])
+
+def _random_chain(rng, n:int=20):
+    geoms = [{'type':'line', 'x0':0.0, 'y0':0.0, 'hdg0':0.3, 'length':rng.uniform(20.0, 100.0)}]
+    curvature = 0.0
+    for _ in range(n - 1):
+        kind = rng.choice(('line', 'arc', 'spiral'))
+        length = rng.uniform(20.0, 100.0)
+        if kind == 'line':
+            geoms.append({'type':'line', 'length':length})
+            curvature = 0.0
+        elif kind == 'arc':
+            curvature = rng.uniform(-0.02, 0.02)
+            geoms.append({'type':'arc', 'curvature':curvature, 'length':length})
+        else:
+            curv_end = rng.uniform(-0.02, 0.02)
+            geoms.append({'type':'spiral', 'curv_start':curvature, 'curv_end':curv_end, 'length':length})
+            curvature = curv_end
+    return geometry_math.build_road_geometries(geoms)
+
+@case('st_to_xy_multi/scalar')
+def st_to_xy_multi(config:dict) -> dict:
+    # latency of single-point calls on a 20-segment chain
+    rng = np.random.default_rng(0)
+    road_geoms = _random_chain(rng)
+    total_length = road_geoms[-1]['s0'] + road_geoms[-1]['length']
+    s = iter(np.tile(rng.uniform(0.0, total_length, 1000), 1000))
+    return measure(lambda: geometry_math.st_to_xy_multi(next(s), 1.0, road_geoms), config['repeat'] * 100, warmup=10)
+
+@case('reference_line/evaluate')
+def reference_line_evaluate(config:dict) -> dict:
+    rng = np.random.default_rng(0)
+    reference_line = geometry_math.ReferenceLine.from_road_geoms(_random_chain(rng))
+    s = rng.uniform(0.0, reference_line.total_length, config['points'] * 10)
+    return measure(lambda: reference_line.evaluate(s, 1.0), config['repeat'], items=len(s))
+
+def _query_points(rng, pose_fn, length:float, n:int):
+    s_true = rng.uniform(0.0, length, n)
+    x, y, hdg = pose_fn(s_true)
+    t_true = rng.uniform(-5.0, 5.0, n)
+    x, y = geometry_math.apply_t_offset(x, y, hdg, t_true)
+    return s_true, x, y
+
+def _projection(config:dict, pose_fn, project_fn, length:float) -> dict:
+    rng = np.random.default_rng(0)
+    s_true, x, y = _query_points(rng, pose_fn, length, config['points'])
+    result = measure(lambda: project_fn(x, y), config['repeat'], items=len(x))
+    result['max_ds'] = float(np.abs(project_fn(x, y)[0] - s_true).max())
+    return result
+
+@case('xy_to_st/line_batch')
+def xy_to_st_line(config:dict) -> dict:
+    return _projection(config, lambda s: geometry_math.line_pose(s, 0.0, 0.0, 0.3),
+                       lambda x, y: geometry_math.xy_to_st_line_batch(x, y, 0.0, 0.0, 0.3, 120.0), 120.0)
+
+@case('xy_to_st/arc_batch')
+def xy_to_st_arc(config:dict) -> dict:
+    return _projection(config, lambda s: geometry_math.arc_pose(s, 0.0, 0.0, 0.3, 0.02),
+                       lambda x, y: geometry_math.xy_to_st_arc_batch(x, y, 0.0, 0.0, 0.3, 0.02, 120.0), 120.0)
+
+SPIRAL = (0.0, 0.0, 0.3, 120.0, 0.0, 0.02) # x0, y0, hdg0, length, curv_start, curv_end
+
+@case('xy_to_st/spiral_batch')
+def xy_to_st_spiral_batch(config:dict) -> dict:
+    return _projection(config, lambda s: geometry_math.spiral_pose(s, *SPIRAL),
+                       lambda x, y: geometry_math.xy_to_st_spiral_batch(x, y, *SPIRAL), SPIRAL[3])
+
+@case('xy_to_st/spiral_scalar')
+def xy_to_st_spiral_scalar(config:dict) -> dict:
+    # per-point latency of the table + Newton projector
+    rng = np.random.default_rng(0)
+    s_true, x, y = _query_points(rng, lambda s: geometry_math.spiral_pose(s, *SPIRAL), SPIRAL[3], 1000)
+    points = iter(np.tile(np.arange(len(x)), 1000))
+    project_one = lambda i: geometry_math.xy_to_st_spiral(x[i], y[i], *SPIRAL)
+    result = measure(lambda: project_one(next(points)), config['repeat'] * 100, warmup=10)
+    result['max_ds'] = float(max(abs(geometry_math.xy_to_st_spiral(x[i], y[i], *SPIRAL)[0] - s_true[i]) for i in range(len(x))))
+    return result
+
+@case('xy_to_st/spiral_reference')
+def xy_to_st_spiral_reference(config:dict) -> dict:
+    # the minimize_scalar implementation the projector replaced, kept as the accuracy and speed reference
+    rng = np.random.default_rng(0)
+    s_true, x, y = _query_points(rng, lambda s: geometry_math.spiral_pose(s, *SPIRAL), SPIRAL[3], 200)
+    points = iter(np.tile(np.arange(len(x)), 100))
+    project_one = lambda i: geometry_math.xy_to_st_spiral_reference(x[i], y[i], *SPIRAL)
+    result = measure(lambda: project_one(next(points)), config['repeat'] * 10)
+    result['max_ds'] = float(max(abs(geometry_math.xy_to_st_spiral_reference(x[i], y[i], *SPIRAL)[0] - s_true[i]) for i in range(len(x))))
+    return result
+
+@case('xy_to_st/multi_batch')
+def xy_to_st_multi(config:dict) -> dict:
+    rng = np.random.default_rng(0)
+    road_geoms = _random_chain(rng)
+    reference_line = geometry_math.ReferenceLine.from_road_geoms(road_geoms)
+    _, x, y = _query_points(rng, lambda s: reference_line.evaluate(s)[:3], reference_line.total_length, config['points'])
+    return measure(lambda: geometry_math.xy_to_st_multi(x, y, road_geoms), config['repeat'], items=len(x))
+
+@case('locate_lanes/map')
+def locate_lanes(config:dict) -> dict:
+    # world points scattered around the reference lines of all roads -> road, lane, s, t;
+    # target p50 < 150 ms for the default 10^4 points on one core
+    network = _parsed(config['xodr'])
+    rng = np.random.default_rng(0)
+    table = network.geometry_table()
+    j = rng.integers(0, len(table), config['points'])
+    s_local = rng.uniform(0.0, 1.0, len(j)) * table.length[j]
+    xy = np.array([table.pose(int(g), s)[:2] for g, s in zip(j, s_local)]).reshape(-1, 2)
+    xy += rng.normal(0.0, 4.0, xy.shape)
+    network.locate_lanes(xy[:100], max_dist=20.0) # builds the spatial index
+    result = measure(lambda: network.locate_lanes(xy, max_dist=20.0), config['repeat'], items=len(xy))
+    result['assigned'] = float(np.mean(network.locate_lanes(xy, max_dist=20.0).lane_id != 0))
+    return result
+
+@case('route/map')
+def route(config:dict) -> dict:
+    # uncached lane-level A* between random reachable pairs
+    network = _parsed(config['xodr'])
+    graph = network.routing_graph()
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, len(graph.node_road), (1000, 2))
+    pairs = iter(np.tile(pairs, (100, 1)))
+    return measure(lambda: graph._astar(*(int(v) for v in next(pairs))), config['repeat'] * 10, warmup=10)
+
+@case('server/locate_concurrent')
+def server_locate(config:dict) -> dict:
+    # single-point locate requests from 32 concurrent clients over a Unix socket, coalesced by the server
+    network = _parsed(config['xodr'])
+    rng = np.random.default_rng(0)
+    table = network.geometry_table()
+    j = rng.integers(0, len(table), config['points'])
+    xy = np.array([table.pose(int(g), rng.uniform(0.0, table.length[g]))[:2] for g in j]).reshape(-1, 2)
+    xy += rng.normal(0.0, 4.0, xy.shape)
+
+    async def run() -> dict:
+        with tempfile.TemporaryDirectory(prefix='py_xodr_server') as work_dir:
+            path = os.path.join(work_dir, 'map.sock')
+            server = await map_server.MapServer(network).start(unix_path=path)
+            clients = [await map_client.AsyncMapClient.connect(unix_path=path) for _ in range(32)]
+            loop = asyncio.get_running_loop()
+            timings = []
+            for _ in range(config['repeat'] + 1):
+                start = loop.time()
+                await asyncio.gather(*[clients[i % len(clients)].locate(float(x), float(y), 20.0) for i, (x, y) in enumerate(xy)])
+                timings.append(loop.time() - start)
+            stats = await clients[0].stats()
+            for client in clients:
+                await client.close()
+            await server.close()
+            return timings[1:], stats
+
+    timings, stats = asyncio.run(run())
+    result = summarize(timings, items=len(xy))
+    result['mean_batch'] = stats['mean_batch']
+    return result
+
+@case('render/tiles')
+def render_tiles(config:dict) -> dict:
+    # rasterize every occupied tile of zooms 0..6 of the tiled map, no image encoding
+    network = _parsed(config['tiled'])
+    network.sample_roads(max_error=0.01)
+    renderer = network.renderer()
+    tiles = [(zoom, tx, ty) for zoom in range(7) for tx, ty in renderer.occupied_tiles(zoom)]
+    result = measure(lambda: [renderer.render_tile(*tile) for tile in tiles], max(config['repeat'] // 2, 1), items=len(tiles))
+    result['tiles'] = len(tiles)
+    return result
+
+@case('objects/within_radius')
+def objects_within_radius(config:dict) -> dict:
+    # one simulator tick: radius checks of many agents against the road object outlines
+    index = _parsed(config['xodr']).object_index()
+    rng = np.random.default_rng(0)
+    centers = 0.5*(index.boxes[:, :2] + index.boxes[:, 2:])
+    xy = centers[rng.integers(0, len(centers), config['points'])] + rng.normal(0.0, 10.0, (config['points'], 2))
+    result = measure(lambda: index.within_radius_batch(xy[:, 0], xy[:, 1], 3.0), config['repeat'], items=len(xy))
+    result['pairs'] = len(index.within_radius_batch(xy[:, 0], xy[:, 1], 3.0)[0])
+    return result
+
+@case('objects/segment_intersect')
+def objects_segment_intersect(config:dict) -> dict:
+    # one tick of swept motion segments (about 1 m each) against the road object outlines
+    index = _parsed(config['xodr']).object_index()
+    rng = np.random.default_rng(0)
+    centers = 0.5*(index.boxes[:, :2] + index.boxes[:, 2:])
+    start = centers[rng.integers(0, len(centers), config['points'])] + rng.normal(0.0, 10.0, (config['points'], 2))
+    end = start + rng.normal(0.0, 1.0, start.shape)
+    result = measure(lambda: index.intersect_segments_batch(start[:, 0], start[:, 1], end[:, 0], end[:, 1]), config['repeat'], items=len(start))
+    result['hits'] = len(index.intersect_segments_batch(start[:, 0], start[:, 1], end[:, 0], end[:, 1])[0])
+    return result
+
+@case('geo/lonlat_roundtrip')
+def geo_lonlat_roundtrip(config:dict) -> dict:
+    # local xy -> WGS84 -> local xy of every sample of the map, one batch each way
+    network = _parsed(config['xodr'])
+    network.sample_roads()
+    transform = network.geo_transform()
+    x = np.concatenate([samples.x for samples in network.road_samples.values()])
+    y = np.concatenate([samples.y for samples in network.road_samples.values()])
+    result = measure(lambda: transform.from_lonlat(*transform.to_lonlat(x, y)), config['repeat'], items=len(x))
+    x2, y2 = transform.from_lonlat(*transform.to_lonlat(x, y))
+    result['max_error_m'] = float(max(np.abs(x2 - x).max(), np.abs(y2 - y).max()))
+    result['backend'] = transform.backend
+    return result
+
+@case('reload/one_road')
+def reload_one_road(config:dict) -> dict:
+    # edit one road of the tiled map and reload a sampled, indexed, routed network, against loading it from scratch
+    with open(config['tiled'], 'rb') as f:
+        data = f.read()
+    start = data.index(b'<geometry')
+    heading = re.compile(rb'hdg="([^"]*)"').search(data, start)
+    edited = data[:heading.start(1)] + repr(float(heading.group(1)) + 1e-3).encode() + data[heading.end(1):]
+
+    def load(path:str, track_changes:bool) -> road_network.RoadNetwork:
+        network = road_network.RoadNetwork(path, track_changes=track_changes)
+        network.parse_xodr()
+        network.sample_roads()
+        network.build_spatial_index()
+        network.routing_graph()
+        return network
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, 'edited.xodr')
+        with open(path, 'wb') as f:
+            f.write(data)
+        network = load(path, True)
+        timings = []
+        for i in range(config['repeat'] + 1):
+            with open(path, 'wb') as f:
+                f.write(edited if i % 2 == 0 else data)
+            t0 = time.perf_counter()
+            report = network.reload()
+            if i > 0: # the first reload warms up
+                timings.append(time.perf_counter() - t0)
+        result = summarize(timings, items=len(report.changed_roads))
+        result['roads'] = len(network.odr_doc['roads'])
+        result['full'] = report.full
+        result['full_load_p50_ms'] = measure(lambda: load(path, False), max(config['repeat'] // 4, 1), warmup=0)['p50_ms']
+    return result
+
+@case('validate/tiled')
+def validate_tiled(config:dict) -> dict:
+    # whole-network continuity check as run in CI; the geometry table is built before timing
+    network = _parsed(config['tiled'])
+    network.geometry_table()
+    issues = network.validate()
+    result = measure(network.validate, config['repeat'], items=len(network.odr_doc['roads']))
+    result['roads'] = len(network.odr_doc['roads'])
+    result['issues'] = len(issues)
+    return result
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# 计时与结果对比。每个用例在独立的 spawn 子进程中运行，峰值 RSS 只反映该用例本身
+
+def measure(fn, repeat:int, warmup:int=1, items:int=1) -> dict:
+    # wall time of repeat calls of fn(); items is the work done per call (points, roads, ...)
+    for _ in range(warmup):
+        fn()
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - start
+    return summarize(timings, items)
+
+def summarize(timings, items:int=1) -> dict:
+    # statistics of already measured wall times in seconds, e.g. ones taken inside an event loop
+    timings = np.asarray(timings, dtype=np.float64)
+    p50 = float(np.percentile(timings, 50))
+    return {
+        'repeat':len(timings),
+        'items':items,
+        'p50_ms':p50 * 1e3,
+        'p99_ms':float(np.percentile(timings, 99)) * 1e3,
+        'mean_ms':float(timings.mean()) * 1e3,
+        'throughput':items / p50 if p50 > 0 else float('inf'), # items per second at the median
+    }
+
+def peak_rss_mb() -> float:
+    # VmHWM restarts at exec, ru_maxrss carries over the parent's peak into spawned children on Linux
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1 << 20) if sys.platform == 'darwin' else rss / 1024.0
+
+def _run_case(case, config:dict) -> dict:
+    result = case(config)
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_isolated(case, config:dict) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_run_case, case, config).result()
+
+def environment() -> dict:
+    import scipy
+    return {
+        'timestamp':time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python':platform.python_version(),
+        'numpy':np.__version__,
+        'scipy':scipy.__version__,
+        'platform':platform.platform(),
+        'cpu_count':os.cpu_count(),
+    }
+
+def compare(results:dict, baseline:dict, tolerance:float) -> dict:
+    # per case: p50 and peak RSS ratios against the baseline, a regression when p50 grows beyond tolerance
+    comparison = {}
+    for name, result in results.items():
+        reference = baseline.get('results', {}).get(name)
+        if reference is None:
+            continue
+        ratio = result['p50_ms'] / reference['p50_ms'] if reference['p50_ms'] > 0 else float('inf')
+        comparison[name] = {
+            'baseline_p50_ms':reference['p50_ms'],
+            'p50_ratio':ratio,
+            'rss_ratio':result['peak_rss_mb'] / reference['peak_rss_mb'] if reference.get('peak_rss_mb') else None,
+            'regression':ratio > 1.0 + tolerance,
+        }
+    return comparison
+
+def load_json(path:str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def write_json(path:str, data:dict):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
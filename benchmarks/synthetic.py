@@ -0,0 +1,80 @@
+import copy
+import numpy as np
+from lxml import etree
+import geometry_math
+
+# 合成大规模路网：样例地图平铺 N 份，或随机 line/arc/spiral 链组成的道路
+
+def tile_network(xodr_file:str, out_file:str, n_tiles:int, gap:float=100.0) -> str:
+    # n_tiles copies of xodr_file side by side along x, ids suffixed with the copy index
+    tree = etree.parse(xodr_file)
+    root = tree.getroot()
+    roads = root.findall('road')
+    junctions = root.findall('junction')
+    xs = [float(g.get('x', '0')) for road in roads for g in road.iter('geometry')]
+    dx = (max(xs) - min(xs) if xs else 0.0) + gap
+    for element in roads + junctions:
+        root.remove(element)
+    for k in range(n_tiles):
+        suffix = f'_{k}' if k > 0 else ''
+        for road in roads:
+            road = copy.deepcopy(road)
+            road.set('id', road.get('id') + suffix)
+            if road.get('junction', '-1') != '-1':
+                road.set('junction', road.get('junction') + suffix)
+            for end in road.findall('link/predecessor') + road.findall('link/successor'):
+                end.set('elementId', end.get('elementId', '') + suffix)
+            for geometry in road.iter('geometry'):
+                geometry.set('x', repr(float(geometry.get('x', '0')) + k * dx))
+            root.append(road)
+        for junction in junctions:
+            junction = copy.deepcopy(junction)
+            junction.set('id', junction.get('id') + suffix)
+            for connection in junction.findall('connection'):
+                for name in ('incomingRoad', 'connectingRoad'):
+                    connection.set(name, connection.get(name, '') + suffix)
+            root.append(junction)
+    tree.write(out_file, xml_declaration=True, encoding='UTF-8')
+    return out_file
+
+def random_network(out_file:str, n_roads:int, geometries_per_road:int=6, seed:int=0) -> str:
+    # roads made of continuous random line/arc/spiral chains with one driving lane per side
+    rng = np.random.default_rng(seed)
+    root = etree.Element('OpenDRIVE')
+    etree.SubElement(root, 'header', revMajor='1', revMinor='6', name='synthetic')
+    side = int(np.ceil(np.sqrt(n_roads)))
+    for i in range(n_roads):
+        x, y, hdg = (i % side) * 1000.0, (i // side) * 1000.0, rng.uniform(-np.pi, np.pi)
+        s = 0.0
+        curvature = 0.0
+        road = etree.Element('road', id=str(i), name=f'synthetic {i}', junction='-1')
+        plan_view = etree.SubElement(road, 'planView')
+        for _ in range(geometries_per_road):
+            length = rng.uniform(20.0, 120.0)
+            kind = rng.choice(('line', 'arc', 'spiral'))
+            geometry = etree.SubElement(plan_view, 'geometry', s=repr(s), x=repr(float(x)), y=repr(float(y)),
+                                        hdg=repr(float(hdg)), length=repr(length))
+            if kind == 'line':
+                etree.SubElement(geometry, 'line')
+                x, y, hdg = (float(v[0]) for v in geometry_math.line_pose(np.array([length]), x, y, hdg))
+                curvature = 0.0
+            elif kind == 'arc':
+                curvature = rng.uniform(-0.02, 0.02)
+                etree.SubElement(geometry, 'arc', curvature=repr(curvature))
+                x, y, hdg = (float(v[0]) for v in geometry_math.arc_pose(np.array([length]), x, y, hdg, curvature))
+            else:
+                curv_end = rng.uniform(-0.02, 0.02)
+                etree.SubElement(geometry, 'spiral', curvStart=repr(curvature), curvEnd=repr(curv_end))
+                x, y, hdg = (float(v[0]) for v in geometry_math.spiral_pose(np.array([length]), x, y, hdg, length, curvature, curv_end))
+                curvature = curv_end
+            s += length
+        road.set('length', repr(s))
+        lanes = etree.SubElement(road, 'lanes')
+        section = etree.SubElement(lanes, 'laneSection', s='0')
+        for group, lane_id in (('left', 1), ('center', 0), ('right', -1)):
+            lane = etree.SubElement(etree.SubElement(section, group), 'lane', id=str(lane_id), type='driving' if lane_id else 'none')
+            if lane_id:
+                etree.SubElement(lane, 'width', sOffset='0', a='3.5', b='0', c='0', d='0')
+        root.append(road)
+    etree.ElementTree(root).write(out_file, xml_declaration=True, encoding='UTF-8')
+    return out_file
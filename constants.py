@@ -1,6 +1,7 @@
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import List
+import numpy as np
 
 @dataclass
 class Point3d:
@@ -31,12 +32,18 @@ class Header:
     west:float=0.0
     vendor:str=""
     gepreference_text:str=""
+    # <offset> of the projected coordinates (OpenDRIVE 1.6): projected = R(offset_hdg) * local + (offset_x, offset_y)
+    offset_x:float=0.0
+    offset_y:float=0.0
+    offset_z:float=0.0
+    offset_hdg:float=0.0
 
 class LineType(Enum):
     LINE_STRAIGHT = 0
     CIRCULAR_ARC = 1
     SPIRAL = 2
     POLY3 = 3
+    PARAM_POLY3 = 4
 
 @dataclass
 class Line_Straight:
@@ -58,6 +65,18 @@ class Line_Poly3:
 class Line_Arc:
     curvature:float=0.0
 
+@dataclass
+class Line_ParamPoly3:
+    aU:float=0.0
+    bU:float=0.0
+    cU:float=0.0
+    dU:float=0.0
+    aV:float=0.0
+    bV:float=0.0
+    cV:float=0.0
+    dV:float=0.0
+    pRange:str="normalized" # "normalized": p in [0, 1], "arcLength": p in [0, length]
+
 @dataclass
 class Geometry:
     ref_line_type:LineType=LineType.LINE_STRAIGHT
@@ -66,17 +85,68 @@ class Geometry:
     y:float=0.0 # y coordinate
     hdg:float=0.0 # heading
     length:float=0.0 # length
-    refline_sample_points:List[Point3d]=field(default_factory=list) # sample points
 
     straight:Line_Straight=field(default_factory=Line_Straight) # straight parameters
     spiral:Line_Spiral=field(default_factory=Line_Spiral) # spiral parameters
     poly3:Line_Poly3=field(default_factory=Line_Poly3) # poly3 parameters
+    param_poly3:Line_ParamPoly3=field(default_factory=Line_ParamPoly3) # paramPoly3 parameters
     arc:Line_Arc=field(default_factory=Line_Arc) # arc parameters
     
 @dataclass
 class PlanView:
     geometry_list:List[Geometry]=field(default_factory=list) # geometry list
 
+@dataclass
+class LaneSection:
+    s:float=0.0
+    single_side:bool=False
+    lane_ids:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=np.int32)) # sorted descending, left > 0 > right
+    lane_types:List[str]=field(default_factory=list)
+    # width records of lane_ids[k] are rows [width_offsets[k], width_offsets[k+1]) of width_coeffs
+    width_offsets:np.ndarray=field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    width_coeffs:np.ndarray=field(default_factory=lambda: np.zeros((0, 5))) # sOffset, a, b, c, d
+    # lane <link> targets aligned with lane_ids, 0 where the lane has no predecessor/successor
+    lane_predecessors:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    lane_successors:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+
+@dataclass
+class Lanes:
+    lane_offset:np.ndarray=field(default_factory=lambda: np.zeros((0, 5))) # s, a, b, c, d
+    sections:List[LaneSection]=field(default_factory=list)
+
+@dataclass
+class ElevationProfile:
+    elevation:np.ndarray=field(default_factory=lambda: np.zeros((0, 5))) # s, a, b, c, d
+
+@dataclass
+class LateralProfile:
+    superelevation:np.ndarray=field(default_factory=lambda: np.zeros((0, 5))) # s, a, b, c, d, roll angle in rad
+    shape:np.ndarray=field(default_factory=lambda: np.zeros((0, 6))) # s, t, a, b, c, d sorted by s then t
+
+@dataclass
+class RoadLinkEnd:
+    element_type:str="" # "road" or "junction", empty when there is no link
+    element_id:str=""
+    contact_point:str=""
+
+@dataclass
+class RoadLink:
+    predecessor:RoadLinkEnd=field(default_factory=RoadLinkEnd)
+    successor:RoadLinkEnd=field(default_factory=RoadLinkEnd)
+
+@dataclass
+class RoadObjects:
+    # <objects> of one road, one entry per object; outline corners of object i are rows [corner_offsets[i], corner_offsets[i+1])
+    ids:List[str]=field(default_factory=list)
+    names:List[str]=field(default_factory=list)
+    types:List[str]=field(default_factory=list)
+    orientations:List[str]=field(default_factory=list)
+    # s, t, zOffset, hdg (relative to the road), width, length, radius, height; missing values are 0
+    params:np.ndarray=field(default_factory=lambda: np.zeros((0, 8)))
+    corner_offsets:np.ndarray=field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    corners:np.ndarray=field(default_factory=lambda: np.zeros((0, 3))) # u, v, z of cornerLocal or s, t, dz of cornerRoad
+    corner_road:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=bool)) # per object, True for cornerRoad outlines
+
 @dataclass
 class Road:
     id:str = ""
@@ -85,8 +155,57 @@ class Road:
     junction_id:str = ""
     type:str = ""
     planview:PlanView = field(default_factory=PlanView)
-    elevationProfile:dict = field(default_factory=dict)
-    lateralProfile:dict = field(default_factory=dict)
+    elevationProfile:ElevationProfile = field(default_factory=ElevationProfile)
+    lateralProfile:LateralProfile = field(default_factory=LateralProfile)
+    lanes:Lanes = field(default_factory=Lanes)
+    link:RoadLink = field(default_factory=RoadLink)
+    objects:RoadObjects = field(default_factory=RoadObjects)
+
+@dataclass
+class RoadSamples:
+    road_id:str=""
+    s:np.ndarray=field(default_factory=lambda: np.empty(0)) # road s of each sample
+    x:np.ndarray=field(default_factory=lambda: np.empty(0))
+    y:np.ndarray=field(default_factory=lambda: np.empty(0))
+    hdg:np.ndarray=field(default_factory=lambda: np.empty(0))
+    z:np.ndarray=field(default_factory=lambda: np.empty(0)) # reference line elevation
+    roll:np.ndarray=field(default_factory=lambda: np.empty(0)) # superelevation
+    geometry_offsets:np.ndarray=field(default_factory=lambda: np.zeros(1, dtype=np.int64)) # samples of geometry i are [offsets[i], offsets[i+1])
+    max_chord_error:float=0.0 # largest sagitta between consecutive samples of one geometry
+
+@dataclass
+class SectionBoundaries:
+    s0:float=0.0 # section start
+    lane_ids:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=np.int32)) # same order as LaneSection.lane_ids
+    s:np.ndarray=field(default_factory=lambda: np.empty(0)) # road s of the samples in this section
+    # (n_lanes, n_samples): row k is the outer boundary of lane_ids[k], lane 0 is the offset center line
+    t:np.ndarray=field(default_factory=lambda: np.zeros((0, 0)))
+    x:np.ndarray=field(default_factory=lambda: np.zeros((0, 0)))
+    y:np.ndarray=field(default_factory=lambda: np.zeros((0, 0)))
+
+@dataclass
+class LaneBoundaries:
+    road_id:str=""
+    sections:List[SectionBoundaries]=field(default_factory=list)
+
+@dataclass
+class LanePositions:
+    # one entry per query point; road_index -1 when no road is within range, lane_id 0 when outside every lane
+    road_index:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    road_id:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=object))
+    section:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    lane_id:np.ndarray=field(default_factory=lambda: np.zeros(0, dtype=np.int32))
+    s:np.ndarray=field(default_factory=lambda: np.empty(0))
+    t:np.ndarray=field(default_factory=lambda: np.empty(0))
+    dist:np.ndarray=field(default_factory=lambda: np.empty(0))
+
+@dataclass
+class Route:
+    # lane-level route, one entry per traversed (road, lane section, lane)
+    road_ids:List[str]=field(default_factory=list)
+    sections:List[int]=field(default_factory=list)
+    lane_ids:List[int]=field(default_factory=list)
+    length:float=0.0
 
 @dataclass
 class LaneLink:
@@ -107,4 +226,26 @@ class Junction:
     id:str=""
     name:str=""
     connections:List[Connection]=field(default_factory=list)
-    
\ No newline at end of file
+
+@dataclass
+class ReloadReport:
+    # what RoadNetwork.reload found changed on disk; full when everything was parsed again
+    error:ErrorCode=ErrorCode.OK
+    full:bool=False
+    header_changed:bool=False
+    added_roads:List[str]=field(default_factory=list)
+    changed_roads:List[str]=field(default_factory=list)
+    removed_roads:List[str]=field(default_factory=list)
+    added_junctions:List[str]=field(default_factory=list)
+    changed_junctions:List[str]=field(default_factory=list)
+    removed_junctions:List[str]=field(default_factory=list)
+
+@dataclass
+class ValidationIssue:
+    # one violated check of the network validator; value is the measured deviation (m or rad), nan when not measurable
+    check:str=""
+    road_id:str=""
+    geometry:int=-1 # geometry index within the road, -1 for checks of the whole road
+    other:str="" # the other side of a link or connection, e.g. "successor road 12 (start)"
+    value:float=0.0
+    tolerance:float=0.0
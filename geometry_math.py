@@ -1,6 +1,11 @@
+import math
+import logging
 import numpy as np
+import constants
+from functools import lru_cache
 from scipy.special import fresnel
 from scipy.optimize import minimize_scalar
+from scipy.spatial import cKDTree
 
 # 通用的 t 偏移函数（参考点 + 横向偏移）
 def apply_t_offset(x_ref, y_ref, hdg_ref, t):
@@ -58,7 +63,7 @@ def st_to_xy_arc(s, t, x0, y0, hdg0, curvature, length):
 def xy_to_st_arc(x, y, x0, y0, hdg0, curvature, length):
     c = curvature
     if np.abs(c) < 1e-6:
-        return xy_to_st_line(x, y, x0, y0, hdg0, length)[:2], 0  # 调整返回
+        return xy_to_st_line(x, y, x0, y0, hdg0, length)
     r = 1.0 / np.abs(c)
     cx = x0 - np.sin(hdg0) / c
     cy = y0 + np.cos(hdg0) / c
@@ -104,21 +109,9 @@ class EulerSpiral:
         return EulerSpiral((curv_end - curv_start) / length)
 
     def calc_position(self, s, x0=0.0, y0=0.0, hdg0=0.0, curv0=0.0):
-        if self.gamma == 0 and curv0 == 0:
-            x_ref = x0 + s * np.cos(hdg0)
-            y_ref = y0 + s * np.sin(hdg0)
-            hdg_ref = hdg0
-        elif self.gamma == 0:
-            return st_to_xy_arc(s, 0, x0, y0, hdg0, curv0, s)[0], st_to_xy_arc(s, 0, x0, y0, hdg0, curv0, s)[1], hdg0 + s * curv0
-        else:
-            scale = np.sqrt(np.pi / np.abs(self.gamma))
-            Sa, Ca = fresnel((curv0 + self.gamma * s) / scale)
-            Sb, Cb = fresnel(curv0 / scale)
-            sign_gamma = np.sign(self.gamma)
-            Cs = np.sqrt(np.pi / np.abs(self.gamma)) * (Ca - Cb + 1j * sign_gamma * (Sa - Sb)) * np.exp(1j * hdg0) * sign_gamma
-            x_ref = x0 + Cs.real
-            y_ref = y0 + Cs.imag
-            hdg_ref = self.gamma * s**2 / 2 + curv0 * s + hdg0
+        x_ref, y_ref, hdg_ref = spiral_pose_gamma(s, x0, y0, hdg0, curv0, self.gamma)
+        if np.ndim(s) == 0:
+            return x_ref[()], y_ref[()], hdg_ref[()]
         return x_ref, y_ref, hdg_ref
 
 def st_to_xy_spiral(s, t, x0, y0, hdg0, length, curv_start, curv_end):
@@ -129,6 +122,11 @@ def st_to_xy_spiral(s, t, x0, y0, hdg0, length, curv_start, curv_end):
     return apply_t_offset(x_ref, y_ref, hdg_ref, t)
 
 def xy_to_st_spiral(x, y, x0, y0, hdg0, length, curv_start, curv_end):
+    s, t, dist = cached_spiral_projector(x0, y0, hdg0, length, curv_start, curv_end).project(x, y)
+    return s[0], t[0], dist[0]
+
+# 旧实现：有界 minimize_scalar，每次目标函数求值都调用一次 fresnel，仅作精度/性能基准
+def xy_to_st_spiral_reference(x, y, x0, y0, hdg0, length, curv_start, curv_end):
     spiral = EulerSpiral.create_from_length_and_curvature(length, curv_start, curv_end)
     def dist_func(s):
         x_ref, y_ref, _ = spiral.calc_position(s, x0, y0, hdg0, curv_start)
@@ -140,6 +138,418 @@ def xy_to_st_spiral(x, y, x0, y0, hdg0, length, curv_start, curv_end):
     dist = res.fun
     return s_min, t, dist
 
+### 批量函数：s 为数组，一次向量化计算参考线位姿 (x, y, hdg)
+
+def line_pose(s, x0, y0, hdg0):
+    s = np.asarray(s, dtype=np.float64)
+    x = x0 + s * np.cos(hdg0)
+    y = y0 + s * np.sin(hdg0)
+    hdg = np.full_like(s, hdg0)
+    return x, y, hdg
+
+def arc_pose(s, x0, y0, hdg0, curvature):
+    c = curvature
+    if np.abs(c) < 1e-12:
+        return line_pose(s, x0, y0, hdg0)
+    s = np.asarray(s, dtype=np.float64)
+    hdg = hdg0 + s * c
+    x = x0 + (np.sin(hdg) - np.sin(hdg0)) / c
+    y = y0 + (np.cos(hdg0) - np.cos(hdg)) / c
+    return x, y, hdg
+
+def spiral_pose_gamma(s, x0, y0, hdg0, curv0, gamma):
+    # 曲率 k(s) = curv0 + gamma * s，配方后用 Fresnel 积分闭式求解，
+    # 起点和所有采样点合并为一次 fresnel 调用
+    if np.abs(gamma) < 1e-12:
+        return arc_pose(s, x0, y0, hdg0, curv0)
+    s = np.asarray(s, dtype=np.float64)
+    sign_g = np.sign(gamma)
+    scale = np.sqrt(np.pi / np.abs(gamma))
+    w = sign_g * (curv0 + gamma * np.append(s.ravel(), 0.0)) / np.sqrt(np.pi * np.abs(gamma))
+    S, C = fresnel(w)
+    dC = (C[:-1] - C[-1]).reshape(s.shape)
+    dS = (S[:-1] - S[-1]).reshape(s.shape)
+    phase = hdg0 - curv0 * curv0 / (2.0 * gamma)
+    cos_p = np.cos(phase)
+    sin_p = np.sin(phase)
+    dx = scale * dC
+    dy = scale * sign_g * dS
+    x = x0 + dx * cos_p - dy * sin_p
+    y = y0 + dx * sin_p + dy * cos_p
+    hdg = hdg0 + curv0 * s + 0.5 * gamma * s * s
+    return x, y, hdg
+
+def spiral_pose(s, x0, y0, hdg0, length, curv_start, curv_end):
+    gamma = 0.0 if length == 0 else (curv_end - curv_start) / length
+    return spiral_pose_gamma(s, x0, y0, hdg0, curv_start, gamma)
+
+### 逐元素批量函数：每个元素有自己的起点位姿和曲率参数（如整张路网所有几何段的终点）
+
+def arc_pose_elementwise(s, x0, y0, hdg0, curvature):
+    s, x0, y0, hdg0, c = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (s, x0, y0, hdg0, curvature)))
+    straight = np.abs(c) < 1e-12
+    c_safe = np.where(straight, 1.0, c)
+    hdg = hdg0 + s * c
+    x = np.where(straight, x0 + s * np.cos(hdg0), x0 + (np.sin(hdg) - np.sin(hdg0)) / c_safe)
+    y = np.where(straight, y0 + s * np.sin(hdg0), y0 + (np.cos(hdg0) - np.cos(hdg)) / c_safe)
+    return x, y, hdg
+
+def spiral_pose_elementwise(s, x0, y0, hdg0, curv0, gamma):
+    # spiral_pose_gamma per element, one fresnel call for all start and end points; |gamma| ~ 0 is an arc
+    s, x0, y0, hdg0, curv0, gamma = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in (s, x0, y0, hdg0, curv0, gamma)))
+    x, y, _ = arc_pose_elementwise(s, x0, y0, hdg0, curv0)
+    x, y = x.copy(), y.copy()
+    k = np.abs(gamma) >= 1e-12
+    g = gamma[k]
+    sign_g = np.sign(g)
+    root = np.sqrt(np.pi * np.abs(g))
+    S, C = fresnel(np.concatenate((sign_g * (curv0[k] + g * s[k]) / root, sign_g * curv0[k] / root)))
+    n = len(g)
+    dx = np.sqrt(np.pi / np.abs(g)) * (C[:n] - C[n:])
+    dy = np.sqrt(np.pi / np.abs(g)) * sign_g * (S[:n] - S[n:])
+    phase = hdg0[k] - curv0[k] * curv0[k] / (2.0 * g)
+    x[k] = x0[k] + dx * np.cos(phase) - dy * np.sin(phase)
+    y[k] = y0[k] + dx * np.sin(phase) + dy * np.cos(phase)
+    return x, y, hdg0 + curv0 * s + 0.5 * gamma * s * s
+
+### 弦高误差：半径 R = 1/|k| 的圆弧上步长 h 的弦高为 e = R * (1 - cos(h / (2R)))
+
+def chord_error(curvature, step):
+    # sagitta of a chord of length step on a curve of constant |curvature|, 0 for a line
+    k = np.abs(np.asarray(curvature, dtype=np.float64))
+    half_angle = np.minimum(0.5 * step * k, np.pi)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(k > 1e-12, (1.0 - np.cos(half_angle)) / np.where(k > 1e-12, k, 1.0), 0.0)
+
+def chord_step(curvature, max_error):
+    # longest step whose sagitta stays within max_error, inf for a line; capped at a half circle
+    k = np.abs(np.asarray(curvature, dtype=np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        step = 2.0 * np.arccos(1.0 - np.minimum(max_error * k, 1.0)) / k
+    return np.where(k > 1e-12, step, np.inf)
+
+### 分段三次多项式：records 每行 (s_start, a, b, c, d)，按 s_start 升序
+
+def eval_cubic_records(records, s):
+    # value of the record active at each s (searchsorted), 0 where no record applies
+    s = np.asarray(s, dtype=np.float64)
+    if len(records) == 0 or not records[:, 1:].any():
+        return np.zeros_like(s)
+    if len(records) == 1:
+        # 单条记录（最常见）无需查找
+        a, b, c, d = records[0, 1:]
+        ds = s - records[0, 0]
+        return a + ds * (b + ds * (c + ds * d))
+    i = np.clip(np.searchsorted(records[:, 0], s, side='right') - 1, 0, len(records) - 1)
+    active = records[i]
+    ds = s - active[..., 0]
+    return active[..., 1] + ds * (active[..., 2] + ds * (active[..., 3] + ds * active[..., 4]))
+
+def eval_cubic_records_derivative(records, s):
+    s = np.asarray(s, dtype=np.float64)
+    if len(records) == 0:
+        return np.zeros_like(s)
+    i = np.clip(np.searchsorted(records[:, 0], s, side='right') - 1, 0, len(records) - 1)
+    ds = s - records[i, 0]
+    b, c, d = records[i, 2], records[i, 3], records[i, 4]
+    return b + ds * (2.0 * c + ds * 3.0 * d)
+
+def eval_shape_records(shape, s, t):
+    # lateral shape height at (s, t): each s group is a piecewise cubic in t (first record also applies
+    # before its t), heights are interpolated linearly in s between consecutive groups
+    s = np.asarray(s, dtype=np.float64)
+    t = np.broadcast_to(np.asarray(t, dtype=np.float64), s.shape)
+    if len(shape) == 0 or not shape[:, 2:].any():
+        return np.zeros_like(s)
+    group_s, group_start = np.unique(shape[:, 0], return_index=True)
+    group_end = np.append(group_start[1:], len(shape))
+    heights = np.empty((len(group_s),) + s.shape)
+    for k in range(len(group_s)):
+        records = shape[group_start[k]:group_end[k]]
+        i = np.clip(np.searchsorted(records[:, 1], t, side='right') - 1, 0, len(records) - 1)
+        dt = t - records[i, 1]
+        heights[k] = records[i, 2] + dt * (records[i, 3] + dt * (records[i, 4] + dt * records[i, 5]))
+    if len(group_s) == 1:
+        return heights[0]
+    k = np.clip(np.searchsorted(group_s, s, side='right') - 1, 0, len(group_s) - 1)
+    k_next = np.minimum(k + 1, len(group_s) - 1)
+    span = group_s[k_next] - group_s[k]
+    w = np.where(span > 0, np.clip((s - group_s[k]) / np.where(span > 0, span, 1.0), 0.0, 1.0), 0.0)
+    h0 = np.take_along_axis(heights, k[None], axis=0)[0]
+    h1 = np.take_along_axis(heights, k_next[None], axis=0)[0]
+    return h0 + w * (h1 - h0)
+
+def road_surface(elevation, superelevation, shape, s, t=0.0):
+    # z and roll of the road surface at (s, t): elevation, plus the superelevation tilt about the
+    # reference line (positive roll lowers the right side, t < 0), plus the lateral shape
+    s = np.asarray(s, dtype=np.float64)
+    z = eval_cubic_records(elevation, s)
+    roll = eval_cubic_records(superelevation, s)
+    if np.any(t != 0.0):
+        z = z + t * np.tan(roll)
+    if len(shape) > 0:
+        z = z + eval_shape_records(shape, s, t)
+    return z, roll
+
+### 批量投影：N 个点一次投影到单个几何段，返回 s, t, 距离平方 数组
+
+def _as_point_arrays(x, y):
+    x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+    y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+    return np.broadcast_arrays(x, y)
+
+def xy_to_st_line_batch(x, y, x0, y0, hdg0, length):
+    x, y = _as_point_arrays(x, y)
+    return xy_to_st_line(x, y, x0, y0, hdg0, length)
+
+def xy_to_st_arc_batch(x, y, x0, y0, hdg0, curvature, length):
+    c = curvature
+    if np.abs(c) < 1e-6:
+        return xy_to_st_line_batch(x, y, x0, y0, hdg0, length)
+    x, y = _as_point_arrays(x, y)
+    cx = x0 - np.sin(hdg0) / c
+    cy = y0 + np.cos(hdg0) / c
+    # 圆心指向投影点的方向角，沿行驶方向从起点量起的转角 ∈ [0, 2π)
+    phi = np.arctan2(y - cy, x - cx)
+    phi0 = np.arctan2(y0 - cy, x0 - cx)
+    theta = np.mod(np.sign(c) * (phi - phi0), 2 * np.pi)
+    s = theta / np.abs(c)
+    # 超出弧长的点取较近的端点
+    outside = s > length
+    if np.any(outside):
+        x_end, y_end, _ = arc_pose(length, x0, y0, hdg0, c)
+        dist_start = (x - x0)**2 + (y - y0)**2
+        dist_end = (x - x_end)**2 + (y - y_end)**2
+        s = np.where(outside, np.where(dist_start <= dist_end, 0.0, length), s)
+    x_ref, y_ref, hdg_ref = arc_pose(s, x0, y0, hdg0, c)
+    t = compute_signed_t(x, y, x_ref, y_ref, hdg_ref)
+    dist = (x - x_ref)**2 + (y - y_ref)**2
+    return s, t, dist
+
+class SpiralProjector:
+    # 螺旋线投影器：预计算粗表 (s, x, y, hdg) 作为初值，再用解析切线做 Newton 迭代。
+    # 目标函数 f(s) = (P(s) - Q)·T(s)，f'(s) = 1 - k(s)·t，t 为 Q 相对 P(s) 的横向偏移。
+    # 容差：|Δs| < tol（默认 1e-9 m）即收敛，最多 max_iter 步；解被截断在 [0, length]。
+    # 对距参考线小于最小曲率半径的点得到全局最近点，更远的点得到最近表项附近的局部最近点。
+    def __init__(self, x0, y0, hdg0, length, curv_start, curv_end, table_step=1.0):
+        self.x0 = x0
+        self.y0 = y0
+        self.hdg0 = hdg0
+        self.length = length
+        self.curv_start = curv_start
+        self.curv_end = curv_end
+        self.gamma = 0.0 if length == 0 else (curv_end - curv_start) / length
+        n = max(2, int(np.ceil(length / table_step)) + 1)
+        self.s_table = np.linspace(0.0, length, n)
+        self.x_table, self.y_table, self.hdg_table = spiral_pose(self.s_table, x0, y0, hdg0, length, curv_start, curv_end)
+        self.tree = cKDTree(np.column_stack((self.x_table, self.y_table)))
+        # 标量路径用到的闭式常量，见 spiral_pose_gamma
+        self.is_spiral = np.abs(self.gamma) >= 1e-12
+        if self.is_spiral:
+            self.sign_g = math.copysign(1.0, self.gamma)
+            self.scale = math.sqrt(math.pi / abs(self.gamma))
+            self.w_scale = self.sign_g / math.sqrt(math.pi * abs(self.gamma))
+            self.S0, self.C0 = fresnel(self.w_scale * curv_start)
+            phase = hdg0 - curv_start * curv_start / (2.0 * self.gamma)
+            self.cos_p = math.cos(phase)
+            self.sin_p = math.sin(phase)
+
+    def _pose_scalar(self, s):
+        if not self.is_spiral:
+            x, y, hdg = arc_pose(s, self.x0, self.y0, self.hdg0, self.curv_start)
+            return float(x), float(y), float(hdg)
+        S, C = fresnel(self.w_scale * (self.curv_start + self.gamma * s))
+        dx = self.scale * (C - self.C0)
+        dy = self.scale * self.sign_g * (S - self.S0)
+        x = self.x0 + dx * self.cos_p - dy * self.sin_p
+        y = self.y0 + dx * self.sin_p + dy * self.cos_p
+        return x, y, self.hdg0 + self.curv_start * s + 0.5 * self.gamma * s * s
+
+    def _project_point(self, x, y, tol, max_iter):
+        # 单点查询的低开销版本，算法同 project
+        k = int(np.argmin((self.x_table - x)**2 + (self.y_table - y)**2))
+        s = float(self.s_table[k])
+        x_ref, y_ref, hdg_ref = float(self.x_table[k]), float(self.y_table[k]), float(self.hdg_table[k])
+        for _ in range(max_iter):
+            dx = x - x_ref
+            dy = y - y_ref
+            cos_h = math.cos(hdg_ref)
+            sin_h = math.sin(hdg_ref)
+            f = -(dx * cos_h + dy * sin_h)
+            t = -dx * sin_h + dy * cos_h
+            df = max(1.0 - (self.curv_start + self.gamma * s) * t, 0.1)
+            s_new = min(max(s - f / df, 0.0), self.length)
+            step = abs(s_new - s)
+            s = s_new
+            x_ref, y_ref, hdg_ref = self._pose_scalar(s)
+            if step < tol:
+                break
+        t = -(x - x_ref) * math.sin(hdg_ref) + (y - y_ref) * math.cos(hdg_ref)
+        dist = (x - x_ref)**2 + (y - y_ref)**2
+        return s, t, dist
+
+    def project(self, x, y, tol=1e-9, max_iter=8):
+        if np.ndim(x) == 0 and np.ndim(y) == 0:
+            s, t, dist = self._project_point(float(x), float(y), tol, max_iter)
+            return np.array([s]), np.array([t]), np.array([dist])
+        x, y = _as_point_arrays(x, y)
+        _, k = self.tree.query(np.column_stack((x, y)))
+        s = self.s_table[k]
+        x_ref = self.x_table[k]
+        y_ref = self.y_table[k]
+        hdg_ref = self.hdg_table[k]
+        active = np.arange(len(x))
+        for _ in range(max_iter):
+            if len(active) == 0:
+                break
+            dx = x[active] - x_ref[active]
+            dy = y[active] - y_ref[active]
+            cos_h = np.cos(hdg_ref[active])
+            sin_h = np.sin(hdg_ref[active])
+            f = -(dx * cos_h + dy * sin_h)
+            t = -dx * sin_h + dy * cos_h
+            curvature = self.curv_start + self.gamma * s[active]
+            df = np.maximum(1.0 - curvature * t, 0.1)
+            s_new = np.clip(s[active] - f / df, 0.0, self.length)
+            step = np.abs(s_new - s[active])
+            s[active] = s_new
+            x_ref[active], y_ref[active], hdg_ref[active] = spiral_pose_gamma(s_new, self.x0, self.y0, self.hdg0, self.curv_start, self.gamma)
+            active = active[step >= tol]
+        t = compute_signed_t(x, y, x_ref, y_ref, hdg_ref)
+        dist = (x - x_ref)**2 + (y - y_ref)**2
+        return s, t, dist
+
+# 同一段螺旋线的重复查询复用投影表
+@lru_cache(maxsize=256)
+def cached_spiral_projector(x0, y0, hdg0, length, curv_start, curv_end):
+    return SpiralProjector(x0, y0, hdg0, length, curv_start, curv_end)
+
+def xy_to_st_spiral_batch(x, y, x0, y0, hdg0, length, curv_start, curv_end):
+    return cached_spiral_projector(x0, y0, hdg0, length, curv_start, curv_end).project(x, y)
+
+### 参数三次多项式：局部坐标 u(p), v(p)（u 沿起点航向），poly3 即 u = p, v = a + b*p + c*p^2 + d*p^3。
+# 预计算弧长表 s(p)（每个区间 5 点 Gauss-Legendre），s -> p 先做三次 Hermite 插值（节点导数 dp/ds = 1/|P'(p)|），
+# 再做一步 Newton 修正，整个过程对 s 数组向量化，不做逐点数值积分
+
+GAUSS_NODES, GAUSS_WEIGHTS = np.polynomial.legendre.leggauss(5)
+
+class ParamPoly3Curve:
+    # p_max: 1 for pRange="normalized", length for "arcLength", None for poly3 (p = u, solved so the arc length is length).
+    # the curve's own arc length is scaled onto [0, length] so the segment ends exactly where its p range ends
+    def __init__(self, x0, y0, hdg0, length, u_coeffs, v_coeffs, p_max=None, table_step=0.5):
+        self.x0 = x0
+        self.y0 = y0
+        self.hdg0 = hdg0
+        self.length = length
+        self.u_coeffs = np.asarray(u_coeffs, dtype=np.float64)
+        self.v_coeffs = np.asarray(v_coeffs, dtype=np.float64)
+        self.cos_h = math.cos(hdg0)
+        self.sin_h = math.sin(hdg0)
+        self.n_intervals = max(16, int(np.ceil(length / table_step)))
+        if p_max is None:
+            self._build_table(length)
+            p_max = float(self._p_of_arc(np.array([min(length, self.arc_length)]))[0])
+        self._build_table(p_max)
+        self.s_scale = length / self.arc_length if self.arc_length > 0 else 1.0
+        self.x_table, self.y_table, self.hdg_table = self._pose_p(self.p_table)
+        self._tree = None
+
+    def _build_table(self, p_max):
+        self.p_max = p_max
+        self.p_table = np.linspace(0.0, p_max, self.n_intervals + 1)
+        self.s_table = np.concatenate(([0.0], np.cumsum(self._arc(self.p_table[:-1], self.p_table[1:]))))
+        self.arc_length = float(self.s_table[-1])
+        self.speed_table = self._speed(self.p_table)
+
+    def _derivatives(self, p):
+        aU, bU, cU, dU = self.u_coeffs
+        aV, bV, cV, dV = self.v_coeffs
+        du = bU + p * (2.0 * cU + p * 3.0 * dU)
+        dv = bV + p * (2.0 * cV + p * 3.0 * dV)
+        ddu = 2.0 * cU + 6.0 * dU * p
+        ddv = 2.0 * cV + 6.0 * dV * p
+        return du, dv, ddu, ddv
+
+    def _speed(self, p):
+        du, dv, _, _ = self._derivatives(p)
+        return np.hypot(du, dv)
+
+    def _arc(self, p0, p1):
+        # arc length between p0 and p1 (arrays), Gauss-Legendre on each interval
+        half = 0.5 * (p1 - p0)
+        mid = 0.5 * (p1 + p0)
+        return half * (self._speed(mid[..., None] + half[..., None] * GAUSS_NODES) @ GAUSS_WEIGHTS)
+
+    def _p_of_arc(self, arc):
+        # curve parameter at curve arc length (array)
+        arc = np.clip(arc, 0.0, self.arc_length)
+        i = np.clip(np.searchsorted(self.s_table, arc, side='right') - 1, 0, self.n_intervals - 1)
+        h = self.s_table[i + 1] - self.s_table[i]
+        tau = np.divide(arc - self.s_table[i], h, out=np.zeros_like(arc), where=h > 0)
+        m0 = h / np.maximum(self.speed_table[i], 1e-12)
+        m1 = h / np.maximum(self.speed_table[i + 1], 1e-12)
+        tau2 = tau * tau
+        tau3 = tau2 * tau
+        p = ((2.0 * tau3 - 3.0 * tau2 + 1.0) * self.p_table[i] + (tau3 - 2.0 * tau2 + tau) * m0
+             + (-2.0 * tau3 + 3.0 * tau2) * self.p_table[i + 1] + (tau3 - tau2) * m1)
+        # one Newton step on arc(p_i, p) = arc - s_i
+        p = p - (self.s_table[i] + self._arc(self.p_table[i], p) - arc) / np.maximum(self._speed(p), 1e-12)
+        return np.clip(p, 0.0, self.p_max)
+
+    def _arc_of_p(self, p):
+        i = np.clip(np.searchsorted(self.p_table, p, side='right') - 1, 0, self.n_intervals - 1)
+        return self.s_table[i] + self._arc(self.p_table[i], p)
+
+    def _pose_p(self, p):
+        u = np.polynomial.polynomial.polyval(p, self.u_coeffs)
+        v = np.polynomial.polynomial.polyval(p, self.v_coeffs)
+        du, dv, _, _ = self._derivatives(p)
+        x = self.x0 + u * self.cos_h - v * self.sin_h
+        y = self.y0 + u * self.sin_h + v * self.cos_h
+        return x, y, self.hdg0 + np.arctan2(dv, du)
+
+    def p_of_s(self, s):
+        return self._p_of_arc(np.asarray(s, dtype=np.float64) / self.s_scale)
+
+    def pose(self, s):
+        # (x, y, hdg) at local s (scalar or array)
+        return self._pose_p(self.p_of_s(s))
+
+    def curvature(self, s):
+        du, dv, ddu, ddv = self._derivatives(self.p_of_s(s))
+        # curvature per unit of the scaled s
+        return (du * ddv - dv * ddu) / np.maximum(np.hypot(du, dv), 1e-12)**3 / self.s_scale
+
+    def max_curvature(self) -> float:
+        du, dv, ddu, ddv = self._derivatives(np.linspace(0.0, self.p_max, 4 * self.n_intervals + 1))
+        return float(np.max(np.abs(du * ddv - dv * ddu) / np.maximum(np.hypot(du, dv), 1e-12)**3) / self.s_scale)
+
+    def project(self, x, y, tol=1e-12, max_iter=8):
+        # nearest table node as seed, then Newton on f(p) = (P(p) - Q)·P'(p); returns local s, t, squared distance
+        x, y = _as_point_arrays(x, y)
+        if self._tree is None:
+            self._tree = cKDTree(np.column_stack((self.x_table, self.y_table)))
+        _, k = self._tree.query(np.column_stack((x, y)))
+        p = self.p_table[k]
+        # local frame of the query points
+        qu = (x - self.x0) * self.cos_h + (y - self.y0) * self.sin_h
+        qv = -(x - self.x0) * self.sin_h + (y - self.y0) * self.cos_h
+        for _ in range(max_iter):
+            eu = np.polynomial.polynomial.polyval(p, self.u_coeffs) - qu
+            ev = np.polynomial.polynomial.polyval(p, self.v_coeffs) - qv
+            du, dv, ddu, ddv = self._derivatives(p)
+            f = eu * du + ev * dv
+            df = np.maximum(du * du + dv * dv + eu * ddu + ev * ddv, 1e-3 * (du * du + dv * dv) + 1e-12)
+            p_new = np.clip(p - f / df, 0.0, self.p_max)
+            step = np.max(np.abs(p_new - p)) if len(p) > 0 else 0.0
+            p = p_new
+            if step < tol:
+                break
+        x_ref, y_ref, hdg_ref = self._pose_p(p)
+        t = compute_signed_t(x, y, x_ref, y_ref, hdg_ref)
+        dist = (x - x_ref)**2 + (y - y_ref)**2
+        return self._arc_of_p(p) * self.s_scale, t, dist
+
 ### 多段处理
 
 # 几何段定义：列表 of dicts，每个dict有 'type', 'length', 和类型特定参数
@@ -167,12 +577,13 @@ def build_road_geometries(geoms):
             x_prev, y_prev = st_to_xy_spiral(g['length'], 0, x_prev, y_prev, hdg_prev, g['length'], g['curv_start'], g['curv_end'])
             hdg_prev += g['length']**2 * (g['curv_end'] - g['curv_start']) / (2 * g['length']) + g['curv_start'] * g['length']
         s_cum += g['length']
-    for road_geom in road_geoms:
-        print(f'road_geom:{road_geom}')
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        for road_geom in road_geoms:
+            logging.debug(f'road_geom:{road_geom}')
     return road_geoms
 
 def st_to_xy_multi(s, t, road_geoms):
-    total_length = sum(g['length'] for g in road_geoms)
+    total_length = road_geoms[-1]['s0'] + road_geoms[-1]['length']
     if not (0 <= s <= total_length):
         raise ValueError("s must be between 0 and total_length")
     for g in road_geoms:
@@ -186,23 +597,179 @@ def st_to_xy_multi(s, t, road_geoms):
                 return st_to_xy_spiral(s_local, t, g['x0'], g['y0'], g['hdg0'], g['length'], g['curv_start'], g['curv_end'])
     raise ValueError("Segment not found")
 
+def xy_to_st_segment_batch(x, y, g):
+    if g['type'] == 'line':
+        return xy_to_st_line_batch(x, y, g['x0'], g['y0'], g['hdg0'], g['length'])
+    elif g['type'] == 'arc':
+        return xy_to_st_arc_batch(x, y, g['x0'], g['y0'], g['hdg0'], g['curvature'], g['length'])
+    elif g['type'] == 'spiral':
+        return xy_to_st_spiral_batch(x, y, g['x0'], g['y0'], g['hdg0'], g['length'], g['curv_start'], g['curv_end'])
+    raise ValueError(f"unknown segment type {g['type']}")
+
 def xy_to_st_multi(x, y, road_geoms):
-    min_dist = float('inf')
-    best_s = 0.0
-    best_t = 0.0
-    for g in road_geoms:
-        if g['type'] == 'line':
-            s_local, t_local, dist = xy_to_st_line(x, y, g['x0'], g['y0'], g['hdg0'], g['length'])
-        elif g['type'] == 'arc':
-            s_local, t_local, dist = xy_to_st_arc(x, y, g['x0'], g['y0'], g['hdg0'], g['curvature'], g['length'])
-        elif g['type'] == 'spiral':
-            s_local, t_local, dist = xy_to_st_spiral(x, y, g['x0'], g['y0'], g['hdg0'], g['length'], g['curv_start'], g['curv_end'])
-        if dist < min_dist:
-            min_dist = dist
-            best_s = g['s0'] + s_local
-            best_t = t_local
+    # 标量或数组输入，各段批量投影后按距离做向量化最小值归约
+    scalar = np.ndim(x) == 0 and np.ndim(y) == 0
+    x, y = _as_point_arrays(x, y)
+    s_all = np.empty((len(road_geoms), len(x)))
+    t_all = np.empty_like(s_all)
+    dist_all = np.empty_like(s_all)
+    for i, g in enumerate(road_geoms):
+        s_local, t_all[i], dist_all[i] = xy_to_st_segment_batch(x, y, g)
+        s_all[i] = g['s0'] + s_local
+    best = np.argmin(dist_all, axis=0)
+    cols = np.arange(len(x))
+    best_s = s_all[best, cols]
+    best_t = t_all[best, cols]
+    if scalar:
+        return float(best_s[0]), float(best_t[0])
     return best_s, best_t
 
+### 整条道路参考线：一次构建，按累计 s 二分查找几何段，批量求值
+
+LINE = constants.LineType.LINE_STRAIGHT.value
+ARC = constants.LineType.CIRCULAR_ARC.value
+SPIRAL = constants.LineType.SPIRAL.value
+POLY3 = constants.LineType.POLY3.value
+PARAM_POLY3 = constants.LineType.PARAM_POLY3.value
+
+def param_poly3_curve(geometry) -> ParamPoly3Curve:
+    # curve of a constants.Geometry (or GeometryView) of type POLY3 or PARAM_POLY3
+    if geometry.ref_line_type == constants.LineType.POLY3:
+        poly3 = geometry.poly3
+        return ParamPoly3Curve(geometry.x, geometry.y, geometry.hdg, geometry.length,
+                               (0.0, 1.0, 0.0, 0.0), (poly3.a, poly3.b, poly3.c, poly3.d))
+    param_poly3 = geometry.param_poly3
+    return ParamPoly3Curve(geometry.x, geometry.y, geometry.hdg, geometry.length,
+                           (param_poly3.aU, param_poly3.bU, param_poly3.cU, param_poly3.dU),
+                           (param_poly3.aV, param_poly3.bV, param_poly3.cV, param_poly3.dV),
+                           geometry.length if param_poly3.pRange == 'arcLength' else 1.0)
+
+class ReferenceLine:
+    # curves: segment index -> ParamPoly3Curve for the POLY3 / PARAM_POLY3 segments
+    def __init__(self, type_code, s0, x0, y0, hdg0, length, curv_start, curv_end, curves=None):
+        self.type_code = np.asarray(type_code, dtype=np.int8)
+        self.s0 = np.asarray(s0, dtype=np.float64)
+        self.x0 = np.asarray(x0, dtype=np.float64)
+        self.y0 = np.asarray(y0, dtype=np.float64)
+        self.hdg0 = np.asarray(hdg0, dtype=np.float64)
+        self.length = np.asarray(length, dtype=np.float64)
+        self.curv_start = np.asarray(curv_start, dtype=np.float64)
+        self.curv_end = np.asarray(curv_end, dtype=np.float64)
+        self.gamma = np.divide(self.curv_end - self.curv_start, self.length,
+                               out=np.zeros_like(self.length), where=self.length > 0)
+        self.total_length = float(self.s0[-1] + self.length[-1]) if len(self.s0) > 0 else 0.0
+        self.curves = curves if curves is not None else {}
+
+    @staticmethod
+    def from_geometries(geometry_list) -> 'ReferenceLine':
+        # constants.Geometry objects (or GeometryView)
+        codes, curv_start, curv_end, curves = [], [], [], {}
+        for i, g in enumerate(geometry_list):
+            codes.append(g.ref_line_type.value)
+            if g.ref_line_type in (constants.LineType.POLY3, constants.LineType.PARAM_POLY3):
+                curves[i] = param_poly3_curve(g)
+            if g.ref_line_type == constants.LineType.CIRCULAR_ARC:
+                curv_start.append(g.arc.curvature)
+                curv_end.append(g.arc.curvature)
+            elif g.ref_line_type == constants.LineType.SPIRAL:
+                curv_start.append(g.spiral.curvStart)
+                curv_end.append(g.spiral.curvEnd)
+            else:
+                curv_start.append(0.0)
+                curv_end.append(0.0)
+        return ReferenceLine(codes, [g.s for g in geometry_list], [g.x for g in geometry_list], [g.y for g in geometry_list],
+                             [g.hdg for g in geometry_list], [g.length for g in geometry_list], curv_start, curv_end, curves)
+
+    @staticmethod
+    def from_road(road) -> 'ReferenceLine':
+        return ReferenceLine.from_geometries(road.planview.geometry_list)
+
+    @staticmethod
+    def from_table(table, g0:int, g1:int) -> 'ReferenceLine':
+        # rows [g0, g1) of a network_store.GeometryTable
+        codes = table.type_code[g0:g1]
+        curves = {int(i): table.param_poly3_curve(g0 + int(i)) for i in np.flatnonzero((codes == POLY3) | (codes == PARAM_POLY3))}
+        return ReferenceLine(codes, table.s[g0:g1], table.x[g0:g1], table.y[g0:g1], table.hdg[g0:g1],
+                             table.length[g0:g1], table.curv_start[g0:g1], table.curv_end[g0:g1], curves)
+
+    @staticmethod
+    def from_road_geoms(road_geoms) -> 'ReferenceLine':
+        # segment dicts produced by build_road_geometries
+        code_of = {'line': LINE, 'arc': ARC, 'spiral': SPIRAL}
+        curv_start = [g.get('curvature', g.get('curv_start', 0.0)) for g in road_geoms]
+        curv_end = [g.get('curvature', g.get('curv_end', 0.0)) for g in road_geoms]
+        return ReferenceLine([code_of[g['type']] for g in road_geoms], [g['s0'] for g in road_geoms],
+                             [g['x0'] for g in road_geoms], [g['y0'] for g in road_geoms], [g['hdg0'] for g in road_geoms],
+                             [g['length'] for g in road_geoms], curv_start, curv_end)
+
+    def segment_index(self, s):
+        return np.clip(np.searchsorted(self.s0, s, side='right') - 1, 0, len(self.s0) - 1)
+
+    def evaluate(self, s, t=0.0):
+        # (x, y, hdg, curvature) at road s (scalar or array), offset laterally by t
+        scalar = np.ndim(s) == 0 and np.ndim(t) == 0
+        s = np.atleast_1d(np.asarray(s, dtype=np.float64))
+        if np.any(s < -1e-9) or np.any(s > self.total_length + 1e-9):
+            raise ValueError("s must be between 0 and total_length")
+        i = self.segment_index(s)
+        s_local = np.clip(s - self.s0[i], 0.0, self.length[i])
+        x0, y0, hdg0 = self.x0[i], self.y0[i], self.hdg0[i]
+        c0, gamma, code = self.curv_start[i], self.gamma[i], self.type_code[i]
+        x = np.empty_like(s)
+        y = np.empty_like(s)
+        hdg = np.empty_like(s)
+        curvature = np.zeros_like(s)
+
+        # 每个点取自己所在段的参数，同类型的段在一次向量化计算中求值
+        is_curved = (code == ARC) | (code == SPIRAL)
+        is_spiral = (code == SPIRAL) & (np.abs(gamma) >= 1e-12)
+        is_arc = is_curved & ~is_spiral & (np.abs(c0) >= 1e-12)
+        is_poly = (code == POLY3) | (code == PARAM_POLY3)
+        is_line = ~(is_spiral | is_arc | is_poly)
+        if np.any((code != LINE) & ~is_curved & ~is_poly):
+            raise NotImplementedError(f"geometry type {constants.LineType(int(code[(code != LINE) & ~is_curved & ~is_poly][0])).name} is not implemented")
+
+        m = is_line
+        x[m] = x0[m] + s_local[m] * np.cos(hdg0[m])
+        y[m] = y0[m] + s_local[m] * np.sin(hdg0[m])
+        hdg[m] = hdg0[m]
+
+        m = is_arc
+        c = c0[m]
+        hdg[m] = hdg0[m] + s_local[m] * c
+        x[m] = x0[m] + (np.sin(hdg[m]) - np.sin(hdg0[m])) / c
+        y[m] = y0[m] + (np.cos(hdg0[m]) - np.cos(hdg[m])) / c
+        curvature[m] = c
+
+        m = is_spiral
+        if np.any(m):
+            g, c, sl = gamma[m], c0[m], s_local[m]
+            sign_g = np.sign(g)
+            root = np.sqrt(np.pi * np.abs(g))
+            S, C = fresnel(np.concatenate((sign_g * (c + g * sl) / root, sign_g * c / root)))
+            n = len(sl)
+            dC = C[:n] - C[n:]
+            dS = S[:n] - S[n:]
+            phase = hdg0[m] - c * c / (2.0 * g)
+            dx = np.sqrt(np.pi / np.abs(g)) * dC
+            dy = np.sqrt(np.pi / np.abs(g)) * sign_g * dS
+            x[m] = x0[m] + dx * np.cos(phase) - dy * np.sin(phase)
+            y[m] = y0[m] + dx * np.sin(phase) + dy * np.cos(phase)
+            hdg[m] = hdg0[m] + c * sl + 0.5 * g * sl * sl
+            curvature[m] = c + g * sl
+
+        # polynomial segments one curve at a time, each vectorized over its points
+        for j in np.unique(i[is_poly]):
+            m = is_poly & (i == j)
+            curve = self.curves[int(j)]
+            x[m], y[m], hdg[m] = curve.pose(s_local[m])
+            curvature[m] = curve.curvature(s_local[m])
+
+        x, y = apply_t_offset(x, y, hdg, t)
+        if scalar:
+            return float(x[0]), float(y[0]), float(hdg[0]), float(curvature[0])
+        return x, y, hdg, curvature
+
 # 示例使用
 if __name__ == "__main__":
     # 定义道路几何：不包括 s0, x0, y0, hdg0（将自动计算）
@@ -219,4 +786,4 @@ if __name__ == "__main__":
     
     # xy to st
     s, t = xy_to_st_multi(x, y, road_geoms)
-    print("Multi xy -> st:", s, t)
\ No newline at end of file
+    print("Multi xy -> st:", s, t)
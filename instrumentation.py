@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import threading
+
+# 轻量级计时器/计数器：按阶段名累计耗时与次数。
+# 默认关闭，关闭时 timer() 返回共享的空上下文、count() 直接返回，热点路径上几乎零开销；
+# 可选记录 Chrome trace 事件（chrome://tracing / Perfetto 可直接打开）。
+
+_enabled = False
+_trace_enabled = False
+_lock = threading.Lock()
+_timers = {} # name -> [count, total_s, min_s, max_s]
+_counters = {} # name -> value
+_trace_events = []
+_epoch = time.perf_counter()
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name:str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        add_time(self.name, end - self.start, self.start)
+        return False
+
+def enable(trace:bool=False):
+    # start collecting; trace=True also keeps one event per timed block for export_trace
+    global _enabled, _trace_enabled
+    _enabled = True
+    _trace_enabled = trace
+
+def disable():
+    global _enabled, _trace_enabled
+    _enabled = False
+    _trace_enabled = False
+
+def is_enabled() -> bool:
+    return _enabled
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _trace_events.clear()
+
+def timer(name:str):
+    # with timer('parse/roads'): ...
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+def add_time(name:str, seconds:float, start:float=None):
+    # record an externally measured duration, e.g. one reported by a worker process
+    if not _enabled:
+        return
+    with _lock:
+        entry = _timers.get(name)
+        if entry is None:
+            _timers[name] = [1, seconds, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = min(entry[2], seconds)
+            entry[3] = max(entry[3], seconds)
+        if _trace_enabled:
+            start = time.perf_counter() - seconds if start is None else start
+            _trace_events.append({'name':name, 'ph':'X', 'ts':(start - _epoch) * 1e6, 'dur':seconds * 1e6,
+                                  'pid':os.getpid(), 'tid':threading.get_ident()})
+
+def count(name:str, value:int=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def timed(name:str):
+    # decorator form of timer()
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+    return decorate
+
+def stats() -> dict:
+    # {'timers': {name: {count, total_s, mean_s, min_s, max_s}}, 'counters': {name: value}}
+    with _lock:
+        timers = {name: {'count':c, 'total_s':total, 'mean_s':total / c, 'min_s':low, 'max_s':high}
+                  for name, (c, total, low, high) in _timers.items()}
+        return {'timers':timers, 'counters':dict(_counters)}
+
+def report() -> str:
+    # human readable table, slowest stage first
+    current = stats()
+    lines = [f"{'stage':40s} {'count':>8s} {'total ms':>12s} {'mean ms':>10s}"]
+    for name, entry in sorted(current['timers'].items(), key=lambda item: -item[1]['total_s']):
+        lines.append(f"{name:40s} {entry['count']:8d} {entry['total_s'] * 1e3:12.3f} {entry['mean_s'] * 1e3:10.3f}")
+    for name, value in sorted(current['counters'].items()):
+        lines.append(f"{name:40s} {value:8d}")
+    return '\n'.join(lines)
+
+def export_trace(path:str):
+    # Chrome trace event format, counters as a final counter event
+    with _lock:
+        events = list(_trace_events)
+        if _counters:
+            events.append({'name':'counters', 'ph':'C', 'ts':(time.perf_counter() - _epoch) * 1e6,
+                           'pid':os.getpid(), 'args':dict(_counters)})
+    with open(path, 'w') as f:
+        json.dump({'traceEvents':events, 'displayTimeUnit':'ms'}, f)
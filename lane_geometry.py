@@ -0,0 +1,104 @@
+import numpy as np
+import constants
+import geometry_math
+
+# 车道边界几何：laneOffset + 各车道宽度三次多项式，在整条道路的采样 s 上批量求值，
+# 再沿参考线法向偏移得到每条车道外边界的折线
+
+def section_index(lanes:constants.Lanes, s):
+    # lane section containing each road s
+    section_s = np.array([section.s for section in lanes.sections])
+    return np.clip(np.searchsorted(section_s, s, side='right') - 1, 0, len(section_s) - 1)
+
+def lane_widths(section:constants.LaneSection, ds) -> np.ndarray:
+    # (n_lanes, n) width of every lane of the section at section-local ds, center lane 0.
+    # all width records of the section are evaluated in one pass: a record applies from its
+    # sOffset up to the next record of the same lane (the first one also before its sOffset)
+    ds = np.asarray(ds, dtype=np.float64)
+    n_lanes = len(section.lane_ids)
+    coeffs = section.width_coeffs
+    if len(coeffs) == 0:
+        return np.zeros((n_lanes, len(ds)))
+    counts = np.diff(section.width_offsets)
+    lane_of_record = np.repeat(np.arange(n_lanes), counts)
+    start = coeffs[:, 0]
+    has_records = counts > 0
+    first = section.width_offsets[:-1][has_records]
+    last = section.width_offsets[1:][has_records] - 1
+    begin = start.copy()
+    begin[first] = -np.inf
+    end = np.append(start[1:], np.inf)
+    end[last] = np.inf
+    u = ds[None, :] - start[:, None]
+    value = coeffs[:, 1:2] + u * (coeffs[:, 2:3] + u * (coeffs[:, 3:4] + u * coeffs[:, 4:5]))
+    value *= (ds[None, :] >= begin[:, None]) & (ds[None, :] < end[:, None])
+    widths = np.zeros((n_lanes, len(ds)))
+    np.add.at(widths, lane_of_record, value)
+    return widths
+
+def boundary_t(section:constants.LaneSection, widths:np.ndarray, offset:np.ndarray) -> np.ndarray:
+    # (n_lanes, n) lateral position of each lane's outer boundary: cumulative widths away from the center lane
+    lane_ids = section.lane_ids
+    t = np.empty_like(widths)
+    left = lane_ids > 0
+    right = lane_ids < 0
+    center = lane_ids == 0
+    # left ids are sorted descending, so accumulate from the last left row outwards
+    t[left] = offset + np.cumsum(widths[left][::-1], axis=0)[::-1]
+    t[right] = offset - np.cumsum(widths[right], axis=0)
+    t[center] = offset
+    return t
+
+def lane_boundaries(road_id:str, lanes:constants.Lanes, s, x, y, hdg) -> constants.LaneBoundaries:
+    # s, x, y, hdg: sampled reference line of the road (e.g. RoadSamples arrays)
+    s = np.asarray(s, dtype=np.float64)
+    boundaries = constants.LaneBoundaries(road_id=road_id)
+    if len(lanes.sections) == 0:
+        return boundaries
+    offset = geometry_math.eval_cubic_records(lanes.lane_offset, s)
+    sec = section_index(lanes, s)
+    # samples are sorted by s, so each section is one contiguous slice
+    starts = np.searchsorted(sec, np.arange(len(lanes.sections) + 1))
+    for k, section in enumerate(lanes.sections):
+        a, b = starts[k], starts[k + 1]
+        widths = lane_widths(section, s[a:b] - section.s)
+        t = boundary_t(section, widths, offset[a:b])
+        bx, by = geometry_math.apply_t_offset(x[a:b], y[a:b], hdg[a:b], t)
+        boundaries.sections.append(constants.SectionBoundaries(
+            s0=section.s, lane_ids=section.lane_ids, s=s[a:b], t=t, x=bx, y=by))
+    return boundaries
+
+def locate_in_lanes(lanes:constants.Lanes, s, t):
+    # section index and lane id containing each (s, t) of one road; lane id 0 when outside every lane
+    s = np.asarray(s, dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    section_out = np.full(len(s), -1, dtype=np.int64)
+    lane_out = np.zeros(len(s), dtype=np.int32)
+    if len(lanes.sections) == 0 or len(s) == 0:
+        return section_out, lane_out
+    offset = geometry_math.eval_cubic_records(lanes.lane_offset, s)
+    sec = section_index(lanes, s)
+    order = np.argsort(sec, kind='stable')
+    runs = np.flatnonzero(np.diff(sec[order], prepend=-1, append=-1) != 0)
+    for a, b in zip(runs[:-1], runs[1:]):
+        m = order[a:b]
+        k = sec[m[0]]
+        section = lanes.sections[k]
+        ids = section.lane_ids
+        boundaries = boundary_t(section, lane_widths(section, s[m] - section.s), offset[m])
+        tm = t[m]
+        # outer boundaries grow away from the center lane, so counting the boundaries
+        # crossed is a per-column searchsorted
+        left_ids = ids[ids > 0][::-1]
+        right_ids = ids[ids < 0]
+        n_left = (boundaries[ids > 0][::-1] < tm).sum(axis=0)
+        n_right = (boundaries[ids < 0] > tm).sum(axis=0)
+        is_left = tm >= offset[m]
+        lane = np.zeros(len(m), dtype=np.int32)
+        ok = is_left & (n_left < len(left_ids))
+        lane[ok] = left_ids[n_left[ok]]
+        ok = ~is_left & (n_right < len(right_ids))
+        lane[ok] = right_ids[n_right[ok]]
+        section_out[m] = k
+        lane_out[m] = lane
+    return section_out, lane_out
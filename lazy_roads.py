@@ -0,0 +1,190 @@
+import re
+import logging
+import numpy as np
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from lxml import etree
+import constants
+import geometry_math
+import network_store
+import spatial_index
+import xodr_diff
+
+# 惰性道路：启动时只做一次字节级扫描，记录每个 <road> 的 id、字节区间和 planView 粗略包围盒；
+# Road 对象、参考线、采样点在首次访问时才从文件对应区间解析/计算，LRU 限制常驻数量。
+
+_GEOMETRY = re.compile(rb'<geometry\b[^>]*>')
+_ATTR = re.compile(rb'\b(id|length|x|y)=["\']([^"\']*)["\']')
+
+def _attrs(tag:bytes) -> dict:
+    return {name.decode(): value.decode() for name, value in _ATTR.findall(tag)}
+
+class RoadScan:
+    # result of the byte-level scan of one file
+    def __init__(self, xodr_file:str):
+        self.xodr_file = xodr_file
+        self.road_ids = []
+        self.road_starts = np.zeros(0, dtype=np.int64)
+        self.road_ends = np.zeros(0, dtype=np.int64)
+        self.road_length = np.zeros(0)
+        # [xmin, ymin, xmax, ymax] from the geometry start points, each padded by its length, so a
+        # road is never outside its box whatever its curvature
+        self.boxes = np.zeros((0, 4))
+        self.header_xml = b''
+        self.junction_xml = []
+
+    @staticmethod
+    def scan(xodr_file:str, root_tag:str='OpenDRIVE') -> 'RoadScan':
+        with open(xodr_file, 'rb') as f:
+            data = f.read()
+        return RoadScan.from_bytes(xodr_file, data, root_tag)
+
+    @staticmethod
+    def from_bytes(xodr_file:str, data:bytes, root_tag:str='OpenDRIVE') -> 'RoadScan':
+        # data is the content of xodr_file, road_xml reads the byte ranges from the file later
+        if re.search(rb'<' + root_tag.encode() + rb'\b', data[:4096]) is None:
+            raise ValueError(f'{xodr_file} is not a valid OpenDRIVE file')
+        result = RoadScan(xodr_file)
+        starts, ends, lengths, boxes = [], [], [], []
+        header_spans, junction_spans = [], []
+        for tag, start, end, start_tag in xodr_diff.top_level_elements(data):
+            if tag == b'header':
+                header_spans.append((start, end))
+                continue
+            if tag == b'junction':
+                junction_spans.append((start, end))
+                continue
+            attrs = _attrs(start_tag)
+            result.road_ids.append(attrs.get('id', ''))
+            starts.append(start)
+            ends.append(end)
+            lengths.append(float(attrs.get('length', '0.0')))
+            geometry = np.array([[float(v) for v in (a.get('x', '0'), a.get('y', '0'), a.get('length', '0'))]
+                                 for a in map(_attrs, _GEOMETRY.findall(data, start, end))]).reshape(-1, 3)
+            if len(geometry) == 0:
+                boxes.append((np.inf, np.inf, -np.inf, -np.inf))
+            else:
+                x, y, length = geometry[:, 0], geometry[:, 1], geometry[:, 2]
+                boxes.append(((x - length).min(), (y - length).min(), (x + length).max(), (y + length).max()))
+        result.road_starts = np.array(starts, dtype=np.int64)
+        result.road_ends = np.array(ends, dtype=np.int64)
+        result.road_length = np.array(lengths, dtype=np.float64)
+        result.boxes = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+        if len(header_spans) != 1:
+            raise ValueError(f'{xodr_file} has {len(header_spans)} header elements, expected 1')
+        result.header_xml = data[header_spans[0][0]:header_spans[0][1]]
+        result.junction_xml = [data[start:end] for start, end in junction_spans]
+        return result
+
+    def road_xml(self, road_index:int) -> bytes:
+        with open(self.xodr_file, 'rb') as f:
+            f.seek(int(self.road_starts[road_index]))
+            return f.read(int(self.road_ends[road_index] - self.road_starts[road_index]))
+
+class _RoadEntry:
+    __slots__ = ('road', 'geometries', 'reference_line', 'samples')
+
+    def __init__(self, road:constants.Road):
+        self.road = road
+        self.geometries = None
+        self.reference_line = None
+        self.samples = {} # (delta_step, max_error) -> RoadSamples
+
+class LazyRoadSequence(Sequence):
+    # stands in for odr_doc['roads']: roads[i] parses road i from its byte range on first access,
+    # at most max_roads stay materialized (least recently used are dropped)
+    def __init__(self, scan:RoadScan, parse_roads, max_roads:int=256):
+        self.scan = scan
+        self.road_ids = scan.road_ids
+        self.road_index_by_id = {road_id: i for i, road_id in enumerate(scan.road_ids)}
+        self._parse_roads = parse_roads
+        self.max_roads = max_roads
+        self._entries = OrderedDict()
+        self._grid = None
+        self.materialized_count = 0 # roads parsed so far, including re-parses after eviction
+
+    def __len__(self):
+        return len(self.road_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        return self.entry(i).road
+
+    def entry(self, i:int) -> _RoadEntry:
+        i = int(i) % len(self) if i < 0 else int(i)
+        entry = self._entries.get(i)
+        if entry is not None:
+            self._entries.move_to_end(i)
+            return entry
+        roads = self._parse_roads(list(etree.fromstring(b'<shard>' + self.scan.road_xml(i) + b'</shard>')))
+        if len(roads) != 1:
+            raise ValueError(f'road {self.road_ids[i]} could not be parsed')
+        entry = _RoadEntry(roads[0])
+        self._entries[i] = entry
+        self.materialized_count += 1
+        while len(self._entries) > self.max_roads:
+            self._entries.popitem(last=False)
+        return entry
+
+    def adopt(self, other:'LazyRoadSequence', road_ids):
+        # take over the materialized entries of other whose road id is in road_ids (roads known to be unchanged),
+        # keeping their parsed road, reference line and samples and their LRU order
+        for i, entry in other._entries.items():
+            road_id = other.road_ids[i]
+            j = self.road_index_by_id.get(road_id)
+            if j is not None and road_id in road_ids:
+                self._entries[j] = entry
+        while len(self._entries) > self.max_roads:
+            self._entries.popitem(last=False)
+
+    def materialized(self) -> list:
+        # indices of the roads currently held, least recently used first
+        return list(self._entries)
+
+    def geometries(self, i:int) -> network_store.GeometryTable:
+        entry = self.entry(i)
+        if entry.geometries is None:
+            entry.geometries = network_store.GeometryTable.from_roads([entry.road])
+        return entry.geometries
+
+    def reference_line(self, i:int) -> geometry_math.ReferenceLine:
+        entry = self.entry(i)
+        if entry.reference_line is None:
+            entry.reference_line = geometry_math.ReferenceLine.from_table(self.geometries(i), 0, len(self.geometries(i)))
+        return entry.reference_line
+
+    def samples(self, i:int, delta_step:float, max_error:float=None) -> constants.RoadSamples:
+        entry = self.entry(i)
+        samples = entry.samples.get((delta_step, max_error))
+        if samples is None:
+            road = entry.road
+            table = self.geometries(i)
+            samples = table.sample_road(road.id, 0, len(table), delta_step, max_error)
+            samples.z, samples.roll = geometry_math.road_surface(road.elevationProfile.elevation, road.lateralProfile.superelevation,
+                                                                 road.lateralProfile.shape, samples.s)
+            entry.samples[(delta_step, max_error)] = samples
+        return samples
+
+    def roads_near(self, x:float, y:float, max_dist:float=0.0) -> np.ndarray:
+        # indices of the roads whose scan box is within max_dist of (x, y), no road is materialized
+        if self._grid is None:
+            self._grid = spatial_index.GridIndex(np.nan_to_num(self.scan.boxes, posinf=0.0, neginf=0.0))
+        return self._grid.query(x, y, max_dist)
+
+class LazyRoadSamples(Mapping):
+    # road_samples stand-in: road id -> RoadSamples, sampled on first access and kept with the road's LRU entry
+    def __init__(self, roads:LazyRoadSequence, delta_step:float, max_error:float=None):
+        self.roads = roads
+        self.delta_step = delta_step
+        self.max_error = max_error
+
+    def __getitem__(self, road_id:str) -> constants.RoadSamples:
+        i = self.roads.road_index_by_id[road_id]
+        return self.roads.samples(i, self.delta_step, self.max_error)
+
+    def __iter__(self):
+        return iter(self.roads.road_ids)
+
+    def __len__(self):
+        return len(self.roads.road_ids)
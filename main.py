@@ -2,12 +2,35 @@ import os
 import sys
 import constants
 import road_network
+import network_cache
+import sample_export
 import argparse
 import logging
+import instrumentation
+import validation
 
 def add_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument("--xodr", type=str, required=True)
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used to parse and sample roads")
+    parser.add_argument("--stream", action="store_true", help="parse the xodr with the streaming (iterparse) loader")
+    parser.add_argument("--lazy", action="store_true", help="scan road offsets only and parse/sample each road on first access (no --cache)")
+    parser.add_argument("--max-lazy-roads", type=int, default=256, help="roads kept materialized with --lazy")
+    parser.add_argument("--delta-step", type=float, default=0.1, help="reference line sampling step in meters")
+    parser.add_argument("--max-chord-error", type=float, default=None, help="sample with curvature-adaptive steps bounded by this chordal error in meters instead of --delta-step")
+    parser.add_argument("--cache", action="store_true", help="load/store the parsed and sampled network in the on-disk cache")
+    parser.add_argument("--cache-dir", type=str, default=network_cache.DEFAULT_CACHE_DIR)
+    parser.add_argument("--export-samples", type=str, default="", help="write the sampled network to a memory-mappable file")
+    parser.add_argument("--profile", action="store_true", help="collect per-stage timers and counters and print them at exit")
+    parser.add_argument("--trace", type=str, default="", help="write per-stage timings as a Chrome trace (implies --profile)")
+    parser.add_argument("--render", type=str, default="", help="write the whole sampled map as a PNG (or .npy) image")
+    parser.add_argument("--tiles", type=str, default="", help="write a {zoom}/{x}/{y}.png tile pyramid into this directory")
+    parser.add_argument("--max-zoom", type=int, default=4, help="deepest zoom level of --tiles")
+    parser.add_argument("--plot", action="store_true", help="show the sampled map in a window")
+    parser.add_argument("--validate", action="store_true", help="check geometry, link and junction continuity and road lengths, exit 1 on any violation")
+    parser.add_argument("--position-tolerance", type=float, default=validation.POSITION_TOLERANCE, help="--validate position and length tolerance in meters")
+    parser.add_argument("--heading-tolerance", type=float, default=validation.HEADING_TOLERANCE, help="--validate heading tolerance in radians")
+    parser.add_argument("--cache-max-mb", type=int, default=2048, help="evict least recently used cache entries beyond this size")
     return parser.parse_args()
 
 def config_logging():
@@ -23,11 +46,43 @@ if __name__ == "__main__":
 
     args = add_arguments()
     xodr_file = args.xodr
+    if args.profile or args.trace:
+        instrumentation.enable(trace=bool(args.trace))
 
-    road_network = road_network.RoadNetwork(xodr_file)
-    if road_network.parse_xodr() != constants.ErrorCode.OK:
+    if args.lazy and args.cache:
+        logging.warning("--cache is ignored with --lazy, the cache stores fully sampled networks")
+    road_network = road_network.RoadNetwork(xodr_file, workers=args.workers, max_lazy_roads=args.max_lazy_roads)
+    cache = network_cache.NetworkCache(args.cache_dir, args.cache_max_mb << 20) if args.cache and not args.lazy else None
+    if cache is not None and cache.load(road_network, args.delta_step, args.max_chord_error):
+        logging.info(f"XODR file loaded from cache: {xodr_file}")
+    elif road_network.parse_xodr(stream=args.stream, lazy=args.lazy) != constants.ErrorCode.OK:
         logging.error(f"Failed to parse xodr file: {xodr_file}")
         sys.exit(1)
     else:
-        road_network.sample_roads()
+        road_network.sample_roads(args.delta_step, plot=False, max_error=args.max_chord_error)
+        if cache is not None:
+            cache.save(road_network, args.delta_step, args.max_chord_error)
         logging.info(f"XODR file parsed successfully: {xodr_file}")
+    issues = []
+    if args.validate:
+        issues = road_network.validate(args.position_tolerance, args.heading_tolerance, args.position_tolerance)
+        for issue in issues:
+            logging.warning(validation.describe(issue))
+    if args.export_samples:
+        sample_export.export_samples(args.export_samples, road_network)
+        logging.info(f"samples exported to {args.export_samples}")
+    if args.render:
+        with instrumentation.timer('render/map'):
+            road_network.plot_samples(args.render)
+    if args.tiles:
+        with instrumentation.timer('render/tiles'):
+            road_network.renderer().render_pyramid(args.tiles, args.max_zoom, workers=args.workers)
+    if args.profile or args.trace:
+        logging.info(f"stage timings:\n{instrumentation.report()}")
+    if args.trace:
+        instrumentation.export_trace(args.trace)
+        logging.info(f"trace written to {args.trace}")
+    if args.plot:
+        road_network.plot_samples()
+    if issues:
+        sys.exit(1)
@@ -0,0 +1,134 @@
+import json
+import socket
+import asyncio
+import itertools
+
+# map_server 的客户端：MapClient 为阻塞式（一问一答），AsyncMapClient 可在一条连接上并发发送多个请求，
+# 按 id 匹配响应。两者接口相同，结果为 dict（坐标为标量或 list，与请求对应）。
+
+DEFAULT_PORT = 8765
+
+class MapQueryError(Exception):
+    pass
+
+def _request(op:str, **fields) -> dict:
+    fields['op'] = op
+    return fields
+
+def _result(response:dict):
+    if 'error' in response:
+        raise MapQueryError(response['error'])
+    return response['result']
+
+def _as_json(value):
+    # numpy arrays and scalars as plain JSON values
+    return value.tolist() if hasattr(value, 'tolist') else value
+
+class MapClient:
+    def __init__(self, host:str='127.0.0.1', port:int=DEFAULT_PORT, unix_path:str='', timeout:float=30.0):
+        if unix_path:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(timeout)
+            self._socket.connect(unix_path)
+        else:
+            self._socket = socket.create_connection((host, port), timeout)
+        self._file = self._socket.makefile('rwb')
+        self._ids = itertools.count()
+
+    def call(self, request:dict):
+        request['id'] = next(self._ids)
+        self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('map server closed the connection')
+        return _result(json.loads(line))
+
+    def st_to_xy(self, road_id:str, s, t=0.0) -> dict:
+        return self.call(_request('st_to_xy', road_id=road_id, s=_as_json(s), t=_as_json(t)))
+
+    def xy_to_st(self, road_id:str, x, y) -> dict:
+        return self.call(_request('xy_to_st', road_id=road_id, x=_as_json(x), y=_as_json(y)))
+
+    def locate(self, x, y, max_dist:float=5.0) -> dict:
+        return self.call(_request('locate', x=_as_json(x), y=_as_json(y), max_dist=max_dist))
+
+    def route(self, from_road:str, from_lane:int, to_road:str, to_lane:int, from_s:float=None, to_s:float=None) -> dict:
+        return self.call(_request('route', from_road=from_road, from_lane=from_lane, to_road=to_road, to_lane=to_lane,
+                                  from_s=from_s, to_s=to_s))
+
+    def stats(self) -> dict:
+        return self.call(_request('stats'))
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class AsyncMapClient:
+    # await AsyncMapClient.connect(...); requests from many tasks share the connection
+    def __init__(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count()
+        self._waiting = {} # id -> future
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @staticmethod
+    async def connect(host:str='127.0.0.1', port:int=DEFAULT_PORT, unix_path:str='') -> 'AsyncMapClient':
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return AsyncMapClient(reader, writer)
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('map server closed the connection'))
+            self._waiting.clear()
+
+    async def call(self, request:dict):
+        request['id'] = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request['id']] = future
+        self._writer.write(json.dumps(request).encode('utf-8') + b'\n')
+        await self._writer.drain()
+        return _result(await future)
+
+    async def st_to_xy(self, road_id:str, s, t=0.0) -> dict:
+        return await self.call(_request('st_to_xy', road_id=road_id, s=_as_json(s), t=_as_json(t)))
+
+    async def xy_to_st(self, road_id:str, x, y) -> dict:
+        return await self.call(_request('xy_to_st', road_id=road_id, x=_as_json(x), y=_as_json(y)))
+
+    async def locate(self, x, y, max_dist:float=5.0) -> dict:
+        return await self.call(_request('locate', x=_as_json(x), y=_as_json(y), max_dist=max_dist))
+
+    async def route(self, from_road:str, from_lane:int, to_road:str, to_lane:int, from_s:float=None, to_s:float=None) -> dict:
+        return await self.call(_request('route', from_road=from_road, from_lane=from_lane, to_road=to_road, to_lane=to_lane,
+                                        from_s=from_s, to_s=to_s))
+
+    async def stats(self) -> dict:
+        return await self.call(_request('stats'))
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._receiver.cancel()
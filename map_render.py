@@ -0,0 +1,275 @@
+import os
+import logging
+import numpy as np
+from matplotlib import image as mpl_image
+import worker_pool
+
+# 无界面地图栅格化：采样点按道路拼成折线，按缩放级别抽稀（点距约 1 像素），
+# 直接用 NumPy 把线段栅格化为覆盖度数组，输出 PNG 或 .npy 瓦片。
+# 瓦片金字塔以 header 的 west/north 为左上角，zoom z 有 2^z x 2^z 张正方形瓦片，行号自北向南递增。
+
+DEFAULT_TILE_SIZE = 256
+ROAD_COLOR = (255, 0, 0) # RGB of road pixels in PNG output, the background is transparent
+
+class Polylines:
+    # concatenated points of many polylines, polyline i is points [offsets[i], offsets[i+1])
+    def __init__(self, x:np.ndarray, y:np.ndarray, offsets:np.ndarray):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    @staticmethod
+    def from_samples(road_samples) -> 'Polylines':
+        # road_samples: road id -> RoadSamples (or anything with x and y arrays)
+        samples = list(road_samples.values())
+        if not samples:
+            return Polylines(np.empty(0), np.empty(0), np.zeros(1, dtype=np.int64))
+        counts = [len(s.x) for s in samples]
+        return Polylines(np.concatenate([s.x for s in samples]), np.concatenate([s.y for s in samples]),
+                         np.concatenate(([0], np.cumsum(counts))))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def bounds(self):
+        # (west, south, east, north) of all points
+        if len(self.x) == 0:
+            return 0.0, 0.0, 0.0, 0.0
+        return float(self.x.min()), float(self.y.min()), float(self.x.max()), float(self.y.max())
+
+    def decimate(self, step:float) -> 'Polylines':
+        # keep the first and last point of every polyline and about one point per step of arc length
+        n = len(self.x)
+        if n == 0 or step <= 0.0:
+            return self
+        starts = self.offsets[:-1][np.diff(self.offsets) > 0]
+        ds = np.hypot(np.diff(self.x, prepend=self.x[0]), np.diff(self.y, prepend=self.y[0]))
+        ds[starts] = 0.0
+        arc = np.cumsum(ds)
+        owner = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        arc -= arc[self.offsets[:-1][owner]]
+        bucket = np.floor(arc / step).astype(np.int64)
+        keep = np.ones(n, dtype=bool)
+        keep[1:] = bucket[1:] != bucket[:-1]
+        keep[starts] = True
+        keep[self.offsets[1:][np.diff(self.offsets) > 0] - 1] = True
+        kept_per_line = np.bincount(owner[keep], minlength=len(self))
+        return Polylines(self.x[keep], self.y[keep], np.concatenate(([0], np.cumsum(kept_per_line))))
+
+    def segments(self) -> np.ndarray:
+        # (4, M) x0, y0, x1, y1 of every segment that joins two points of the same polyline
+        if len(self.x) < 2:
+            return np.zeros((4, 0))
+        joined = np.ones(len(self.x) - 1, dtype=bool)
+        breaks = self.offsets[1:-1]
+        joined[breaks[(breaks > 0) & (breaks < len(self.x))] - 1] = False
+        return np.vstack((self.x[:-1][joined], self.y[:-1][joined], self.x[1:][joined], self.y[1:][joined]))
+
+def _clip_segments(segments:np.ndarray, xmin:float, ymin:float, xmax:float, ymax:float) -> np.ndarray:
+    # Liang-Barsky clip of (4, M) segments to a box, segments fully outside are dropped
+    x0, y0, x1, y1 = segments
+    dx, dy = x1 - x0, y1 - y0
+    t0 = np.zeros(len(x0))
+    t1 = np.ones(len(x0))
+    visible = np.ones(len(x0), dtype=bool)
+    for p, q in ((-dx, x0 - xmin), (dx, xmax - x0), (-dy, y0 - ymin), (dy, ymax - y0)):
+        parallel = p == 0.0
+        visible &= ~(parallel & (q < 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = q / p
+        t0 = np.where(~parallel & (p < 0.0), np.maximum(t0, r), t0)
+        t1 = np.where(~parallel & (p > 0.0), np.minimum(t1, r), t1)
+    visible &= t0 <= t1
+    t0, t1 = t0[visible], t1[visible]
+    x0, y0, dx, dy = x0[visible], y0[visible], dx[visible], dy[visible]
+    return np.vstack((x0 + t0*dx, y0 + t0*dy, x0 + t1*dx, y0 + t1*dy))
+
+def rasterize_segments(segments:np.ndarray, width:int, height:int, line_width:int=1) -> np.ndarray:
+    # (4, M) segments in pixel coordinates (x right, y down) -> (height, width) uint8 coverage, 255 on a road
+    raster = np.zeros((height, width), dtype=np.uint8)
+    segments = _clip_segments(segments, -1.0, -1.0, width + 1.0, height + 1.0)
+    if segments.shape[1] == 0:
+        return raster
+    x0, y0, x1, y1 = segments
+    # at most one pixel between consecutive samples along the major axis keeps every line connected
+    counts = np.ceil(np.maximum(np.abs(x1 - x0), np.abs(y1 - y0))).astype(np.int64) + 1
+    segment = np.repeat(np.arange(len(counts)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    t = (np.arange(len(segment)) - first) / np.maximum(counts[segment] - 1, 1)
+    px = np.floor(x0[segment] + t*(x1 - x0)[segment]).astype(np.int64)
+    py = np.floor(y0[segment] + t*(y1 - y0)[segment]).astype(np.int64)
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    raster.ravel()[py[inside]*width + px[inside]] = 255
+    for _ in range(line_width - 1):
+        grown = raster.copy()
+        grown[1:, :] |= raster[:-1, :]
+        grown[:, 1:] |= raster[:, :-1]
+        raster = grown
+    return raster
+
+def to_rgba(raster:np.ndarray, color=ROAD_COLOR) -> np.ndarray:
+    rgba = np.zeros(raster.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = color
+    rgba[..., 3] = raster
+    return rgba
+
+def save_raster(path:str, raster:np.ndarray, color=ROAD_COLOR):
+    # .npy keeps the coverage array, anything else is written as an RGBA PNG
+    if path.endswith('.npy'):
+        np.save(path, raster)
+    else:
+        mpl_image.imsave(path, to_rgba(raster, color), format='png')
+
+class MapRenderer:
+    def __init__(self, polylines:Polylines, bounds=None, tile_size:int=DEFAULT_TILE_SIZE, line_width:int=1):
+        # bounds (west, south, east, north), the points' own extent when missing or empty
+        self.polylines = polylines
+        if bounds is None or not (bounds[2] > bounds[0] and bounds[3] > bounds[1]):
+            bounds = polylines.bounds()
+        self.bounds = tuple(float(v) for v in bounds)
+        self.tile_size = tile_size
+        self.line_width = line_width
+        self.extent = max(self.bounds[2] - self.bounds[0], self.bounds[3] - self.bounds[1], 1e-9)
+        self._levels = {} # zoom -> (segments, segment boxes)
+        self._buckets = {} # zoom -> (tile keys, segments), see _tiles
+
+    def pixel_size(self, zoom:int) -> float:
+        return self.extent / (self.tile_size * (1 << zoom))
+
+    def tile_bounds(self, zoom:int, tx:int, ty:int):
+        size = self.extent / (1 << zoom)
+        west, north = self.bounds[0], self.bounds[3]
+        return west + tx*size, north - (ty + 1)*size, west + (tx + 1)*size, north - ty*size
+
+    def tile_range(self, zoom:int):
+        # tiles covering the bounds at this zoom, (columns, rows)
+        size = self.extent / (1 << zoom)
+        columns = max(int(np.ceil((self.bounds[2] - self.bounds[0]) / size - 1e-9)), 1)
+        rows = max(int(np.ceil((self.bounds[3] - self.bounds[1]) / size - 1e-9)), 1)
+        return columns, rows
+
+    def _level(self, zoom:int):
+        # polylines decimated to about one point per pixel of this zoom, as segments with their boxes
+        level = self._levels.get(zoom)
+        if level is None:
+            segments = self.polylines.decimate(self.pixel_size(zoom)).segments()
+            boxes = np.vstack((np.minimum(segments[0], segments[2]), np.minimum(segments[1], segments[3]),
+                               np.maximum(segments[0], segments[2]), np.maximum(segments[1], segments[3])))
+            level = (segments, boxes)
+            self._levels[zoom] = level
+        return level
+
+    def _tiles(self, zoom:int):
+        # segments of this zoom bucketed by tile: (sorted tile keys ty*columns + tx, segments in key order).
+        # segments longer than half a tile are split first, so every piece touches at most 2 x 2 tiles
+        buckets = self._buckets.get(zoom)
+        if buckets is not None:
+            return buckets
+        segments, _ = self._level(zoom)
+        size = self.extent / (1 << zoom)
+        columns, rows = self.tile_range(zoom)
+        pieces = np.maximum(np.ceil(np.hypot(segments[2] - segments[0], segments[3] - segments[1]) / (0.5*size)), 1).astype(np.int64)
+        owner = np.repeat(np.arange(segments.shape[1]), pieces)
+        k = np.arange(len(owner)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        t0, t1 = k / pieces[owner], (k + 1) / pieces[owner]
+        x0, y0, x1, y1 = segments[:, owner]
+        split = np.vstack((x0 + t0*(x1 - x0), y0 + t0*(y1 - y0), x0 + t1*(x1 - x0), y0 + t1*(y1 - y0)))
+        # tiles under each piece's box, grown by the line width so strokes crossing a tile border are drawn on both sides
+        margin = self.line_width * self.pixel_size(zoom)
+        west, north = self.bounds[0], self.bounds[3]
+        tx0 = np.clip(np.floor((np.minimum(split[0], split[2]) - margin - west) / size), 0, columns - 1).astype(np.int64)
+        tx1 = np.clip(np.floor((np.maximum(split[0], split[2]) + margin - west) / size), 0, columns - 1).astype(np.int64)
+        ty0 = np.clip(np.floor((north - np.maximum(split[1], split[3]) - margin) / size), 0, rows - 1).astype(np.int64)
+        ty1 = np.clip(np.floor((north - np.minimum(split[1], split[3]) + margin) / size), 0, rows - 1).astype(np.int64)
+        keys, members = [], []
+        for dx in (0, 1):
+            for dy in (0, 1):
+                use = (tx0 + dx <= tx1) & (ty0 + dy <= ty1)
+                keys.append((ty0[use] + dy)*columns + tx0[use] + dx)
+                members.append(np.flatnonzero(use))
+        keys = np.concatenate(keys)
+        members = np.concatenate(members)
+        order = np.argsort(keys, kind='stable')
+        buckets = (keys[order], split[:, members[order]])
+        self._buckets[zoom] = buckets
+        return buckets
+
+    def occupied_tiles(self, zoom:int) -> list:
+        # (tx, ty) of the tiles that have road segments at this zoom
+        columns, _ = self.tile_range(zoom)
+        keys = np.unique(self._tiles(zoom)[0])
+        return [(int(key % columns), int(key // columns)) for key in keys]
+
+    def _draw(self, segments:np.ndarray, bounds, width:int, height:int) -> np.ndarray:
+        return draw_segments(segments, bounds, width, height, self.line_width)
+
+    def render(self, bounds, width:int, height:int, zoom:int=None) -> np.ndarray:
+        # (height, width) coverage of the world box bounds = (west, south, east, north); the level of detail
+        # follows the pixel size unless zoom is given
+        west, south, east, north = bounds
+        if zoom is None:
+            pixel = max((east - west) / width, (north - south) / height)
+            zoom = max(int(np.floor(np.log2(self.extent / (self.tile_size * pixel)))), 0)
+        segments, boxes = self._level(zoom)
+        margin = self.line_width * max((east - west) / width, (north - south) / height)
+        visible = (boxes[2] >= west - margin) & (boxes[0] <= east + margin) & (boxes[3] >= south - margin) & (boxes[1] <= north + margin)
+        return self._draw(segments[:, visible], bounds, width, height)
+
+    def tile_segments(self, zoom:int, tx:int, ty:int) -> np.ndarray:
+        # (4, M) world segments that may touch tile (tx, ty)
+        keys, segments = self._tiles(zoom)
+        columns, _ = self.tile_range(zoom)
+        key = ty*columns + tx
+        a, b = np.searchsorted(keys, [key, key + 1])
+        return segments[:, a:b]
+
+    def render_tile(self, zoom:int, tx:int, ty:int) -> np.ndarray:
+        return self._draw(self.tile_segments(zoom, tx, ty), self.tile_bounds(zoom, tx, ty), self.tile_size, self.tile_size)
+
+    def render_map(self, width:int=2048) -> np.ndarray:
+        # the whole bounds in one image width pixels wide
+        west, south, east, north = self.bounds
+        height = max(int(round(width * (north - south) / (east - west))), 1)
+        return self.render(self.bounds, width, height)
+
+    def render_pyramid(self, out_dir:str, max_zoom:int, workers:int=1, fmt:str='png') -> int:
+        # writes out_dir/{zoom}/{tx}/{ty}.{fmt} for zooms 0..max_zoom, tiles without roads are skipped;
+        # returns the number of tiles written
+        tiles = [(zoom, tx, ty) for zoom in range(max_zoom + 1) for tx, ty in self.occupied_tiles(zoom)]
+        if workers > 1:
+            # buckets are built above; each task carries only the segments of its own tiles, not the renderer
+            executor = worker_pool.shared_pool(workers)
+            futures = []
+            for chunk in (tiles[i::workers * 4] for i in range(workers * 4)):
+                jobs = [(zoom, tx, ty, self.tile_bounds(zoom, tx, ty), self.tile_segments(zoom, tx, ty)) for zoom, tx, ty in chunk]
+                futures.append(executor.submit(_render_tile_shard, out_dir, jobs, self.tile_size, self.line_width, fmt))
+            written = sum(future.result() for future in futures)
+        else:
+            written = _render_tiles(self, out_dir, tiles, fmt)
+        logging.info(f'rendered {written} tiles up to zoom {max_zoom} into {out_dir}')
+        return written
+
+def draw_segments(segments:np.ndarray, bounds, width:int, height:int, line_width:int=1) -> np.ndarray:
+    # (4, M) world segments -> (height, width) coverage of the world box bounds = (west, south, east, north)
+    west, south, east, north = bounds
+    sx = width / (east - west)
+    sy = height / (north - south)
+    pixels = np.vstack(((segments[0] - west)*sx, (north - segments[1])*sy, (segments[2] - west)*sx, (north - segments[3])*sy))
+    return rasterize_segments(pixels, width, height, line_width)
+
+def _save_tile(out_dir:str, zoom:int, tx:int, ty:int, raster:np.ndarray, fmt:str) -> bool:
+    if not raster.any():
+        return False
+    tile_dir = os.path.join(out_dir, str(zoom), str(tx))
+    os.makedirs(tile_dir, exist_ok=True)
+    save_raster(os.path.join(tile_dir, f'{ty}.{fmt}'), raster)
+    return True
+
+def _render_tiles(renderer:MapRenderer, out_dir:str, tiles:list, fmt:str) -> int:
+    return sum(_save_tile(out_dir, zoom, tx, ty, renderer.render_tile(zoom, tx, ty), fmt) for zoom, tx, ty in tiles)
+
+# process pool worker, module level so it can be pickled
+def _render_tile_shard(out_dir:str, jobs:list, tile_size:int, line_width:int, fmt:str) -> int:
+    # jobs: (zoom, tx, ty, tile bounds, tile segments)
+    return sum(_save_tile(out_dir, zoom, tx, ty, draw_segments(segments, bounds, tile_size, tile_size, line_width), fmt)
+               for zoom, tx, ty, bounds, segments in jobs)
@@ -0,0 +1,326 @@
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import constants
+import road_network
+import instrumentation
+
+# 本地查询服务：路网只加载一次，通过 Unix socket 或 127.0.0.1 TCP 为多个客户端提供
+# st→xy、xy→st、locate、route 查询。协议为逐行 JSON（请求/响应按 id 对应，响应可能乱序）。
+# 同类请求在一个很短的窗口内合并成一次向量化调用；计算在单独的线程中串行执行，事件循环只负责收发。
+#
+# 请求示例：
+#   {"id": 1, "op": "st_to_xy", "road_id": "3", "s": [0.0, 1.5], "t": 0.0}
+#   {"id": 2, "op": "xy_to_st", "road_id": "3", "x": 10.0, "y": 4.0}
+#   {"id": 3, "op": "locate", "x": [10.0], "y": [4.0], "max_dist": 5.0}
+#   {"id": 4, "op": "route", "from_road": "3", "from_lane": -1, "to_road": "7", "to_lane": -1}
+# 响应：{"id": 1, "result": {...}} 或 {"id": 1, "error": "..."}
+
+DEFAULT_PORT = 8765
+DEFAULT_WINDOW_S = 0.002 # how long the first request of a batch waits for others
+DEFAULT_MAX_BATCH = 4096 # requests per batch, a full batch is flushed without waiting
+
+class QueryError(Exception):
+    pass
+
+def _points(request:dict, *names, defaults:dict=None):
+    # request fields as equally long float arrays, plus whether they were all scalars; fields in defaults may be left out
+    defaults = defaults or {}
+    fields = [request.get(name, defaults[name]) if name in defaults else request[name] for name in names]
+    values = [np.atleast_1d(np.asarray(field, dtype=np.float64)) for field in fields]
+    scalar = all(np.ndim(field) == 0 for field in fields)
+    n = max(len(v) for v in values)
+    for name, v in zip(names, values):
+        if v.ndim != 1 or len(v) not in (1, n):
+            raise QueryError(f'{name} must be a number or a list as long as the others')
+    return [np.broadcast_to(v, n) for v in values], scalar
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+def _split(values:np.ndarray, sizes:list, scalars:list) -> list:
+    # per request slices of a batched result, scalars unwrapped
+    parts = np.split(values, np.cumsum(sizes)[:-1])
+    return [part.tolist()[0] if scalar else part.tolist() for part, scalar in zip(parts, scalars)]
+
+class MapQueryService:
+    # vectorized batch handlers over one RoadNetwork; each handler takes a list of requests and
+    # returns one result (or QueryError) per request
+    def __init__(self, network:road_network.RoadNetwork):
+        self.network = network
+        self.handlers = {
+            'st_to_xy':self.st_to_xy,
+            'xy_to_st':self.xy_to_st,
+            'locate':self.locate,
+            'route':self.route,
+        }
+
+    def prepare(self):
+        # build the lazily created indexes up front so the first queries do not pay for them;
+        # a lazily parsed network keeps its cheap startup and builds them on first use
+        if self.network.lazy_roads is not None:
+            return
+        self.network.build_spatial_index()
+        self.network.routing_graph()
+
+    def run(self, op:str, requests:list) -> list:
+        with instrumentation.timer(f'server/{op}'):
+            return self.handlers[op](requests)
+
+    def _by_road(self, requests:list, names:tuple, fn, defaults:dict=None) -> list:
+        # one call of fn(road_id, *arrays) per road over the concatenated points of its requests; when that call
+        # rejects the batch (e.g. one s beyond the road), the road's requests are rerun one at a time so only
+        # the bad ones fail
+        results = [None] * len(requests)
+        groups = {}
+        for i, request in enumerate(requests):
+            try:
+                member = (i, *_points(request, *names, defaults=defaults))
+                road_id = str(request['road_id'])
+            except (KeyError, ValueError, TypeError, QueryError) as e:
+                results[i] = e if isinstance(e, QueryError) else QueryError(f'bad request: {e!r}')
+                continue
+            groups.setdefault(road_id, []).append(member)
+        for road_id, members in groups.items():
+            try:
+                self._evaluate_road(results, road_id, members, names, fn)
+            except KeyError:
+                for i, _, _ in members:
+                    results[i] = QueryError(f'unknown road {road_id}')
+            except (ValueError, TypeError):
+                for member in members:
+                    try:
+                        self._evaluate_road(results, road_id, [member], names, fn)
+                    except (ValueError, TypeError) as e:
+                        results[member[0]] = QueryError(f'bad request: {e}')
+        return results
+
+    @staticmethod
+    def _evaluate_road(results:list, road_id:str, members:list, names:tuple, fn):
+        arrays = [np.concatenate([values[k] for _, values, _ in members]) for k in range(len(names))]
+        outputs = fn(road_id, *arrays)
+        sizes = [len(values[0]) for _, values, _ in members]
+        scalars = [scalar for _, _, scalar in members]
+        columns = {name:_split(np.asarray(column), sizes, scalars) for name, column in outputs.items()}
+        for k, (i, _, _) in enumerate(members):
+            results[i] = {name:column[k] for name, column in columns.items()}
+
+    def st_to_xy(self, requests:list) -> list:
+        def evaluate(road_id, s, t):
+            x, y, hdg, curvature = self.network.st_to_xy(road_id, s, t)
+            return {'x':x, 'y':y, 'hdg':hdg, 'curvature':curvature}
+        return self._by_road(requests, ('s', 't'), evaluate, defaults={'t':0.0})
+
+    def xy_to_st(self, requests:list) -> list:
+        def project(road_id, x, y):
+            s, t, dist2 = self.network.xy_to_st(road_id, x, y)
+            return {'s':s, 't':t, 'dist':np.sqrt(dist2)}
+        return self._by_road(requests, ('x', 'y'), project)
+
+    def locate(self, requests:list) -> list:
+        # one locate_lanes call per distinct max_dist over every point of the batch
+        results = [None] * len(requests)
+        groups = {}
+        for i, request in enumerate(requests):
+            try:
+                max_dist = float(request.get('max_dist', 5.0))
+                groups.setdefault(max_dist, []).append((i, *_points(request, 'x', 'y')))
+            except (KeyError, ValueError, TypeError, QueryError) as e:
+                results[i] = e if isinstance(e, QueryError) else QueryError(f'bad request: {e!r}')
+        for max_dist, members in groups.items():
+            x = np.concatenate([values[0] for _, values, _ in members])
+            y = np.concatenate([values[1] for _, values, _ in members])
+            positions = self.network.locate_lanes(np.column_stack((x, y)), max_dist)
+            sizes = [len(values[0]) for _, values, _ in members]
+            scalars = [scalar for _, _, scalar in members]
+            columns = {
+                'road_id':_split(np.where(positions.road_index >= 0, positions.road_id, None), sizes, scalars),
+                'section':_split(positions.section, sizes, scalars),
+                'lane_id':_split(positions.lane_id, sizes, scalars),
+                's':_split(positions.s, sizes, scalars),
+                't':_split(positions.t, sizes, scalars),
+                'dist':_split(positions.dist, sizes, scalars),
+            }
+            for k, (i, _, _) in enumerate(members):
+                results[i] = {name:column[k] for name, column in columns.items()}
+        return results
+
+    def route(self, requests:list) -> list:
+        # searches are not vectorized, identical requests in a batch share one search (the graph also caches)
+        results = [None] * len(requests)
+        found = {}
+        for i, request in enumerate(requests):
+            try:
+                key = (str(request['from_road']), int(request['from_lane']), str(request['to_road']), int(request['to_lane']),
+                       _optional_float(request.get('from_s')), _optional_float(request.get('to_s')))
+            except (KeyError, ValueError, TypeError) as e:
+                results[i] = QueryError(f'bad request: {e!r}')
+                continue
+            if key not in found:
+                try:
+                    route = self.network.route(*key)
+                    found[key] = None if route is None else {'road_ids':route.road_ids, 'sections':route.sections,
+                                                             'lane_ids':route.lane_ids, 'length':route.length}
+                except KeyError as e:
+                    found[key] = QueryError(f'unknown road {e}')
+                except (ValueError, TypeError) as e:
+                    found[key] = QueryError(f'bad request: {e!r}')
+            results[i] = found[key]
+        return results
+
+class QueryBatcher:
+    # collects requests per op; a batch is run window seconds after its first request, or as soon
+    # as it holds max_batch requests. Batches run one at a time on a single worker thread
+    def __init__(self, service:MapQueryService, window:float=DEFAULT_WINDOW_S, max_batch:int=DEFAULT_MAX_BATCH):
+        self.service = service
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {} # op -> [(request, future)]
+        self._timers = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='map_query')
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, request:dict) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        op = request.get('op')
+        if op not in self.service.handlers:
+            future.set_exception(QueryError(f'unknown op {op!r}'))
+            return future
+        pending = self._pending.setdefault(op, [])
+        pending.append((request, future))
+        if len(pending) >= self.max_batch:
+            self._flush(op)
+        elif op not in self._timers:
+            self._timers[op] = loop.call_later(self.window, self._flush, op)
+        return future
+
+    def _flush(self, op:str):
+        timer = self._timers.pop(op, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(op, [])
+        if batch:
+            asyncio.ensure_future(self._run(op, batch))
+
+    async def _run(self, op:str, batch:list):
+        self.batches += 1
+        self.requests += len(batch)
+        instrumentation.count('server/batches')
+        instrumentation.count('server/requests', len(batch))
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self._executor, self.service.run, op,
+                                                                       [request for request, _ in batch])
+        except Exception as e:
+            logging.exception(f'{op} batch of {len(batch)} requests failed')
+            results = [QueryError(f'{op} failed: {e!r}')] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {'batches':self.batches, 'requests':self.requests,
+                'mean_batch':self.requests / self.batches if self.batches else 0.0}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+class MapServer:
+    def __init__(self, network:road_network.RoadNetwork, window:float=DEFAULT_WINDOW_S, max_batch:int=DEFAULT_MAX_BATCH):
+        self.service = MapQueryService(network)
+        self.batcher = QueryBatcher(self.service, window, max_batch)
+        self._server = None
+
+    async def start(self, host:str='127.0.0.1', port:int=DEFAULT_PORT, unix_path:str=''):
+        # port 0 picks a free port, see address()
+        self.service.prepare()
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._serve, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._serve, host, port)
+        logging.info(f'map server listening on {self.address()}')
+        return self
+
+    def address(self):
+        return self._server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self.batcher.close()
+
+    async def _serve(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _answer(self, line:bytes, writer:asyncio.StreamWriter, write_lock:asyncio.Lock):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            if request.get('op') == 'stats':
+                response = {'id':request_id, 'result':self.batcher.stats()}
+            else:
+                response = {'id':request_id, 'result':await self.batcher.submit(request)}
+        except (ValueError, AttributeError) as e:
+            response = {'id':request_id, 'error':f'malformed request: {e}'}
+        except QueryError as e:
+            response = {'id':request_id, 'error':str(e)}
+        async with write_lock:
+            writer.write(json.dumps(response).encode('utf-8') + b'\n')
+            await writer.drain()
+
+def add_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--xodr", type=str, required=True)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", type=str, default="", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_S * 1e3, help="batching window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--lazy", action="store_true", help="parse roads on first access")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s--%(filename)s[%(lineno)d][%(levelname)s]--%(message)s", level=logging.INFO)
+    args = add_arguments()
+    network = road_network.RoadNetwork(args.xodr)
+    if network.parse_xodr(lazy=args.lazy) != constants.ErrorCode.OK:
+        logging.error(f"Failed to parse xodr file: {args.xodr}")
+        sys.exit(1)
+    server = MapServer(network, args.window_ms * 1e-3, args.max_batch)
+
+    async def serve():
+        await server.start(args.host, args.port, args.unix)
+        await server.serve_forever()
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
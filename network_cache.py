@@ -0,0 +1,160 @@
+import os
+import time
+import shutil
+import tempfile
+import pickle
+import hashlib
+import logging
+import network_store
+
+# 解析 + 采样结果的磁盘缓存：key = 文件内容哈希 + 采样步长（或自适应采样的弦高误差）+ 缓存格式版本，
+# 每个条目一个目录，数组以 .npy 存储并以 mmap 方式加载。条目在临时目录写完后 rename 发布，
+# 删除前先 rename 移走，读者在条目名下只会看到完整条目或看不到条目
+
+CACHE_VERSION = 7
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'py_xodr')
+
+def file_digest(file_path:str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class NetworkCache:
+    def __init__(self, cache_dir:str=DEFAULT_CACHE_DIR, max_bytes:int=2 << 30):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, xodr_file:str, delta_step:float, max_error:float=None) -> str:
+        sampling = f'{delta_step!r}' if max_error is None else f'e{max_error!r}'
+        return f'v{CACHE_VERSION}-{file_digest(xodr_file)}-{sampling}'
+
+    def entry_path(self, key:str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, network, delta_step:float, max_error:float=None) -> bool:
+        # fill network from the cache, returns False on a miss or an unreadable entry
+        if not os.path.exists(network.xodr_file):
+            return False
+        key = self.key(network.xodr_file, delta_step, max_error)
+        path = self.entry_path(key)
+        if not os.path.isdir(path):
+            logging.info(f'network cache miss: {key}')
+            return False
+        try:
+            meta, store = self._read(path)
+        except Exception as e:
+            # e.g. evicted by another process while being read; a later save replaces an entry that stays unreadable
+            logging.warning(f'network cache entry {key} is unreadable, treated as a miss: {str(e)}')
+            return False
+        network.set_store(store)
+        network.sample_params = (delta_step, max_error)
+        network.odr_doc['header'] = meta['header']
+        network.odr_doc['junctions'] = meta['junctions']
+        try:
+            os.utime(path) # mark as recently used for eviction
+        except OSError:
+            pass # evicted meanwhile, the mapped arrays stay valid
+        logging.info(f'network cache hit: {key}')
+        return True
+
+    @staticmethod
+    def _read(path:str):
+        # (meta, memory-mapped store) of one entry directory, raises if it is incomplete
+        with open(os.path.join(path, 'meta.pkl'), 'rb') as f:
+            meta = pickle.load(f)
+        if meta['version'] != CACHE_VERSION:
+            raise ValueError(f"cache version {meta['version']} != {CACHE_VERSION}")
+        return meta, network_store.NetworkStore.load(os.path.join(path, 'store'), mmap_mode='r')
+
+    def save(self, network, delta_step:float, max_error:float=None):
+        # the network must be parsed and sampled; it is compacted if it is not already
+        if network.store is None:
+            network.compact()
+        key = self.key(network.xodr_file, delta_step, max_error)
+        path = self.entry_path(key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=f'{key}.tmp', dir=self.cache_dir)
+        network.store.save(os.path.join(tmp_path, 'store'))
+        meta = {
+            'version':CACHE_VERSION,
+            'xodr_file':os.path.abspath(network.xodr_file),
+            'delta_step':delta_step,
+            'max_error':max_error,
+            'created':time.time(),
+            'header':network.odr_doc['header'],
+            'junctions':network.odr_doc['junctions'],
+        }
+        with open(os.path.join(tmp_path, 'meta.pkl'), 'wb') as f:
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # rename of a directory onto an existing one fails, so if a concurrent writer of the same key published
+        # first its entry (with the same content) is kept and ours is dropped. only an entry that cannot be
+        # read is moved away; the retry covers an entry retired between our rename and our check
+        for _ in range(3):
+            try:
+                os.rename(tmp_path, path)
+                logging.info(f'network cache stored: {key}')
+                break
+            except OSError:
+                if not os.path.isdir(path):
+                    continue
+                try:
+                    self._read(path)
+                except Exception:
+                    self._retire(path)
+                    continue
+                logging.info(f'network cache entry {key} was stored concurrently, keeping it')
+                break
+        else:
+            logging.warning(f'network cache entry {key} could not be published')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def _retire(self, path:str):
+        # delete an entry without readers ever seeing it half deleted: move it to a temporary name first
+        trash_path = f'{path}.tmp{os.getpid()}-{time.time_ns()}'
+        try:
+            os.rename(path, trash_path)
+        except OSError:
+            return # already retired by someone else
+        shutil.rmtree(trash_path, ignore_errors=True)
+
+    def entries(self) -> list:
+        # [(path, size in bytes, last use)], oldest first
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path) or '.tmp' in name:
+                continue
+            try:
+                size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+                entries.append((path, size, os.path.getmtime(path)))
+            except OSError:
+                continue # retired by another process meanwhile
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self):
+        # drop least recently used entries until the cache fits max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self._retire(path)
+            total -= size
+            logging.info(f'network cache evicted: {os.path.basename(path)}')
+
+    def invalidate(self, xodr_file:str=None):
+        # remove the entries of one source file, or the whole cache
+        for path, _, _ in self.entries():
+            if xodr_file is not None:
+                try:
+                    with open(os.path.join(path, 'meta.pkl'), 'rb') as f:
+                        if pickle.load(f)['xodr_file'] != os.path.abspath(xodr_file):
+                            continue
+                except Exception:
+                    pass
+            self._retire(path)
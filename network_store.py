@@ -0,0 +1,550 @@
+import os
+import pickle
+import numpy as np
+import constants
+import geometry_math
+import instrumentation
+from typing import List
+
+# 结构化数组（SoA）存储整张路网的几何段和采样点，
+# 通过 __slots__ 视图对象保持 odr_doc['roads'] 的访问方式不变
+
+LINE_TYPES = list(constants.LineType)
+POLY_CODES = (constants.LineType.POLY3.value, constants.LineType.PARAM_POLY3.value)
+# instrumentation names per geometry type code, built once so the disabled path formats nothing
+SAMPLE_TIMERS = tuple(f'sample/{line_type.name.lower()}' for line_type in LINE_TYPES)
+SAMPLE_COUNTERS = tuple(f'sample/{line_type.name.lower()}_points' for line_type in LINE_TYPES)
+
+# columns of the flat sample buffer
+SAMPLE_S = 0
+SAMPLE_X = 1
+SAMPLE_Y = 2
+SAMPLE_HDG = 3
+SAMPLE_Z = 4
+SAMPLE_ROLL = 5
+SAMPLE_COLUMNS = 6
+
+class GeometryTable:
+    ARRAYS = ('type_code', 's', 'x', 'y', 'hdg', 'length',
+              'curv_start', 'curv_end', 'poly3', 'param_poly3', 'p_range', 'road_index')
+    __slots__ = ARRAYS + ('_spiral_projectors', '_param_poly3_curves')
+
+    def __init__(self, n:int=0):
+        self.type_code = np.zeros(n, dtype=np.int8)
+        self.s = np.zeros(n)
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.hdg = np.zeros(n)
+        self.length = np.zeros(n)
+        # arc: curv_start == curv_end == curvature, line: both 0
+        self.curv_start = np.zeros(n)
+        self.curv_end = np.zeros(n)
+        self.poly3 = np.zeros((n, 4)) # a, b, c, d
+        # poly3 and paramPoly3 as u(p), v(p) coefficients aU, bU, cU, dU, aV, bV, cV, dV;
+        # p_range is the largest p (1 normalized, length for arcLength), 0 for poly3 where p = u is solved from length
+        self.param_poly3 = np.zeros((n, 8))
+        self.p_range = np.zeros(n)
+        self.road_index = np.zeros(n, dtype=np.int32)
+        self._spiral_projectors = {} # geometry index -> SpiralProjector, built on first projection
+        self._param_poly3_curves = {} # geometry index -> ParamPoly3Curve with its arc-length table, built on first use
+
+    def __len__(self):
+        return len(self.s)
+
+    @staticmethod
+    def from_roads(roads) -> 'GeometryTable':
+        n = sum(len(road.planview.geometry_list) for road in roads)
+        table = GeometryTable(n)
+        i = 0
+        for road_index, road in enumerate(roads):
+            for geometry in road.planview.geometry_list:
+                table.type_code[i] = geometry.ref_line_type.value
+                table.s[i] = geometry.s
+                table.x[i] = geometry.x
+                table.y[i] = geometry.y
+                table.hdg[i] = geometry.hdg
+                table.length[i] = geometry.length
+                if geometry.ref_line_type == constants.LineType.CIRCULAR_ARC:
+                    table.curv_start[i] = geometry.arc.curvature
+                    table.curv_end[i] = geometry.arc.curvature
+                elif geometry.ref_line_type == constants.LineType.SPIRAL:
+                    table.curv_start[i] = geometry.spiral.curvStart
+                    table.curv_end[i] = geometry.spiral.curvEnd
+                elif geometry.ref_line_type == constants.LineType.POLY3:
+                    table.poly3[i] = (geometry.poly3.a, geometry.poly3.b, geometry.poly3.c, geometry.poly3.d)
+                    table.param_poly3[i] = (0.0, 1.0, 0.0, 0.0) + tuple(table.poly3[i])
+                elif geometry.ref_line_type == constants.LineType.PARAM_POLY3:
+                    param_poly3 = geometry.param_poly3
+                    table.param_poly3[i] = (param_poly3.aU, param_poly3.bU, param_poly3.cU, param_poly3.dU,
+                                            param_poly3.aV, param_poly3.bV, param_poly3.cV, param_poly3.dV)
+                    table.p_range[i] = geometry.length if param_poly3.pRange == 'arcLength' else 1.0
+                table.road_index[i] = road_index
+                i += 1
+        return table
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def subset(self, start:int, stop:int) -> 'GeometryTable':
+        # rows [start, stop) as an independent table, road_index rebased to the first road of the range
+        table = GeometryTable()
+        for name in self.ARRAYS:
+            setattr(table, name, getattr(self, name)[start:stop].copy())
+        if stop > start:
+            table.road_index -= table.road_index[0]
+        return table
+
+    def splice(self, n_roads:int, other:'GeometryTable', n_other:int, source:np.ndarray):
+        # table of the roads listed in source, in that order: road source[r] of this table when source[r] >= 0,
+        # road -source[r]-1 of other otherwise. returns it with row_map, the new row of each row of this table
+        # followed by those of other (-1 when dropped); built projectors and curves follow their rows
+        source = np.asarray(source, dtype=np.int64)
+        own = self.road_geometry_offsets(n_roads)
+        theirs = other.road_geometry_offsets(n_other) + len(self)
+        from_other = source < 0
+        road = np.where(from_other, -source - 1, source)
+        starts = np.empty(len(source), dtype=np.int64)
+        counts = np.empty(len(source), dtype=np.int64)
+        for offsets, members in ((own, ~from_other), (theirs, from_other)):
+            starts[members] = offsets[road[members]]
+            counts[members] = offsets[road[members] + 1] - starts[members]
+        rows = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+        table = GeometryTable()
+        for name in self.ARRAYS:
+            setattr(table, name, np.concatenate((getattr(self, name), getattr(other, name)))[rows])
+        table.road_index = np.repeat(np.arange(len(source), dtype=np.int32), counts)
+        row_map = np.full(len(self) + len(other), -1, dtype=np.int64)
+        row_map[rows] = np.arange(len(rows))
+        for cache_name in ('_spiral_projectors', '_param_poly3_curves'):
+            cache = getattr(table, cache_name)
+            for offset, source_table in ((0, self), (len(self), other)):
+                for j, value in getattr(source_table, cache_name).items():
+                    if row_map[offset + j] >= 0:
+                        cache[int(row_map[offset + j])] = value
+        return table, row_map
+
+    def road_geometry_offsets(self, n_roads:int) -> np.ndarray:
+        # geometries of road i are rows [offsets[i], offsets[i+1]), rows are grouped by road
+        return np.searchsorted(self.road_index, np.arange(n_roads + 1)).astype(np.int64)
+
+    def max_curvature(self, j:int) -> float:
+        # curvature is linear along a spiral, so its largest magnitude is at one of the ends
+        if self.type_code[j] in POLY_CODES:
+            return self.param_poly3_curve(j).max_curvature()
+        return max(abs(self.curv_start[j]), abs(self.curv_end[j]))
+
+    def sample(self, j:int, delta_step:float):
+        # one np.arange of s per geometry, evaluated in one vectorized pass, returns local s, x, y, hdg
+        s_local = np.arange(0.0, self.length[j], delta_step)
+        x, y, hdg = self.pose(j, s_local)
+        return s_local, x, y, hdg
+
+    def sample_adaptive(self, j:int, max_error:float):
+        # evenly spaced samples with the fewest points whose chords stay within max_error of the curve,
+        # the end point is left to the next geometry; returns local s, x, y, hdg and the achieved error
+        curvature = self.max_curvature(j)
+        n = max(int(np.ceil(self.length[j] / geometry_math.chord_step(curvature, max_error))), 1) if self.length[j] > 0 else 1
+        s_local = np.arange(n) * (self.length[j] / n)
+        x, y, hdg = self.pose(j, s_local)
+        return s_local, x, y, hdg, float(geometry_math.chord_error(curvature, self.length[j] / n))
+
+    def sample_roads(self, road_ids:List[str], delta_step:float, max_error:float=None) -> List[constants.RoadSamples]:
+        offsets = self.road_geometry_offsets(len(road_ids))
+        return [self.sample_road(road_id, offsets[i], offsets[i + 1], delta_step, max_error) for i, road_id in enumerate(road_ids)]
+
+    def sample_road(self, road_id:str, g0:int, g1:int, delta_step:float, max_error:float=None) -> constants.RoadSamples:
+        # fixed delta_step, or curvature-adaptive steps when max_error (max chordal error in m) is given
+        s_parts = []
+        x_parts = []
+        y_parts = []
+        hdg_parts = []
+        geometry_offsets = [0]
+        achieved_error = 0.0
+        for j in range(g0, g1):
+            code = self.type_code[j]
+            try:
+                with instrumentation.timer(SAMPLE_TIMERS[code]):
+                    if max_error is None:
+                        s_local, x, y, hdg = self.sample(j, delta_step)
+                        error = float(geometry_math.chord_error(self.max_curvature(j), min(delta_step, self.length[j])))
+                    else:
+                        s_local, x, y, hdg, error = self.sample_adaptive(j, max_error)
+            except NotImplementedError as e:
+                raise NotImplementedError(f"{e} for road {road_id}")
+            instrumentation.count(SAMPLE_COUNTERS[code], len(s_local))
+            achieved_error = max(achieved_error, error)
+            s_parts.append(self.s[j] + s_local)
+            x_parts.append(x)
+            y_parts.append(y)
+            hdg_parts.append(hdg)
+            geometry_offsets.append(geometry_offsets[-1] + len(s_local))
+        if max_error is not None and g1 > g0:
+            # close the polyline with the end of the last geometry
+            x, y, hdg = self.pose(g1 - 1, np.array([self.length[g1 - 1]]))
+            s_parts.append(np.array([self.s[g1 - 1] + self.length[g1 - 1]]))
+            x_parts.append(x)
+            y_parts.append(y)
+            hdg_parts.append(hdg)
+            geometry_offsets[-1] += 1
+
+        samples = constants.RoadSamples()
+        samples.road_id = road_id
+        samples.s = np.concatenate(s_parts) if s_parts else np.empty(0)
+        samples.x = np.concatenate(x_parts) if x_parts else np.empty(0)
+        samples.y = np.concatenate(y_parts) if y_parts else np.empty(0)
+        samples.hdg = np.concatenate(hdg_parts) if hdg_parts else np.empty(0)
+        samples.geometry_offsets = np.asarray(geometry_offsets, dtype=np.int64)
+        samples.max_chord_error = achieved_error
+        return samples
+
+    def pose(self, j:int, s_local):
+        # reference line (x, y, hdg) of geometry j at local s (scalar or array)
+        code = self.type_code[j]
+        if code == constants.LineType.LINE_STRAIGHT.value:
+            return geometry_math.line_pose(s_local, self.x[j], self.y[j], self.hdg[j])
+        elif code == constants.LineType.CIRCULAR_ARC.value:
+            return geometry_math.arc_pose(s_local, self.x[j], self.y[j], self.hdg[j], self.curv_start[j])
+        elif code == constants.LineType.SPIRAL.value:
+            return geometry_math.spiral_pose(s_local, self.x[j], self.y[j], self.hdg[j], self.length[j], self.curv_start[j], self.curv_end[j])
+        elif code in POLY_CODES:
+            return self.param_poly3_curve(j).pose(s_local)
+        raise NotImplementedError(f"geometry type {LINE_TYPES[code].name} is not implemented")
+
+    def project(self, j:int, x:float, y:float):
+        # exact projection of (x, y) onto geometry j, returns (road s, t, squared distance)
+        s, t, dist = self.project_batch(j, x, y)
+        return s[0], t[0], dist[0]
+
+    def project_batch(self, j:int, x, y):
+        # project N points onto geometry j in one vectorized call, returns road s, t, squared distance arrays
+        code = self.type_code[j]
+        if code == constants.LineType.LINE_STRAIGHT.value:
+            s_local, t, dist = geometry_math.xy_to_st_line_batch(x, y, self.x[j], self.y[j], self.hdg[j], self.length[j])
+        elif code == constants.LineType.CIRCULAR_ARC.value:
+            s_local, t, dist = geometry_math.xy_to_st_arc_batch(x, y, self.x[j], self.y[j], self.hdg[j], self.curv_start[j], self.length[j])
+        elif code == constants.LineType.SPIRAL.value:
+            s_local, t, dist = self.spiral_projector(j).project(x, y)
+        elif code in POLY_CODES:
+            s_local, t, dist = self.param_poly3_curve(j).project(x, y)
+        else:
+            raise NotImplementedError(f"geometry type {LINE_TYPES[code].name} is not implemented")
+        return self.s[j] + s_local, t, dist
+
+    def spiral_projector(self, j:int) -> geometry_math.SpiralProjector:
+        projector = self._spiral_projectors.get(j)
+        if projector is None:
+            projector = geometry_math.SpiralProjector(self.x[j], self.y[j], self.hdg[j], self.length[j], self.curv_start[j], self.curv_end[j])
+            self._spiral_projectors[j] = projector
+        return projector
+
+    def param_poly3_curve(self, j:int) -> geometry_math.ParamPoly3Curve:
+        curve = self._param_poly3_curves.get(j)
+        if curve is None:
+            coeffs = self.param_poly3[j]
+            curve = geometry_math.ParamPoly3Curve(self.x[j], self.y[j], self.hdg[j], self.length[j], coeffs[:4], coeffs[4:],
+                                                  self.p_range[j] if self.p_range[j] > 0 else None)
+            self._param_poly3_curves[j] = curve
+        return curve
+
+    def project_road_batch(self, geometry_indices, x, y):
+        # project N points onto the union of the given geometries, min-reduced over geometries
+        x, y = geometry_math._as_point_arrays(x, y)
+        s_all = np.empty((len(geometry_indices), len(x)))
+        t_all = np.empty_like(s_all)
+        dist_all = np.empty_like(s_all)
+        for i, j in enumerate(geometry_indices):
+            s_all[i], t_all[i], dist_all[i] = self.project_batch(j, x, y)
+        best = np.argmin(dist_all, axis=0)
+        cols = np.arange(len(x))
+        return s_all[best, cols], t_all[best, cols], dist_all[best, cols]
+
+    def bounding_boxes(self, max_step:float=5.0) -> np.ndarray:
+        # (n, 4) boxes [xmin, ymin, xmax, ymax] enclosing each geometry, padded by the sagitta of the sampling chords
+        boxes = np.empty((len(self), 4))
+        for j in range(len(self)):
+            n = max(2, int(np.ceil(self.length[j] / max_step)) + 1)
+            s_local = np.linspace(0.0, self.length[j], n)
+            x, y, _ = self.pose(j, s_local)
+            chord = self.length[j] / (n - 1)
+            pad = self.max_curvature(j) * chord * chord / 8.0 + 1e-6
+            boxes[j] = (x.min() - pad, y.min() - pad, x.max() + pad, y.max() + pad)
+        return boxes
+
+class NetworkStore:
+    def __init__(self):
+        self.geometries = GeometryTable()
+        # geometries of road i are [road_geometry_offsets[i], road_geometry_offsets[i+1])
+        self.road_geometry_offsets = np.zeros(1, dtype=np.int64)
+        # per-road scalar attributes
+        self.road_ids:List[str] = []
+        self.road_names:List[str] = []
+        self.road_junction_ids:List[str] = []
+        self.road_types:List[str] = []
+        self.road_length = np.zeros(0)
+        self.road_elevation_profiles:List[constants.ElevationProfile] = []
+        self.road_lateral_profiles:List[constants.LateralProfile] = []
+        self.road_lanes:List[constants.Lanes] = []
+        self.road_links:List[constants.RoadLink] = []
+        self.road_objects:List[constants.RoadObjects] = []
+        self.road_index_by_id:dict = {}
+        # (SAMPLE_COLUMNS, N) buffer, samples of road i are columns [road_sample_offsets[i], road_sample_offsets[i+1])
+        self.samples = np.zeros((SAMPLE_COLUMNS, 0))
+        self.road_sample_offsets = np.zeros(1, dtype=np.int64)
+        # samples of global geometry j are columns [geometry_sample_offsets[j], geometry_sample_offsets[j+1])
+        self.geometry_sample_offsets = np.zeros(1, dtype=np.int64)
+        self.road_chord_error = np.zeros(0) # RoadSamples.max_chord_error of each road
+        self.roads = RoadSequence(self)
+
+    @staticmethod
+    def from_roads(roads, road_samples:dict=None) -> 'NetworkStore':
+        store = NetworkStore()
+        store.geometries = GeometryTable.from_roads(roads)
+        counts = [len(road.planview.geometry_list) for road in roads]
+        store.road_geometry_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        store.road_ids = [road.id for road in roads]
+        store.road_names = [road.name for road in roads]
+        store.road_junction_ids = [road.junction_id for road in roads]
+        store.road_types = [road.type for road in roads]
+        store.road_length = np.array([road.length for road in roads], dtype=np.float64)
+        store.road_elevation_profiles = [road.elevationProfile for road in roads]
+        store.road_lateral_profiles = [road.lateralProfile for road in roads]
+        store.road_lanes = [road.lanes for road in roads]
+        store.road_links = [road.link for road in roads]
+        store.road_objects = [road.objects for road in roads]
+        store.road_index_by_id = {road_id: i for i, road_id in enumerate(store.road_ids)}
+        store.road_sample_offsets = np.zeros(len(roads) + 1, dtype=np.int64)
+        store.geometry_sample_offsets = np.zeros(len(store.geometries) + 1, dtype=np.int64)
+        if road_samples:
+            store.set_samples(road_samples)
+        return store
+
+    def set_samples(self, road_samples:dict):
+        # pack per-road RoadSamples into the flat buffer, in road order
+        n_geometries = len(self.geometries)
+        road_counts = np.zeros(len(self.road_ids), dtype=np.int64)
+        geometry_counts = np.zeros(n_geometries, dtype=np.int64)
+        for i, road_id in enumerate(self.road_ids):
+            samples = road_samples.get(road_id)
+            if samples is None:
+                continue
+            road_counts[i] = len(samples.s)
+            g0 = self.road_geometry_offsets[i]
+            geometry_counts[g0:g0 + len(samples.geometry_offsets) - 1] = np.diff(samples.geometry_offsets)
+        self.road_sample_offsets = np.concatenate(([0], np.cumsum(road_counts))).astype(np.int64)
+        self.geometry_sample_offsets = np.concatenate(([0], np.cumsum(geometry_counts))).astype(np.int64)
+        self.samples = np.empty((SAMPLE_COLUMNS, self.road_sample_offsets[-1]))
+        self.road_chord_error = np.zeros(len(self.road_ids))
+        for i, road_id in enumerate(self.road_ids):
+            samples = road_samples.get(road_id)
+            if samples is None:
+                continue
+            a, b = self.road_sample_offsets[i], self.road_sample_offsets[i + 1]
+            self.road_chord_error[i] = samples.max_chord_error
+            self.samples[SAMPLE_S, a:b] = samples.s
+            self.samples[SAMPLE_X, a:b] = samples.x
+            self.samples[SAMPLE_Y, a:b] = samples.y
+            self.samples[SAMPLE_HDG, a:b] = samples.hdg
+            # samples straight from GeometryTable.sample_road carry no surface, they lie at z = 0
+            self.samples[SAMPLE_Z, a:b] = samples.z if len(samples.z) == b - a else 0.0
+            self.samples[SAMPLE_ROLL, a:b] = samples.roll if len(samples.roll) == b - a else 0.0
+
+    def road_samples(self, road_index:int) -> constants.RoadSamples:
+        # RoadSamples whose arrays are views into the flat buffer (no copy)
+        a, b = self.road_sample_offsets[road_index], self.road_sample_offsets[road_index + 1]
+        g0, g1 = self.road_geometry_offsets[road_index], self.road_geometry_offsets[road_index + 1]
+        samples = constants.RoadSamples()
+        samples.road_id = self.road_ids[road_index]
+        samples.s = self.samples[SAMPLE_S, a:b]
+        samples.x = self.samples[SAMPLE_X, a:b]
+        samples.y = self.samples[SAMPLE_Y, a:b]
+        samples.hdg = self.samples[SAMPLE_HDG, a:b]
+        samples.z = self.samples[SAMPLE_Z, a:b]
+        samples.roll = self.samples[SAMPLE_ROLL, a:b]
+        samples.geometry_offsets = self.geometry_sample_offsets[g0:g1 + 1] - a
+        if len(self.road_chord_error) > road_index:
+            samples.max_chord_error = float(self.road_chord_error[road_index])
+        return samples
+
+    def nbytes(self) -> int:
+        return (self.geometries.nbytes() + self.road_geometry_offsets.nbytes + self.road_length.nbytes
+                + self.samples.nbytes + self.road_sample_offsets.nbytes + self.geometry_sample_offsets.nbytes)
+
+    def save(self, path:str):
+        # one .npy per array (memory-mappable on load), every other attribute pickled together
+        os.makedirs(path, exist_ok=True)
+        attrs = {}
+        for name, value in self.__dict__.items():
+            if name == 'roads':
+                continue
+            if isinstance(value, GeometryTable):
+                for array_name in GeometryTable.ARRAYS:
+                    np.save(os.path.join(path, f'{name}.{array_name}.npy'), getattr(value, array_name))
+            elif isinstance(value, np.ndarray):
+                np.save(os.path.join(path, f'{name}.npy'), value)
+            else:
+                attrs[name] = value
+        with open(os.path.join(path, 'attrs.pkl'), 'wb') as f:
+            pickle.dump(attrs, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path:str, mmap_mode:str='r') -> 'NetworkStore':
+        store = NetworkStore()
+        with open(os.path.join(path, 'attrs.pkl'), 'rb') as f:
+            for name, value in pickle.load(f).items():
+                setattr(store, name, value)
+        for file_name in os.listdir(path):
+            if not file_name.endswith('.npy'):
+                continue
+            array = np.load(os.path.join(path, file_name), mmap_mode=mmap_mode)
+            names = file_name[:-len('.npy')].split('.')
+            if len(names) == 2:
+                setattr(getattr(store, names[0]), names[1], array)
+            else:
+                setattr(store, names[0], array)
+        return store
+
+class RoadSequence:
+    __slots__ = ('_store',)
+
+    def __init__(self, store:NetworkStore):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store.road_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [RoadView(self._store, i) for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("road index out of range")
+        return RoadView(self._store, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield RoadView(self._store, i)
+
+class RoadView:
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store:NetworkStore, index:int):
+        self._store = store
+        self._index = index
+
+    @property
+    def id(self) -> str:
+        return self._store.road_ids[self._index]
+
+    @property
+    def name(self) -> str:
+        return self._store.road_names[self._index]
+
+    @property
+    def length(self) -> float:
+        return float(self._store.road_length[self._index])
+
+    @property
+    def junction_id(self) -> str:
+        return self._store.road_junction_ids[self._index]
+
+    @property
+    def type(self) -> str:
+        return self._store.road_types[self._index]
+
+    @property
+    def elevationProfile(self) -> constants.ElevationProfile:
+        return self._store.road_elevation_profiles[self._index]
+
+    @property
+    def lateralProfile(self) -> constants.LateralProfile:
+        return self._store.road_lateral_profiles[self._index]
+
+    @property
+    def lanes(self) -> constants.Lanes:
+        return self._store.road_lanes[self._index]
+
+    @property
+    def link(self) -> constants.RoadLink:
+        return self._store.road_links[self._index]
+
+    @property
+    def objects(self) -> constants.RoadObjects:
+        return self._store.road_objects[self._index]
+
+    @property
+    def planview(self) -> 'PlanViewView':
+        return PlanViewView(self._store, self._index)
+
+    def __repr__(self):
+        return f'RoadView(id={self.id!r}, name={self.name!r}, length={self.length}, geometries={len(self.planview.geometry_list)})'
+
+class PlanViewView:
+    __slots__ = ('_store', '_road_index')
+
+    def __init__(self, store:NetworkStore, road_index:int):
+        self._store = store
+        self._road_index = road_index
+
+    @property
+    def geometry_list(self) -> List['GeometryView']:
+        g0 = self._store.road_geometry_offsets[self._road_index]
+        g1 = self._store.road_geometry_offsets[self._road_index + 1]
+        return [GeometryView(self._store, j) for j in range(g0, g1)]
+
+class GeometryView:
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store:NetworkStore, index:int):
+        self._store = store
+        self._index = index
+
+    @property
+    def ref_line_type(self) -> constants.LineType:
+        return LINE_TYPES[self._store.geometries.type_code[self._index]]
+
+    @property
+    def s(self) -> float:
+        return float(self._store.geometries.s[self._index])
+
+    @property
+    def x(self) -> float:
+        return float(self._store.geometries.x[self._index])
+
+    @property
+    def y(self) -> float:
+        return float(self._store.geometries.y[self._index])
+
+    @property
+    def hdg(self) -> float:
+        return float(self._store.geometries.hdg[self._index])
+
+    @property
+    def length(self) -> float:
+        return float(self._store.geometries.length[self._index])
+
+    @property
+    def straight(self) -> constants.Line_Straight:
+        return constants.Line_Straight(length=self.length)
+
+    @property
+    def arc(self) -> constants.Line_Arc:
+        return constants.Line_Arc(curvature=float(self._store.geometries.curv_start[self._index]))
+
+    @property
+    def spiral(self) -> constants.Line_Spiral:
+        table = self._store.geometries
+        return constants.Line_Spiral(curvStart=float(table.curv_start[self._index]), curvEnd=float(table.curv_end[self._index]))
+
+    @property
+    def poly3(self) -> constants.Line_Poly3:
+        return constants.Line_Poly3(*(float(v) for v in self._store.geometries.poly3[self._index]))
+
+    @property
+    def param_poly3(self) -> constants.Line_ParamPoly3:
+        table = self._store.geometries
+        p_range = 'normalized' if table.p_range[self._index] == 1.0 and table.length[self._index] != 1.0 else 'arcLength'
+        return constants.Line_ParamPoly3(*(float(v) for v in table.param_poly3[self._index]), pRange=p_range)
+
+    def __repr__(self):
+        return f'GeometryView(type={self.ref_line_type.name}, s={self.s}, x={self.x}, y={self.y}, hdg={self.hdg}, length={self.length})'
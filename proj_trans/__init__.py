@@ -0,0 +1,4 @@
+# 坐标转换：地图局部 xy 与 WGS84 经纬度之间的批量转换（header geoReference + offset）。
+# pyproj 为可选依赖，缺失时使用 tmerc.py 中的纯 NumPy 横轴墨卡托。
+from proj_trans.tmerc import TransverseMercator, parse_proj
+from proj_trans.transform import GeoTransform, projection
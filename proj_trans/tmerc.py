@@ -0,0 +1,139 @@
+import numpy as np
+
+# 纯 NumPy 横轴墨卡托（UTM 为其特例）正反算，Krüger 六阶级数（Karney 2011），
+# 在投影带内误差为纳米级；只处理 proj 字符串中的 utm/tmerc 与椭球参数，不做基准面转换。
+
+ELLIPSOIDS = {
+    # name -> (semi-major axis a, flattening f)
+    'WGS84':(6378137.0, 1.0 / 298.257223563),
+    'GRS80':(6378137.0, 1.0 / 298.257222101),
+}
+# datums whose ellipsoid is known and whose shift to WGS84 is below a metre
+DATUM_ELLIPSOIDS = {'WGS84':'WGS84', 'NAD83':'GRS80', 'ETRS89':'GRS80'}
+
+def parse_proj(proj_string:str) -> dict:
+    # '+proj=utm +zone=32 +ellps=WGS84' -> {'proj': 'utm', 'zone': '32', 'ellps': 'WGS84'}, flags map to True
+    params = {}
+    for token in proj_string.split():
+        token = token.lstrip('+')
+        if not token:
+            continue
+        name, _, value = token.partition('=')
+        params[name] = value if value else True
+    return params
+
+def _ellipsoid(params:dict):
+    if 'a' in params:
+        a = float(params['a'])
+        if 'rf' in params:
+            return a, 1.0 / float(params['rf'])
+        if 'b' in params:
+            return a, 1.0 - float(params['b']) / a
+        return a, 0.0
+    name = params.get('ellps') or DATUM_ELLIPSOIDS.get(params.get('datum', 'WGS84'))
+    if name not in ELLIPSOIDS:
+        raise ValueError(f"unsupported ellipsoid/datum in proj string: ellps={params.get('ellps')} datum={params.get('datum')}")
+    return ELLIPSOIDS[name]
+
+def _series(n:float):
+    # Krüger coefficients alpha (forward) and beta (inverse), order n^6
+    alpha = np.array([
+        n/2 - 2*n**2/3 + 5*n**3/16 + 41*n**4/180 - 127*n**5/288 + 7891*n**6/37800,
+        13*n**2/48 - 3*n**3/5 + 557*n**4/1440 + 281*n**5/630 - 1983433*n**6/1935360,
+        61*n**3/240 - 103*n**4/140 + 15061*n**5/26880 + 167603*n**6/181440,
+        49561*n**4/161280 - 179*n**5/168 + 6601661*n**6/7257600,
+        34729*n**5/80640 - 3418889*n**6/1995840,
+        212378941*n**6/319334400,
+    ])
+    beta = np.array([
+        n/2 - 2*n**2/3 + 37*n**3/96 - n**4/360 - 81*n**5/512 + 96199*n**6/604800,
+        n**2/48 + n**3/15 - 437*n**4/1440 + 46*n**5/105 - 1118711*n**6/3870720,
+        17*n**3/480 - 37*n**4/840 - 209*n**5/4480 + 5569*n**6/90720,
+        4397*n**4/161280 - 11*n**5/504 - 830251*n**6/7257600,
+        4583*n**5/161280 - 108847*n**6/3991680,
+        20648693*n**6/638668800,
+    ])
+    return alpha, beta
+
+class TransverseMercator:
+    def __init__(self, a:float, f:float, lon_0:float=0.0, lat_0:float=0.0, k_0:float=0.9996, x_0:float=500000.0, y_0:float=0.0):
+        # angles in degrees, false easting/northing in metres
+        self.a = a
+        self.f = f
+        self.e = np.sqrt(f*(2.0 - f))
+        n = f / (2.0 - f)
+        self.A = a / (1.0 + n) * (1.0 + n**2/4 + n**4/64 + n**6/256) # rectifying radius
+        self.alpha, self.beta = _series(n)
+        self.j2 = 2.0*np.arange(1, 7)
+        self.lon_0 = np.radians(lon_0)
+        self.k_0 = k_0
+        self.x_0 = x_0
+        self.y_0 = y_0
+        self.xi_0 = 0.0
+        if lat_0 != 0.0:
+            self.xi_0 = float(self._forward_xi_eta(np.array([np.radians(lat_0)]), np.zeros(1))[0][0])
+
+    @staticmethod
+    def from_proj(proj_string:str) -> 'TransverseMercator':
+        params = parse_proj(proj_string)
+        a, f = _ellipsoid(params)
+        if params.get('proj') == 'utm':
+            if 'zone' not in params:
+                raise ValueError(f'utm proj string without a zone: {proj_string}')
+            zone = int(params['zone'])
+            return TransverseMercator(a, f, lon_0=6.0*zone - 183.0, k_0=0.9996, x_0=500000.0,
+                                      y_0=10000000.0 if params.get('south') else 0.0)
+        if params.get('proj') == 'tmerc':
+            return TransverseMercator(a, f, lon_0=float(params.get('lon_0', 0.0)), lat_0=float(params.get('lat_0', 0.0)),
+                                      k_0=float(params.get('k_0', params.get('k', 1.0))),
+                                      x_0=float(params.get('x_0', 0.0)), y_0=float(params.get('y_0', 0.0)))
+        raise ValueError(f"projection {params.get('proj')!r} is not supported without pyproj: {proj_string}")
+
+    def _forward_xi_eta(self, phi:np.ndarray, lam:np.ndarray):
+        # geodetic latitude / longitude offset (rad) -> transverse Mercator xi, eta (unit rectifying radius)
+        e = self.e
+        sin_phi = np.sin(phi)
+        tau_prime = np.sinh(np.arctanh(sin_phi) - e*np.arctanh(e*sin_phi)) # tangent of the conformal latitude
+        xi_p = np.arctan2(tau_prime, np.cos(lam))
+        eta_p = np.arcsinh(np.sin(lam) / np.sqrt(tau_prime*tau_prime + np.cos(lam)**2))
+        j2 = self.j2[:, None]
+        xi = xi_p + (self.alpha[:, None]*np.sin(j2*xi_p)*np.cosh(j2*eta_p)).sum(axis=0)
+        eta = eta_p + (self.alpha[:, None]*np.cos(j2*xi_p)*np.sinh(j2*eta_p)).sum(axis=0)
+        return xi, eta
+
+    def forward(self, lon, lat):
+        # degrees -> projected easting, northing (m), any array shape
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        shape = np.broadcast(lon, lat).shape
+        lam = np.radians(np.broadcast_to(lon, shape).ravel()) - self.lon_0
+        lam = (lam + np.pi) % (2.0*np.pi) - np.pi
+        xi, eta = self._forward_xi_eta(np.radians(np.broadcast_to(lat, shape).ravel()), lam)
+        scale = self.k_0*self.A
+        x = self.x_0 + scale*eta
+        y = self.y_0 + scale*(xi - self.xi_0)
+        return x.reshape(shape), y.reshape(shape)
+
+    def inverse(self, x, y):
+        # projected easting, northing (m) -> lon, lat degrees, any array shape
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        shape = np.broadcast(x, y).shape
+        scale = self.k_0*self.A
+        xi = (np.broadcast_to(y, shape).ravel() - self.y_0) / scale + self.xi_0
+        eta = (np.broadcast_to(x, shape).ravel() - self.x_0) / scale
+        j2 = self.j2[:, None]
+        xi_p = xi - (self.beta[:, None]*np.sin(j2*xi)*np.cosh(j2*eta)).sum(axis=0)
+        eta_p = eta - (self.beta[:, None]*np.cos(j2*xi)*np.sinh(j2*eta)).sum(axis=0)
+        tau_prime = np.sin(xi_p) / np.sqrt(np.sinh(eta_p)**2 + np.cos(xi_p)**2)
+        lam = np.arctan2(np.sinh(eta_p), np.cos(xi_p))
+        # conformal -> geodetic latitude by Newton on tau = tan(phi), converges in 2-3 steps
+        e2 = self.e*self.e
+        tau = tau_prime.copy()
+        for _ in range(4):
+            sigma = np.sinh(self.e*np.arctanh(self.e*tau / np.sqrt(1.0 + tau*tau)))
+            tau_p = tau*np.sqrt(1.0 + sigma*sigma) - sigma*np.sqrt(1.0 + tau*tau)
+            tau = tau + (tau_prime - tau_p) * (1.0 + (1.0 - e2)*tau*tau) / ((1.0 - e2)*np.sqrt(1.0 + tau*tau)*np.sqrt(1.0 + tau_p*tau_p))
+        lon = np.degrees(lam + self.lon_0)
+        lon = (lon + 180.0) % 360.0 - 180.0
+        return lon.reshape(shape), np.degrees(np.arctan(tau)).reshape(shape)
@@ -0,0 +1,88 @@
+import logging
+import numpy as np
+from functools import lru_cache
+from proj_trans.tmerc import TransverseMercator
+
+# 地图局部 xy <-> WGS84 经纬度的批量转换。投影由 header 的 geoReference（proj 字符串）给出，
+# 有 pyproj 时使用其 Transformer（按 proj 字符串缓存），否则退回纯 NumPy 的 UTM/tmerc 实现。
+# header <offset>（OpenDRIVE 1.6）: projected = R(hdg) * local + (x, y)
+
+try:
+    import pyproj
+except ImportError:
+    pyproj = None
+
+class _PyprojBackend:
+    def __init__(self, proj_string:str):
+        crs = pyproj.CRS.from_user_input(proj_string)
+        self._to_lonlat = pyproj.Transformer.from_crs(crs, 'EPSG:4326', always_xy=True)
+        self._from_lonlat = pyproj.Transformer.from_crs('EPSG:4326', crs, always_xy=True)
+
+    def forward(self, lon, lat):
+        return self._from_lonlat.transform(lon, lat)
+
+    def inverse(self, x, y):
+        return self._to_lonlat.transform(x, y)
+
+@lru_cache(maxsize=32)
+def projection(proj_string:str, use_pyproj:bool=True):
+    # cached projection backend for one proj string: forward(lon, lat) -> (x, y), inverse(x, y) -> (lon, lat)
+    if use_pyproj and pyproj is not None:
+        return _PyprojBackend(proj_string)
+    logging.debug('NumPy transverse Mercator for %s (pyproj %s)', proj_string, 'disabled' if pyproj is not None else 'not installed')
+    return TransverseMercator.from_proj(proj_string)
+
+class GeoTransform:
+    def __init__(self, proj_string:str, offset_x:float=0.0, offset_y:float=0.0, offset_hdg:float=0.0, use_pyproj:bool=True):
+        if not proj_string:
+            raise ValueError('the map has no geoReference')
+        self.proj_string = proj_string
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.offset_hdg = offset_hdg
+        self.projection = projection(proj_string, use_pyproj)
+        self.backend = 'pyproj' if isinstance(self.projection, _PyprojBackend) else 'numpy'
+
+    @staticmethod
+    def from_header(header, use_pyproj:bool=True) -> 'GeoTransform':
+        return GeoTransform(header.gepreference_text, header.offset_x, header.offset_y, header.offset_hdg, use_pyproj)
+
+    def to_lonlat(self, x, y):
+        # local map x, y (any array shape) -> lon, lat degrees of the same shape
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        c, s = np.cos(self.offset_hdg), np.sin(self.offset_hdg)
+        lon, lat = self.projection.inverse(c*x - s*y + self.offset_x, s*x + c*y + self.offset_y)
+        return np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+
+    def from_lonlat(self, lon, lat):
+        # lon, lat degrees (any array shape) -> local map x, y of the same shape
+        px, py = self.projection.forward(np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64))
+        px = np.asarray(px, dtype=np.float64) - self.offset_x
+        py = np.asarray(py, dtype=np.float64) - self.offset_y
+        c, s = np.cos(self.offset_hdg), np.sin(self.offset_hdg)
+        return c*px + s*py, -s*px + c*py
+
+    def samples_to_lonlat(self, road_samples) -> dict:
+        # road id -> (lon, lat) arrays of every sampled road, one transform call for the whole network
+        samples = list(road_samples.values())
+        if not samples:
+            return {}
+        lon, lat = self.to_lonlat(np.concatenate([s.x for s in samples]), np.concatenate([s.y for s in samples]))
+        bounds = np.cumsum([0] + [len(s.x) for s in samples])
+        return {s.road_id:(lon[a:b], lat[a:b]) for s, a, b in zip(samples, bounds[:-1], bounds[1:])}
+
+    def boundaries_to_lonlat(self, boundaries) -> list:
+        # constants.LaneBoundaries -> [(lon, lat)] per section, each (n_lanes, n_samples) like the section's x, y
+        sections = boundaries.sections
+        if not sections:
+            return []
+        lon, lat = self.to_lonlat(np.concatenate([section.x.ravel() for section in sections]),
+                                  np.concatenate([section.y.ravel() for section in sections]))
+        result = []
+        start = 0
+        for section in sections:
+            end = start + section.x.size
+            result.append((lon[start:end].reshape(section.x.shape), lat[start:end].reshape(section.x.shape)))
+            start = end
+        return result
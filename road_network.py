@@ -1,14 +1,45 @@
 import os
+import re
 import constants
 import logging
 from lxml import etree
 from typing import List
 import geometry_math
+import network_store
+import spatial_index
+import lane_geometry
+import routing
+import instrumentation
+import lazy_roads
+import map_render
+import road_objects
+import proj_trans
+import xodr_diff
+import validation
+import worker_pool
+import numpy as np
 import matplotlib.pyplot as plt
 
+# process pool workers, module level so they can be pickled
+def _parse_road_shard(xodr_file:str, road_spans:List[tuple]) -> List[constants.Road]:
+    # each worker reads its own [start, end) byte ranges of the file, so only the ranges and the parsed roads are pickled
+    road_xml=[]
+    with open(xodr_file, 'rb') as f:
+        for start, end in road_spans:
+            f.seek(start)
+            road_xml.append(f.read(end-start))
+    shard_root=etree.fromstring(b'<shard>'+b''.join(road_xml)+b'</shard>')
+    return RoadNetwork()._parse_roads(list(shard_root))
+
+def _sample_road_shard(table:network_store.GeometryTable, road_ids:List[str], delta_step:float, max_error:float=None) -> List[constants.RoadSamples]:
+    return table.sample_roads(road_ids, delta_step, max_error)
+
 class RoadNetwork:
-    def __init__(self, xodr_file:str=""):
+    def __init__(self, xodr_file:str="", workers:int=1, max_lazy_roads:int=256, track_changes:bool=False):
         self.xodr_file = xodr_file
+        self.workers = workers # > 1 parses and samples road shards in a process pool
+        self.max_lazy_roads = max_lazy_roads # roads kept materialized by parse_xodr(lazy=True)
+        self.track_changes = track_changes # fingerprint <road>/<junction> elements when parsing, so reload() is incremental
         self.ROOT_TAG:str="OpenDRIVE"
 
         self.odr_doc:dict={
@@ -16,68 +47,240 @@ class RoadNetwork:
             'roads':[constants.Road()],
             'junctions':[constants.Junction()],
         }
+        self.road_samples:dict={}
+        self.sample_error:float=0.0 # max chordal error of the current samples
+        self.sample_params:tuple=None # (delta_step, max_error) of the current samples
+        self.store:network_store.NetworkStore=None
+        self.spatial_index:spatial_index.GridIndex=None
+        self._geometry_table:network_store.GeometryTable=None
+        self._road_index_by_id:dict=None
+        self._reference_lines:dict={}
+        self._routing_graph:routing.RoutingGraph=None
+        self.lazy_roads:lazy_roads.LazyRoadSequence=None
+        self._object_index:road_objects.ObjectIndex=None
+        self._geo_transform:proj_trans.GeoTransform=None
+        self._fingerprints:xodr_diff.ElementFingerprints=None
 
         logging.info(f"RoadNetwork initialized with xodr file: {self.xodr_file}")
 
-    def parse_xodr(self) -> int:
+    def parse_xodr(self, stream:bool=False, progress_callback=None, lazy:bool=False) -> int:
         # check if the file exists
         if not os.path.exists(self.xodr_file):
             logging.error(f"XODR file {self.xodr_file} not found")
             return constants.ErrorCode.FILE_NOT_FOUND
+        self._reset_derived()
+        if lazy:
+            result=self._parse_xodr_lazy()
+        elif stream:
+            result=self._parse_xodr_stream(progress_callback)
+        elif self.workers > 1:
+            result=self._parse_xodr_parallel()
+        else:
+            result=self._parse_xodr_dom()
+        if result==constants.ErrorCode.OK and self.track_changes:
+            with instrumentation.timer('parse/fingerprints'):
+                try:
+                    with open(self.xodr_file, 'rb') as f:
+                        self._fingerprints=xodr_diff.ElementFingerprints.scan(f.read())
+                except ValueError as e:
+                    logging.warning(f'cannot fingerprint {self.xodr_file}, reload() will parse it fully: {str(e)}')
+        return result
+
+    def _parse_xodr_dom(self) -> int:
         try:
             # load the xodr file
-            tree = etree.parse(self.xodr_file)
+            with instrumentation.timer('parse/xml_load'):
+                tree = etree.parse(self.xodr_file)
             root = tree.getroot()
-            logging.debug(etree.tostring(root, pretty_print=True))
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug('%s', etree.tostring(root, pretty_print=True))
             
             # check if the file's root tag is 'OpenDRIVE'
-            logging.info(f'root tag:{root.tag}')
+            logging.debug('root tag:%s', root.tag)
             if root.tag != self.ROOT_TAG:
                 logging.error(f"XODR file {self.xodr_file} is not a valid OpenDRIVE file")
-                return constants.ErrorCode.INVALID_FILE  
+                return constants.ErrorCode.INVALID_FORMAT
 
             # print all elements tag
-            elements = root.xpath(f'/{self.ROOT_TAG}/*')
-            element_tags = [ element.tag for element in elements ]
-            logging.info(f'element tags:{set(element_tags)}')
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug('element tags:%s', { element.tag for element in root })
 
             # get header
             header_elements=root.xpath(f'/{self.ROOT_TAG}/header')
-            print(f'len of header elements:{len(header_elements)}')
             header_elements_len=len(header_elements)
             if header_elements_len!=1:
                 logging.error(f"XODR file {self.xodr_file} has {header_elements_len} header elements, expected 1")
-                return constants.ErrorCode.INVALID_FILE
+                return constants.ErrorCode.INVALID_FORMAT
             else:
-                self.odr_doc['header']=self._parse_header(header_elements)
-                logging.info(f'header:{self.odr_doc["header"]}')
+                with instrumentation.timer('parse/header'):
+                    self.odr_doc['header']=self._parse_header(header_elements)
+                logging.debug('header:%s', self.odr_doc['header'])
                 
             # get roads
             road_elements=root.xpath(f'/{self.ROOT_TAG}/road')
-            logging.info(f'len of road elements:{len(road_elements)}')
             if len(road_elements)==0:
                 logging.error(f"XODR file {self.xodr_file} has no road elements")
-                return constants.ErrorCode.INVALID_FILE
+                return constants.ErrorCode.INVALID_FORMAT
             else:
-                self.odr_doc['roads']=self._parse_roads(road_elements)
-                logging.info(f'len of roads parsed:{len(self.odr_doc["roads"])}')
-                logging.info(f'roads[0]:{self.odr_doc["roads"][0]}')
-                logging.info(f'roads[3]:{self.odr_doc["roads"][3]}')
+                with instrumentation.timer('parse/roads'):
+                    self.odr_doc['roads']=self._parse_roads(road_elements)
+                instrumentation.count('parse/roads', len(self.odr_doc['roads']))
+                logging.info(f'roads parsed: {len(self.odr_doc["roads"])} of {len(road_elements)} road elements')
             
             # get juntions
             junction_elements=root.xpath(f'/{self.ROOT_TAG}/junction')
-            logging.info(f'len of junction elements:{len(junction_elements)}')
             if len(junction_elements)>0:
-                self.odr_doc['junctions']=self._parse_junctions(junction_elements)
-                logging.info(f'len of junctions parsed:{len(self.odr_doc["junctions"])}')
-                logging.info(f'junctions[0]:{self.odr_doc["junctions"][0]}')
+                with instrumentation.timer('parse/junctions'):
+                    self.odr_doc['junctions']=self._parse_junctions(junction_elements)
+                instrumentation.count('parse/junctions', len(self.odr_doc['junctions']))
+                logging.info(f'junctions parsed: {len(self.odr_doc["junctions"])}')
 
         except Exception as e:
             logging.error(f"parse xodr file {self.xodr_file} failed: {str(e)}")
             return constants.ErrorCode.UNKNOWN                                            
 
         return constants.ErrorCode.OK
-    
+
+    def _parse_xodr_parallel(self) -> int:
+        # no DOM of the whole file: the parent only scans the byte ranges of the top-level elements, road shards
+        # are read and parsed by the workers while the parent parses the header and the junctions
+        try:
+            with instrumentation.timer('parse/scan'):
+                with open(self.xodr_file, 'rb') as f:
+                    data=f.read()
+                if re.search(rb'<'+self.ROOT_TAG.encode()+rb'\b', data[:4096]) is None:
+                    logging.error(f"XODR file {self.xodr_file} is not a valid OpenDRIVE file")
+                    return constants.ErrorCode.INVALID_FORMAT
+                spans={ b'header':[], b'road':[], b'junction':[] }
+                for tag, start, end, _ in xodr_diff.top_level_elements(data):
+                    spans[tag].append((start, end))
+            if len(spans[b'header'])!=1:
+                logging.error(f"XODR file {self.xodr_file} has {len(spans[b'header'])} header elements, expected 1")
+                return constants.ErrorCode.INVALID_FORMAT
+            road_spans=spans[b'road']
+            if len(road_spans)==0:
+                logging.error(f"XODR file {self.xodr_file} has no road elements")
+                return constants.ErrorCode.INVALID_FORMAT
+
+            executor=worker_pool.shared_pool(self.workers)
+            futures=[ executor.submit(_parse_road_shard, self.xodr_file, road_spans[shard.start:shard.stop]) for shard in self._shards(len(road_spans)) ]
+            with instrumentation.timer('parse/header'):
+                start, end=spans[b'header'][0]
+                self.odr_doc['header']=self._parse_header([etree.fromstring(data[start:end])])
+            if spans[b'junction']:
+                with instrumentation.timer('parse/junctions'):
+                    junction_xml=b''.join(data[start:end] for start, end in spans[b'junction'])
+                    self.odr_doc['junctions']=self._parse_junctions(list(etree.fromstring(b'<shard>'+junction_xml+b'</shard>')))
+                instrumentation.count('parse/junctions', len(self.odr_doc['junctions']))
+                logging.info(f'junctions parsed: {len(self.odr_doc["junctions"])}')
+            with instrumentation.timer('parse/roads'):
+                roads:List[constants.Road]=[]
+                # futures are in shard order, so roads stay in document order
+                for future in futures:
+                    roads.extend(future.result())
+                self.odr_doc['roads']=roads
+            instrumentation.count('parse/roads', len(self.odr_doc['roads']))
+            logging.info(f'roads parsed: {len(self.odr_doc["roads"])} of {len(road_spans)} road elements')
+
+        except Exception as e:
+            logging.error(f"parse xodr file {self.xodr_file} failed: {str(e)}")
+            return constants.ErrorCode.UNKNOWN
+
+        return constants.ErrorCode.OK
+
+    def _reset_derived(self):
+        # drop everything derived from a previously parsed document
+        self.road_samples={}
+        self.sample_error=0.0
+        self.sample_params=None
+        self.store=None
+        self.spatial_index=None
+        self._geometry_table=None
+        self._road_index_by_id=None
+        self._reference_lines={}
+        self._routing_graph=None
+        self.lazy_roads=None
+        self._object_index=None
+        self._geo_transform=None
+        self._fingerprints=None
+
+    def _parse_xodr_stream(self, progress_callback=None) -> int:
+        # iterparse the file, convert each top-level <header>/<road>/<junction> as it closes,
+        # then clear it so only the parsed model stays in memory
+        total_bytes=os.path.getsize(self.xodr_file)
+        header_count=0
+        roads:List[constants.Road]=[]
+        junctions:List[constants.Junction]=[]
+        try:
+            with open(self.xodr_file, 'rb') as xodr_stream:
+                for _, element in etree.iterparse(xodr_stream, events=('end',), tag=('header', 'road', 'junction')):
+                    parent=element.getparent()
+                    if parent is None or parent.getparent() is not None:
+                        continue # not a direct child of the root element
+                    if parent.tag != self.ROOT_TAG:
+                        logging.error(f"XODR file {self.xodr_file} is not a valid OpenDRIVE file")
+                        return constants.ErrorCode.INVALID_FORMAT
+
+                    if element.tag == 'header':
+                        header_count+=1
+                        with instrumentation.timer('parse/header'):
+                            self.odr_doc['header']=self._parse_header([element])
+                    elif element.tag == 'road':
+                        with instrumentation.timer('parse/roads'):
+                            roads.extend(self._parse_roads([element]))
+                    else:
+                        with instrumentation.timer('parse/junctions'):
+                            junctions.extend(self._parse_junctions([element]))
+
+                    # release the element and every already-processed sibling
+                    element.clear()
+                    while element.getprevious() is not None:
+                        del parent[0]
+
+                    if progress_callback is not None:
+                        progress_callback(xodr_stream.tell(), total_bytes)
+        except Exception as e:
+            logging.error(f"parse xodr file {self.xodr_file} failed: {str(e)}")
+            return constants.ErrorCode.UNKNOWN
+
+        if header_count!=1:
+            logging.error(f"XODR file {self.xodr_file} has {header_count} header elements, expected 1")
+            return constants.ErrorCode.INVALID_FORMAT
+        if len(roads)==0:
+            logging.error(f"XODR file {self.xodr_file} has no road elements")
+            return constants.ErrorCode.INVALID_FORMAT
+        self.odr_doc['roads']=roads
+        if len(junctions)>0:
+            self.odr_doc['junctions']=junctions
+        instrumentation.count('parse/roads', len(roads))
+        instrumentation.count('parse/junctions', len(junctions))
+        logging.info(f'streamed {len(roads)} roads and {len(junctions)} junctions from {self.xodr_file}')
+        return constants.ErrorCode.OK
+
+    def _parse_xodr_lazy(self) -> int:
+        # scan road byte ranges and bounding boxes only; header and junctions are small and parsed right away
+        try:
+            with instrumentation.timer('parse/scan'):
+                scan=lazy_roads.RoadScan.scan(self.xodr_file, self.ROOT_TAG)
+            if len(scan.road_ids)==0:
+                logging.error(f"XODR file {self.xodr_file} has no road elements")
+                return constants.ErrorCode.INVALID_FORMAT
+            with instrumentation.timer('parse/header'):
+                self.odr_doc['header']=self._parse_header([etree.fromstring(scan.header_xml)])
+            if len(scan.junction_xml)>0:
+                with instrumentation.timer('parse/junctions'):
+                    self.odr_doc['junctions']=self._parse_junctions([ etree.fromstring(xml) for xml in scan.junction_xml ])
+        except ValueError as e:
+            logging.error(f"XODR file {self.xodr_file} is not a valid OpenDRIVE file: {str(e)}")
+            return constants.ErrorCode.INVALID_FORMAT
+        except Exception as e:
+            logging.error(f"parse xodr file {self.xodr_file} failed: {str(e)}")
+            return constants.ErrorCode.UNKNOWN
+        self.lazy_roads=lazy_roads.LazyRoadSequence(scan, self._parse_roads, self.max_lazy_roads)
+        self.odr_doc['roads']=self.lazy_roads
+        logging.info(f'scanned {len(scan.road_ids)} roads and {len(scan.junction_xml)} junctions from {self.xodr_file}, roads are parsed on access')
+        return constants.ErrorCode.OK
+
     def _parse_header(self, header_elements:List[etree.Element]) -> constants.Header:
         header=constants.Header()
         
@@ -96,6 +299,12 @@ class RoadNetwork:
         geo_reference=header_elements[0].xpath('geoReference')
         if len(geo_reference)>=1:
             header.gepreference_text=geo_reference[0].text.strip()
+        offset=header_elements[0].find('offset')
+        if offset is not None:
+            header.offset_x=float(offset.get('x', '0.0'))
+            header.offset_y=float(offset.get('y', '0.0'))
+            header.offset_z=float(offset.get('z', '0.0'))
+            header.offset_hdg=float(offset.get('hdg', '0.0'))
         
         return header
     
@@ -146,6 +355,7 @@ class RoadNetwork:
                     arc_element=geometry_element.find('arc')
                     spiral_element=geometry_element.find('spiral')
                     poly3_element=geometry_element.find('poly3')
+                    param_poly3_element=geometry_element.find('paramPoly3')
                     
                     if line_element is not None:
                         geometry.ref_line_type = constants.LineType.LINE_STRAIGHT
@@ -163,11 +373,22 @@ class RoadNetwork:
                         geometry.poly3.b=float(poly3_element.get('b', '0.0'))
                         geometry.poly3.c=float(poly3_element.get('c', '0.0'))
                         geometry.poly3.d=float(poly3_element.get('d', '0.0'))
+                    elif param_poly3_element is not None:
+                        geometry.ref_line_type = constants.LineType.PARAM_POLY3
+                        for name in ('aU', 'bU', 'cU', 'dU', 'aV', 'bV', 'cV', 'dV'):
+                            setattr(geometry.param_poly3, name, float(param_poly3_element.get(name, '0.0')))
+                        geometry.param_poly3.pRange=param_poly3_element.get('pRange', 'normalized')
                     
                     planview.geometry_list.append(geometry)
                 
                 road_obj.planview = planview
             
+            # get road link, elevation/lateral profiles and lanes
+            road_obj.link = self._parse_road_link(road_element)
+            road_obj.elevationProfile, road_obj.lateralProfile = self._parse_profiles(road_element)
+            road_obj.lanes = self._parse_lanes(road_element)
+            road_obj.objects = self._parse_objects(road_element)
+
             # check if the road has at least 1 geometry element
             if len(road_obj.planview.geometry_list) == 0:
                 logging.error(f'road id {road_obj.id} should have at least 1 geometry element')
@@ -176,6 +397,114 @@ class RoadNetwork:
             roads.append(road_obj)
         return roads
     
+    def _parse_poly_records(self, elements:List[etree.Element], s_attr:str='s') -> np.ndarray:
+        # (n, 5) array of s, a, b, c, d sorted by s
+        records=np.array([ [float(element.get(name, '0.0')) for name in (s_attr, 'a', 'b', 'c', 'd')] for element in elements ], dtype=np.float64).reshape(-1, 5)
+        return records[np.argsort(records[:, 0], kind='stable')]
+
+    def _parse_profiles(self, road_element:etree.Element):
+        elevation_profile=constants.ElevationProfile()
+        lateral_profile=constants.LateralProfile()
+        elevation_profile_element=road_element.find('elevationProfile')
+        if elevation_profile_element is not None:
+            elevation_profile.elevation=self._parse_poly_records(elevation_profile_element.findall('elevation'))
+        lateral_profile_element=road_element.find('lateralProfile')
+        if lateral_profile_element is not None:
+            lateral_profile.superelevation=self._parse_poly_records(lateral_profile_element.findall('superelevation'))
+            shape=np.array([ [float(element.get(name, '0.0')) for name in ('s', 't', 'a', 'b', 'c', 'd')] for element in lateral_profile_element.findall('shape') ], dtype=np.float64).reshape(-1, 6)
+            lateral_profile.shape=shape[np.lexsort((shape[:, 1], shape[:, 0]))]
+        return elevation_profile, lateral_profile
+
+    def _parse_road_link(self, road_element:etree.Element) -> constants.RoadLink:
+        road_link=constants.RoadLink()
+        link_element=road_element.find('link')
+        if link_element is None:
+            return road_link
+        for name in ('predecessor', 'successor'):
+            end_element=link_element.find(name)
+            if end_element is not None:
+                setattr(road_link, name, constants.RoadLinkEnd(
+                    element_type=end_element.get('elementType', ''),
+                    element_id=end_element.get('elementId', ''),
+                    contact_point=end_element.get('contactPoint', '')))
+        return road_link
+
+    def _parse_lanes(self, road_element:etree.Element) -> constants.Lanes:
+        lanes=constants.Lanes()
+        lanes_element=road_element.find('lanes')
+        if lanes_element is None:
+            return lanes
+        lanes.lane_offset=self._parse_poly_records(lanes_element.findall('laneOffset'))
+
+        for section_element in lanes_element.findall('laneSection'):
+            section=constants.LaneSection()
+            section.s=float(section_element.get('s', '0.0'))
+            section.single_side=section_element.get('singleSide', 'false') == 'true'
+            lane_elements=section_element.findall('left/lane')+section_element.findall('center/lane')+section_element.findall('right/lane')
+            lane_elements.sort(key=lambda lane_element: -int(lane_element.get('id', '0')))
+            width_records=[]
+            width_offsets=[0]
+            for lane_element in lane_elements:
+                records=self._parse_poly_records(lane_element.findall('width'), 'sOffset')
+                width_records.append(records)
+                width_offsets.append(width_offsets[-1]+len(records))
+            section.lane_ids=np.array([ int(lane_element.get('id', '0')) for lane_element in lane_elements ], dtype=np.int32)
+            section.lane_types=[ lane_element.get('type', '') for lane_element in lane_elements ]
+            section.lane_predecessors=np.array([ int(lane_element.find('link/predecessor').get('id', '0')) if lane_element.find('link/predecessor') is not None else 0 for lane_element in lane_elements ], dtype=np.int32)
+            section.lane_successors=np.array([ int(lane_element.find('link/successor').get('id', '0')) if lane_element.find('link/successor') is not None else 0 for lane_element in lane_elements ], dtype=np.int32)
+            section.width_offsets=np.asarray(width_offsets, dtype=np.int64)
+            section.width_coeffs=np.concatenate(width_records) if width_records else np.zeros((0, 5))
+            lanes.sections.append(section)
+        lanes.sections.sort(key=lambda section: section.s)
+        return lanes
+
+    def _parse_objects(self, road_element:etree.Element) -> constants.RoadObjects:
+        # object placement and the first outline of each object, cornerLocal or cornerRoad
+        objects=constants.RoadObjects()
+        object_elements=road_element.findall('objects/object')
+        if len(object_elements) == 0:
+            return objects
+        corners=[]
+        corner_offsets=[0]
+        corner_road=[]
+        for object_element in object_elements:
+            objects.ids.append(object_element.get('id', ''))
+            objects.names.append(object_element.get('name', ''))
+            objects.types.append(object_element.get('type', ''))
+            objects.orientations.append(object_element.get('orientation', 'none'))
+            local_elements=object_element.findall('outline/cornerLocal')
+            road_elements=object_element.findall('outline/cornerRoad')
+            if len(local_elements) == 0 and len(road_elements) > 0:
+                corners.append([ [float(element.get(name, '0.0')) for name in ('s', 't', 'dz')] for element in road_elements ])
+                corner_road.append(True)
+            else:
+                corners.append([ [float(element.get(name, '0.0')) for name in ('u', 'v', 'z')] for element in local_elements ])
+                corner_road.append(False)
+            corner_offsets.append(corner_offsets[-1]+len(corners[-1]))
+        objects.params=np.array([ [float(object_element.get(name) or '0.0') for name in ('s', 't', 'zOffset', 'hdg', 'width', 'length', 'radius', 'height')]
+                                  for object_element in object_elements ], dtype=np.float64).reshape(-1, 8)
+        objects.corner_offsets=np.asarray(corner_offsets, dtype=np.int64)
+        objects.corners=np.array([ corner for outline in corners for corner in outline ], dtype=np.float64).reshape(-1, 3)
+        objects.corner_road=np.asarray(corner_road, dtype=bool)
+        return objects
+
+    def _shards(self, n:int) -> List[range]:
+        # contiguous, ordered shards, a few per worker to balance uneven roads
+        n_shards=min(n, self.workers*4)
+        bounds=np.linspace(0, n, n_shards+1).astype(int)
+        return [ range(bounds[i], bounds[i+1]) for i in range(n_shards) ]
+
+    def _sample_roads_parallel(self, table:network_store.GeometryTable, road_ids:List[str], delta_step:float, max_error:float=None) -> List[constants.RoadSamples]:
+        offsets=table.road_geometry_offsets(len(road_ids))
+        shards=self._shards(len(road_ids))
+        tables=[ table.subset(offsets[shard.start], offsets[shard.stop]) for shard in shards ]
+        shard_road_ids=[ road_ids[shard.start:shard.stop] for shard in shards ]
+        sampled:List[constants.RoadSamples]=[]
+        executor=worker_pool.shared_pool(self.workers)
+        for shard_samples in executor.map(_sample_road_shard, tables, shard_road_ids, [delta_step]*len(shards), [max_error]*len(shards)):
+            sampled.extend(shard_samples)
+        return sampled
+
     def _parse_junctions(self, junction_elements:List[etree.Element]) -> List[constants.Junction]:
         junctions:List[constants.Junction] = []
         for junction_element in junction_elements:
@@ -216,62 +545,454 @@ class RoadNetwork:
             junctions.append(junction_obj)
         return junctions
            
-    def sample_roads(self, delta_step:float=0.1):
-        x_list=[]
-        y_list=[]
-        for road in self.odr_doc['roads']:    
-            # sample refline of a road, from st coordinates to xy coordinates
-            for geometry in road.planview.geometry_list:
-                if geometry.ref_line_type == constants.LineType.LINE_STRAIGHT:
-                    s=0.0
-                    s_max=geometry.length
-                    while s < s_max:
-                        x,y=geometry_math.st_to_xy_line(s,0.0,geometry.x,geometry.y,geometry.hdg,geometry.length)
-                        s+=delta_step
-                        point_3d=constants.Point3d()
-                        point_3d.x=x
-                        point_3d.y=y
-                        point_3d.z=0.0
-                        geometry.refline_sample_points.append(point_3d)
-                        x_list.append(x)
-                        y_list.append(y)
-                elif geometry.ref_line_type == constants.LineType.CIRCULAR_ARC:
-                    s=0.0
-                    s_max=geometry.length
-                    while s < s_max:
-                        x,y=geometry_math.st_to_xy_arc(s,0.0,geometry.x,geometry.y,geometry.hdg,geometry.arc.curvature,geometry.length)
-                        s+=delta_step
-                        point_3d=constants.Point3d()
-                        point_3d.x=x
-                        point_3d.y=y
-                        point_3d.z=0.0
-                        geometry.refline_sample_points.append(point_3d)
-                        x_list.append(x)
-                        y_list.append(y)
-                elif geometry.ref_line_type == constants.LineType.SPIRAL:
-                    s=0.0
-                    s_max=geometry.length
-                    while s < s_max:
-                        x,y=geometry_math.st_to_xy_spiral(s,0.0,geometry.x,geometry.y,geometry.hdg,geometry.length,geometry.spiral.curvStart,geometry.spiral.curvEnd)
-                        s+=delta_step
-                        point_3d=constants.Point3d()
-                        point_3d.x=x
-                        point_3d.y=y
-                        point_3d.z=0.0
-                        geometry.refline_sample_points.append(point_3d) 
-                        x_list.append(x)
-                        y_list.append(y)
-                elif geometry.ref_line_type == constants.LineType.POLY3:
-                    raise NotImplementedError(f"Poly3 is not implemented for road {road.id}")
-                   
-        # plot sample points of all roads
-        logging.info(f'len of x_list:{len(x_list)}, len of y_list:{len(y_list)}')
-        plt.scatter(
-            x_list, y_list,
-            s=2,           # 控制点的大小
-            c='red',       # 控制点的颜色
-            alpha=0.7      # 可选：点的透明度
-        )
+    def sample_roads(self, delta_step:float=0.1, plot:bool=False, max_error:float=None) -> dict:
+        # sample refline of each road, from st coordinates to xy coordinates.
+        # with max_error (m) the step of each geometry follows its curvature instead of delta_step,
+        # a line keeps only its end points; the achieved chordal error is kept in self.sample_error
+        if self.lazy_roads is not None:
+            # each road is sampled when its samples are first read; the network-wide bound is only
+            # known up front for adaptive sampling
+            self.road_samples=lazy_roads.LazyRoadSamples(self.lazy_roads, delta_step, max_error)
+            self.sample_error=max_error if max_error is not None else float('nan')
+            self.sample_params=(delta_step, max_error)
+            if plot:
+                self.plot_samples()
+            return self.road_samples
+        table=self.geometry_table()
+        road_ids=[ road.id for road in self.odr_doc['roads'] ]
+        with instrumentation.timer('sample/reference_lines'):
+            if self.workers > 1:
+                sampled=self._sample_roads_parallel(table, road_ids, delta_step, max_error)
+            else:
+                sampled=table.sample_roads(road_ids, delta_step, max_error)
+        self._sample_surface(self.odr_doc['roads'], sampled)
+        road_samples:dict={ samples.road_id:samples for samples in sampled }
+        self.road_samples=road_samples
+        self.sample_error=max((samples.max_chord_error for samples in sampled), default=0.0)
+        self.sample_params=(delta_step, max_error)
+        logging.info(f'sampled {sum(len(samples.s) for samples in sampled)} points, max chordal error {self.sample_error:.3g} m')
+        if self.store is not None:
+            self._pack_samples()
+
+        if plot:
+            self.plot_samples()
+        return road_samples
+
+    def _sample_surface(self, roads, sampled:List[constants.RoadSamples]):
+        # elevation and superelevation at the reference line samples of each road
+        with instrumentation.timer('sample/surface'):
+            for road, samples in zip(roads, sampled):
+                samples.z, samples.roll=geometry_math.road_surface(road.elevationProfile.elevation, road.lateralProfile.superelevation,
+                                                                   road.lateralProfile.shape, samples.s)
+
+    def renderer(self, tile_size:int=map_render.DEFAULT_TILE_SIZE, line_width:int=1) -> map_render.MapRenderer:
+        # headless rasterizer over the sampled reference lines, tiles cover the header's west/south/east/north
+        header=self.odr_doc['header']
+        bounds=(header.west, header.south, header.east, header.north) if header is not None else None
+        return map_render.MapRenderer(map_render.Polylines.from_samples(self.road_samples), bounds, tile_size, line_width)
+
+    def plot_samples(self, path:str="", width:int=2048):
+        # render all sampled roads into one image; written to path, or shown in a window when no path is given
+        raster=self.renderer().render_map(width)
+        if path:
+            map_render.save_raster(path, raster)
+            logging.info(f'map of {len(self.road_samples)} roads written to {path}')
+            return
+        plt.imshow(map_render.to_rgba(raster))
+        plt.axis('off')
         plt.show()
 
+    def compact(self) -> network_store.NetworkStore:
+        # switch to the columnar representation, odr_doc['roads'] becomes a sequence of slotted views
+        with instrumentation.timer('build/store'):
+            self.store=network_store.NetworkStore.from_roads(self.odr_doc['roads'])
+        self.odr_doc['roads']=self.store.roads
+        self.lazy_roads=None # every road is in the store now
+        if self.road_samples:
+            self._pack_samples()
+        logging.info(f'network compacted: {len(self.store.geometries)} geometries, {self.store.samples.shape[1]} samples, {self.store.nbytes()} bytes')
+        return self.store
+
+    def reload(self) -> constants.ReloadReport:
+        # re-read xodr_file after an edit. with fingerprints of the last parse (track_changes) only the <road> and
+        # <junction> elements whose bytes changed are parsed and sampled again; unchanged roads keep their model,
+        # samples, reference lines, geometry rows and spatial index cells, and the routing graph is patched.
+        # without fingerprints, or for a compacted network, the file is parsed fully with the same sampling
+        report=constants.ReloadReport()
+        if not os.path.exists(self.xodr_file):
+            logging.error(f"XODR file {self.xodr_file} not found")
+            report.error=constants.ErrorCode.FILE_NOT_FOUND
+            return report
+        try:
+            with open(self.xodr_file, 'rb') as f:
+                data=f.read()
+            with instrumentation.timer('reload/fingerprints'):
+                fingerprints=xodr_diff.ElementFingerprints.scan(data)
+        except ValueError as e:
+            logging.error(f"XODR file {self.xodr_file} is not a valid OpenDRIVE file: {str(e)}")
+            report.error=constants.ErrorCode.INVALID_FORMAT
+            return report
+
+        old=self._fingerprints
+        if old is not None:
+            report.header_changed=old.header != fingerprints.header
+            report.added_roads, report.changed_roads, report.removed_roads=xodr_diff.diff_ids(old.roads, fingerprints.road_ids, fingerprints.roads)
+            report.added_junctions, report.changed_junctions, report.removed_junctions=xodr_diff.diff_ids(
+                old.junctions, fingerprints.junction_ids, fingerprints.junctions)
+        if old is None or self.store is not None or old.duplicates or fingerprints.duplicates or len(fingerprints.road_ids)==0:
+            return self._reload_full(report)
+        if not (report.header_changed or report.added_roads or report.changed_roads or report.removed_roads or
+                report.added_junctions or report.changed_junctions or report.removed_junctions):
+            self._fingerprints=fingerprints # same elements, possibly moved within the file
+            return report
+        try:
+            with instrumentation.timer('reload/incremental'):
+                self._reload_incremental(data, fingerprints, report)
+        except Exception as e:
+            logging.error(f"incremental reload of {self.xodr_file} failed, parsing it fully: {str(e)}")
+            return self._reload_full(report)
+        self._fingerprints=fingerprints
+        logging.info(f'reloaded {self.xodr_file}: roads +{len(report.added_roads)} ~{len(report.changed_roads)} -{len(report.removed_roads)}, '
+                     f'junctions +{len(report.added_junctions)} ~{len(report.changed_junctions)} -{len(report.removed_junctions)}')
+        return report
+
+    def _reload_full(self, report:constants.ReloadReport) -> constants.ReloadReport:
+        # parse everything again in the current mode, then restore sampling and compaction
+        lazy=self.lazy_roads is not None
+        compacted=self.store is not None
+        sample_params=self.sample_params if self.road_samples else None
+        self.track_changes=True
+        report.full=True
+        report.error=self.parse_xodr(lazy=lazy)
+        if report.error != constants.ErrorCode.OK:
+            return report
+        if sample_params is not None:
+            self.sample_roads(sample_params[0], max_error=sample_params[1])
+        if compacted:
+            self.compact()
+        return report
+
+    def _reload_incremental(self, data:bytes, fingerprints:xodr_diff.ElementFingerprints, report:constants.ReloadReport):
+        if report.header_changed:
+            start, end=fingerprints.header_span
+            self.odr_doc['header']=self._parse_header([etree.fromstring(data[start:end])])
+            self._geo_transform=None
+
+        # junctions: changed ones parsed again, file order kept
+        dirty_junctions=report.added_junctions + report.changed_junctions
+        parsed_junctions=[]
+        if dirty_junctions:
+            parsed_junctions=self._parse_junctions(list(etree.fromstring(xodr_diff.element_xml(data, fingerprints.junction_spans, dirty_junctions))))
+        junction_by_id={ junction.id:junction for junction in self.odr_doc['junctions'] if junction.id not in dirty_junctions }
+        junction_by_id.update({ junction.id:junction for junction in parsed_junctions })
+        junctions=[ junction_by_id[junction_id] for junction_id in fingerprints.junction_ids if junction_id in junction_by_id ]
+        self.odr_doc['junctions']=junctions if junctions else [constants.Junction()]
+
+        dirty_roads=report.added_roads + report.changed_roads
+        changed_road_ids=set(dirty_roads) | set(report.removed_roads)
+        if self.lazy_roads is not None:
+            self._reload_lazy(data, fingerprints, changed_road_ids)
+            return
+        parsed_roads=[]
+        if dirty_roads:
+            with instrumentation.timer('parse/roads'):
+                parsed_roads=self._parse_roads(list(etree.fromstring(xodr_diff.element_xml(data, fingerprints.road_spans, dirty_roads))))
+        parsed_table=network_store.GeometryTable.from_roads(parsed_roads)
+
+        # new road order: unchanged roads from the current list (source >= 0), parsed ones from parsed_table (source < 0)
+        old_roads=self.odr_doc['roads']
+        old_index={ road.id:i for i, road in enumerate(old_roads) }
+        parsed_index={ road.id:c for c, road in enumerate(parsed_roads) }
+        roads=[]
+        source=[]
+        for road_id in fingerprints.road_ids:
+            if road_id in parsed_index:
+                roads.append(parsed_roads[parsed_index[road_id]])
+                source.append(-parsed_index[road_id] - 1)
+            elif road_id in old_index and road_id not in changed_road_ids:
+                roads.append(old_roads[old_index[road_id]])
+                source.append(old_index[road_id])
+        source=np.array(source, dtype=np.int64)
+        reindexed=not np.array_equal(np.flatnonzero(source >= 0), source[source >= 0]) # some unchanged road moved
+        if self._geometry_table is not None:
+            with instrumentation.timer('reload/geometry_table'):
+                table, row_map=self._geometry_table.splice(len(old_roads), parsed_table, len(parsed_roads), source)
+            if self.spatial_index is not None:
+                with instrumentation.timer('reload/spatial_index'):
+                    n_old=len(self._geometry_table)
+                    kept=row_map[:n_old] >= 0
+                    added=row_map[n_old:]
+                    boxes=np.empty((len(table), 4))
+                    boxes[row_map[:n_old][kept]]=self.spatial_index.boxes[kept]
+                    boxes[added]=parsed_table.bounding_boxes()
+                    self.spatial_index.update(boxes, row_map[:n_old], added)
+            self._geometry_table=table
+        for road_id in changed_road_ids:
+            self._reference_lines.pop(road_id, None)
+        self.odr_doc['roads']=roads
+        self._road_index_by_id=None
+
+        if self.road_samples and self.sample_params is not None:
+            delta_step, max_error=self.sample_params
+            with instrumentation.timer('sample/reference_lines'):
+                sampled=parsed_table.sample_roads([ road.id for road in parsed_roads ], delta_step, max_error)
+            self._sample_surface(parsed_roads, sampled)
+            new_samples={ samples.road_id:samples for samples in sampled }
+            self.road_samples={ road.id:new_samples[road.id] if road.id in new_samples else self.road_samples[road.id] for road in roads }
+            self.sample_error=max((samples.max_chord_error for samples in self.road_samples.values()), default=0.0)
+
+        if self._routing_graph is not None:
+            with instrumentation.timer('reload/routing_graph'):
+                self._routing_graph=self._routing_graph.patch(roads, self.odr_doc['junctions'], self._reference_xy,
+                                                              changed_road_ids, dirty_junctions + report.removed_junctions)
+        # object outlines are cheap to rebuild; kept unless a changed road has objects or road indices moved
+        if self._object_index is not None and (reindexed or any(len(road.objects.ids) > 0 for road in parsed_roads) or
+                                               not changed_road_ids.isdisjoint(self._object_index.road_ids)):
+            self._object_index=None
+
+    def _reload_lazy(self, data:bytes, fingerprints:xodr_diff.ElementFingerprints, changed_road_ids:set):
+        # rescan byte ranges; materialized roads that did not change move over to the new sequence
+        scan=lazy_roads.RoadScan.from_bytes(self.xodr_file, data, self.ROOT_TAG)
+        roads=lazy_roads.LazyRoadSequence(scan, self._parse_roads, self.max_lazy_roads)
+        roads.adopt(self.lazy_roads, set(fingerprints.road_ids) - changed_road_ids)
+        self.lazy_roads=roads
+        self.odr_doc['roads']=roads
+        if self.road_samples and self.sample_params is not None:
+            self.road_samples=lazy_roads.LazyRoadSamples(roads, *self.sample_params)
+        # whole-network structures materialize every road anyway, so they are built again on next use
+        self._geometry_table=None
+        self.spatial_index=None
+        self._road_index_by_id=None
+        self._reference_lines={}
+        self._routing_graph=None
+        self._object_index=None
+
+    def set_store(self, store:network_store.NetworkStore):
+        # adopt an already built (e.g. cached) columnar store as the road model
+        self._reset_derived()
+        self.store=store
+        self.odr_doc['roads']=store.roads
+        self.road_samples={ road_id:store.road_samples(i) for i, road_id in enumerate(store.road_ids) }
+        self.sample_error=float(store.road_chord_error.max()) if len(store.road_chord_error) > 0 else 0.0
+
+    def _pack_samples(self):
+        self.store.set_samples(self.road_samples)
+        self.road_samples={ road_id:self.store.road_samples(i) for i, road_id in enumerate(self.store.road_ids) }
+
+    def geometry_table(self) -> network_store.GeometryTable:
+        if self.store is not None:
+            return self.store.geometries
+        if self._geometry_table is None:
+            with instrumentation.timer('build/geometry_table'):
+                self._geometry_table=network_store.GeometryTable.from_roads(self.odr_doc['roads'])
+        return self._geometry_table
+
+    def road_index(self, road_id:str) -> int:
+        if self.lazy_roads is not None:
+            return self.lazy_roads.road_index_by_id[road_id]
+        if self.store is not None:
+            return self.store.road_index_by_id[road_id]
+        if self._road_index_by_id is None:
+            self._road_index_by_id={ road.id:i for i, road in enumerate(self.odr_doc['roads']) }
+        return self._road_index_by_id[road_id]
+
+    def reference_line(self, road_id:str) -> geometry_math.ReferenceLine:
+        # built once per road and kept for later queries
+        if self.lazy_roads is not None:
+            return self.lazy_roads.reference_line(self.road_index(road_id))
+        reference_line=self._reference_lines.get(road_id)
+        if reference_line is None:
+            table=self.geometry_table()
+            i=self.road_index(road_id)
+            offsets=table.road_geometry_offsets(len(self.odr_doc['roads'])) if self.store is None else self.store.road_geometry_offsets
+            reference_line=geometry_math.ReferenceLine.from_table(table, offsets[i], offsets[i+1])
+            self._reference_lines[road_id]=reference_line
+        return reference_line
+
+    def st_to_xy(self, road_id:str, s, t=0.0):
+        # (x, y, hdg, curvature) along one road for scalar or array s
+        return self.reference_line(road_id).evaluate(s, t)
+
+    def _reference_xy(self, road_id:str, s):
+        # reference line points for the routing graph, s clamped to the geometries whose lengths may not add up to Road.length
+        reference_line=self.reference_line(road_id)
+        return reference_line.evaluate(np.clip(s, 0.0, reference_line.total_length))[:2]
+
+    def surface(self, road_id:str, s, t=0.0):
+        # road surface (z, roll) at (s, t) from elevation, superelevation and lateral shape
+        road=self.odr_doc['roads'][self.road_index(road_id)]
+        return geometry_math.road_surface(road.elevationProfile.elevation, road.lateralProfile.superelevation,
+                                          road.lateralProfile.shape, s, t)
+
+    def lane_boundaries(self, road_id:str, s=None) -> constants.LaneBoundaries:
+        # outer boundary polylines of every lane, on the road's samples or on the given s values
+        if s is None:
+            samples=self.road_samples[road_id]
+            s, x, y, hdg=samples.s, samples.x, samples.y, samples.hdg
+        else:
+            s=np.sort(np.atleast_1d(np.asarray(s, dtype=np.float64)))
+            x, y, hdg, _=self.st_to_xy(road_id, s)
+        lanes=self.odr_doc['roads'][self.road_index(road_id)].lanes
+        return lane_geometry.lane_boundaries(road_id, lanes, s, x, y, hdg)
+
+    def locate_lanes(self, points, max_dist:float=5.0) -> constants.LanePositions:
+        # (N, 2) world points -> road, lane section, lane id and (s, t) for each point
+        with instrumentation.timer('query/locate_lanes'):
+            return self._locate_lanes(points, max_dist)
+
+    def _locate_lanes(self, points, max_dist:float) -> constants.LanePositions:
+        points=np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        instrumentation.count('query/locate_lanes_points', len(points))
+        x, y=points[:, 0], points[:, 1]
+        if self.spatial_index is None:
+            self.build_spatial_index()
+        table=self.geometry_table()
+
+        # candidate (point, geometry) pairs from the grid, projected one geometry at a time
+        pair_point, pair_geometry=self.spatial_index.query_batch(x, y, max_dist)
+        point_order=np.argsort(pair_geometry, kind='stable')
+        pair_point, pair_geometry=pair_point[point_order], pair_geometry[point_order]
+        pair_s=np.empty(len(pair_point))
+        pair_t=np.empty(len(pair_point))
+        pair_dist=np.empty(len(pair_point))
+        bounds=np.flatnonzero(np.diff(pair_geometry, prepend=-1, append=-1) != 0)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            pair_s[a:b], pair_t[a:b], pair_dist[a:b]=table.project_batch(pair_geometry[a], x[pair_point[a:b]], y[pair_point[a:b]])
+
+        # lane lookup one road at a time; table rows are grouped by road, so road runs are contiguous too
+        pair_road=table.road_index[pair_geometry].astype(np.int64)
+        pair_section=np.full(len(pair_point), -1, dtype=np.int64)
+        pair_lane=np.zeros(len(pair_point), dtype=np.int32)
+        roads=self.odr_doc['roads']
+        bounds=np.flatnonzero(np.diff(pair_road, prepend=-1, append=-1) != 0)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            pair_section[a:b], pair_lane[a:b]=lane_geometry.locate_in_lanes(roads[int(pair_road[a])].lanes, pair_s[a:b], pair_t[a:b])
+
+        # per point: prefer a perpendicular projection that falls inside a lane, then the smallest distance.
+        # point_order maps back to the grid query order, where pairs are sorted by point
+        perpendicular=np.abs(pair_dist - pair_t*pair_t) <= 1e-6*(1.0+pair_dist)
+        in_range=pair_dist <= max_dist*max_dist
+        score=pair_dist + np.where((pair_lane != 0) & perpendicular, 0.0, 4.0*max_dist*max_dist+1.0)
+        score[~in_range]=np.inf
+        by_point=np.empty_like(point_order)
+        by_point[point_order]=np.arange(len(point_order))
+        score=score[by_point]
+        points_sorted=pair_point[by_point]
+        first=np.empty(0, dtype=np.int64)
+        if len(score) > 0:
+            starts=np.flatnonzero(np.diff(points_sorted, prepend=-1) != 0)
+            group_min=np.minimum.reduceat(score, starts)
+            is_min=np.flatnonzero(score == np.repeat(group_min, np.diff(np.append(starts, len(score)))))
+            first=by_point[is_min[np.diff(points_sorted[is_min], prepend=-1) != 0]]
+            first=first[in_range[first]]
+
+        n=len(points)
+        result=constants.LanePositions(
+            road_index=np.full(n, -1, dtype=np.int64), road_id=np.full(n, "", dtype=object),
+            section=np.full(n, -1, dtype=np.int64), lane_id=np.zeros(n, dtype=np.int32),
+            s=np.full(n, np.nan), t=np.full(n, np.nan), dist=np.full(n, np.nan))
+        p=pair_point[first]
+        result.road_index[p]=pair_road[first]
+        road_ids=np.array([ road.id for road in roads ], dtype=object)
+        result.road_id[p]=road_ids[pair_road[first]]
+        result.section[p]=pair_section[first]
+        result.lane_id[p]=pair_lane[first]
+        result.s[p]=pair_s[first]
+        result.t[p]=pair_t[first]
+        result.dist[p]=np.sqrt(pair_dist[first])
+        return result
+
+    def routing_graph(self) -> routing.RoutingGraph:
+        # lane-level topology, built on first use
+        if self._routing_graph is None:
+            with instrumentation.timer('build/routing_graph'):
+                self._routing_graph=routing.RoutingGraph.build(self.odr_doc['roads'], self.odr_doc['junctions'], self._reference_xy)
+        return self._routing_graph
+
+    def route(self, from_road:str, from_lane:int, to_road:str, to_lane:int, from_s:float=None, to_s:float=None) -> constants.Route:
+        # shortest lane-level route, None when to_road/to_lane cannot be reached
+        return self.routing_graph().route(from_road, from_lane, to_road, to_lane, from_s, to_s)
+
+    def object_index(self) -> road_objects.ObjectIndex:
+        # world outlines of all road objects with their spatial index, built on first use
+        if self._object_index is None:
+            with instrumentation.timer('build/object_index'):
+                self._object_index=road_objects.ObjectIndex.build(self.odr_doc['roads'], self.reference_line)
+        return self._object_index
+
+    def geo_transform(self) -> proj_trans.GeoTransform:
+        # local xy <-> WGS84 lon/lat from the header geoReference, raises ValueError when the map has none
+        if self._geo_transform is None:
+            self._geo_transform=proj_trans.GeoTransform.from_header(self.odr_doc['header'])
+        return self._geo_transform
+
+    def validate(self, position_tolerance:float=validation.POSITION_TOLERANCE, heading_tolerance:float=validation.HEADING_TOLERANCE,
+                 length_tolerance:float=validation.LENGTH_TOLERANCE) -> List[constants.ValidationIssue]:
+        # continuity of geometries, road links and junction connections, and s against Road.length; empty when consistent
+        table=self.geometry_table()
+        with instrumentation.timer('validate/network'):
+            issues=validation.validate(table, self.odr_doc['roads'], self.odr_doc['junctions'],
+                                       position_tolerance, heading_tolerance, length_tolerance)
+        logging.info(f'validation: {len(issues)} issues in {len(self.odr_doc["roads"])} roads')
+        return issues
+
+    def locate_lanes_lonlat(self, lon, lat, max_dist:float=5.0) -> constants.LanePositions:
+        # locate_lanes for WGS84 points, e.g. a GPS trace, converted in one batch
+        x, y=self.geo_transform().from_lonlat(np.ravel(lon), np.ravel(lat))
+        return self.locate_lanes(np.column_stack((x, y)), max_dist)
+
+    def xy_to_st(self, road_id:str, x, y):
+        # project N points onto the reference line of one road, returns s, t, squared distance arrays
+        table=self.geometry_table()
+        geometry_indices=np.flatnonzero(table.road_index == self.road_index(road_id))
+        return table.project_road_batch(geometry_indices, x, y)
+
+    def build_spatial_index(self, cell_size:float=None) -> spatial_index.GridIndex:
+        table=self.geometry_table()
+        with instrumentation.timer('build/spatial_index'):
+            self.spatial_index=spatial_index.GridIndex(table.bounding_boxes(), cell_size)
+        logging.info(f'spatial index built: {len(table)} geometries, cell size {self.spatial_index.cell_size:.1f} m')
+        return self.spatial_index
+
+    def road(self, road_id:str) -> constants.Road:
+        return self.odr_doc['roads'][self.road_index(road_id)]
+
+    def roads_near(self, x:float, y:float, max_dist:float=0.0) -> List[str]:
+        # ids of the roads that may pass within max_dist of (x, y); in lazy mode no road is parsed for this
+        if self.lazy_roads is not None:
+            return [ self.lazy_roads.road_ids[i] for i in self.lazy_roads.roads_near(x, y, max_dist) ]
+        if self.spatial_index is None:
+            self.build_spatial_index()
+        table=self.geometry_table()
+        road_indices=np.unique(table.road_index[self.spatial_index.query(x, y, max_dist)])
+        return [ self.odr_doc['roads'][int(i)].id for i in road_indices ]
+
+    def _locate_lazy(self, x:float, y:float, max_dist:float):
+        best=None
+        for i in self.lazy_roads.roads_near(x, y, max_dist):
+            table=self.lazy_roads.geometries(i)
+            s, t, dist2=table.project_road_batch(np.arange(len(table)), x, y)
+            if dist2[0] <= max_dist*max_dist and (best is None or dist2[0] < best[3]):
+                best=(i, s[0], t[0], dist2[0])
+        if best is None:
+            return None
+        i, s, t, dist2=best
+        return self.lazy_roads.road_ids[i], float(s), float(t), float(np.sqrt(dist2))
 
+    def locate(self, x:float, y:float, max_dist:float=5.0):
+        # nearest road to (x, y) within max_dist, returns (road_id, s, t, dist) or None
+        if self.lazy_roads is not None:
+            return self._locate_lazy(x, y, max_dist)
+        if self.spatial_index is None:
+            self.build_spatial_index()
+        table=self.geometry_table()
+        best=None
+        for j in self.spatial_index.query(x, y, max_dist):
+            s, t, dist2=table.project(j, x, y)
+            if dist2 <= max_dist*max_dist and (best is None or dist2 < best[3]):
+                best=(j, s, t, dist2)
+        if best is None:
+            return None
+        j, s, t, dist2=best
+        road_id=self.odr_doc['roads'][int(table.road_index[j])].id
+        return road_id, float(s), float(t), float(np.sqrt(dist2))
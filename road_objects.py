@@ -0,0 +1,197 @@
+import logging
+import numpy as np
+from typing import List
+import spatial_index
+
+# 道路物体（<objects>/<object>）的世界坐标多边形：所有轮廓顶点打包在一个缓冲区中，
+# 物体 i 的顶点为 [vertex_offsets[i], vertex_offsets[i+1])。cornerLocal 的 (u, v) 经参考线 st→xy 批量转换，
+# 无轮廓的物体按 length x width 矩形或 radius 圆近似。半径查询和线段相交查询先用网格索引筛选再精确判断。
+
+CIRCLE_VERTICES = 16 # polygon approximating objects that only have a radius
+
+def _fallback_outline(width:float, length:float, radius:float) -> np.ndarray:
+    # local u, v, z corners of an object without an outline
+    if radius > 0.0:
+        angle = np.linspace(0.0, 2.0*np.pi, CIRCLE_VERTICES, endpoint=False)
+        return np.column_stack((radius*np.cos(angle), radius*np.sin(angle), np.zeros(CIRCLE_VERTICES)))
+    u, v = 0.5*length, 0.5*width
+    if u <= 0.0 and v <= 0.0:
+        return np.zeros((1, 3))
+    return np.array([[-u, -v, 0.0], [u, -v, 0.0], [u, v, 0.0], [-u, v, 0.0]])
+
+def _segment_dist2(px, py, x0, y0, x1, y1):
+    # squared distance from points to segments, element-wise
+    dx, dy = x1 - x0, y1 - y0
+    length2 = dx*dx + dy*dy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        u = np.where(length2 > 0.0, ((px - x0)*dx + (py - y0)*dy) / length2, 0.0)
+    u = np.clip(u, 0.0, 1.0)
+    ex, ey = x0 + u*dx - px, y0 + u*dy - py
+    return ex*ex + ey*ey
+
+def _cross(ax, ay, bx, by):
+    return ax*by - ay*bx
+
+class ObjectIndex:
+    def __init__(self):
+        self.object_ids:List[str] = []
+        self.object_names:List[str] = []
+        self.object_types:List[str] = []
+        self.road_ids:List[str] = []
+        self.road_index = np.zeros(0, dtype=np.int64)
+        self.height = np.zeros(0)
+        # outline of object i is vertices [vertex_offsets[i], vertex_offsets[i+1]), closed implicitly
+        self.vertex_offsets = np.zeros(1, dtype=np.int64)
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.z = np.zeros(0) # zOffset + corner z, relative to the road surface
+        # edge k joins vertex k and vertex next_vertex[k] of the same object
+        self.next_vertex = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4))
+        self.grid:spatial_index.GridIndex = None
+
+    def __len__(self):
+        return len(self.object_ids)
+
+    @staticmethod
+    def build(roads, reference_line_fn) -> 'ObjectIndex':
+        # reference_line_fn(road_id) -> geometry_math.ReferenceLine; one evaluate call per road with objects
+        index = ObjectIndex()
+        xs, ys, zs, counts, road_index, heights = [], [], [], [], [], []
+        for i, road in enumerate(roads):
+            objects = road.objects
+            n = len(objects.ids)
+            if n == 0:
+                continue
+            reference_line = reference_line_fn(road.id)
+            s, t, z_offset, hdg, width, length, radius, height = objects.params.T
+            outlines = []
+            for k in range(n):
+                corners = objects.corners[objects.corner_offsets[k]:objects.corner_offsets[k + 1]]
+                outlines.append(corners if len(corners) > 0 else _fallback_outline(width[k], length[k], radius[k]))
+            sizes = np.array([len(outline) for outline in outlines], dtype=np.int64)
+            corners = np.concatenate(outlines)
+            owner = np.repeat(np.arange(n), sizes)
+            road_corner = (objects.corner_road & (np.diff(objects.corner_offsets) > 0))[owner]
+            # object origins and cornerRoad corners are both (s, t) points on this road
+            st_s = np.concatenate((s, corners[road_corner, 0]))
+            st_t = np.concatenate((t, corners[road_corner, 1]))
+            px, py, phdg, _ = reference_line.evaluate(np.clip(st_s, 0.0, reference_line.total_length), st_t)
+            heading = (phdg[:n] + hdg)[owner]
+            u, v = corners[:, 0], corners[:, 1]
+            x = px[:n][owner] + u*np.cos(heading) - v*np.sin(heading)
+            y = py[:n][owner] + u*np.sin(heading) + v*np.cos(heading)
+            x[road_corner] = px[n:]
+            y[road_corner] = py[n:]
+            xs.append(x)
+            ys.append(y)
+            zs.append(z_offset[owner] + corners[:, 2])
+            counts.append(sizes)
+            road_index.append(np.full(n, i, dtype=np.int64))
+            heights.append(height)
+            index.object_ids.extend(objects.ids)
+            index.object_names.extend(objects.names)
+            index.object_types.extend(objects.types)
+            index.road_ids.extend([road.id] * n)
+        if not counts:
+            index.grid = spatial_index.GridIndex(index.boxes)
+            return index
+        counts = np.concatenate(counts)
+        index.vertex_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        index.x = np.concatenate(xs)
+        index.y = np.concatenate(ys)
+        index.z = np.concatenate(zs)
+        index.road_index = np.concatenate(road_index)
+        index.height = np.concatenate(heights)
+        index.next_vertex = np.arange(len(index.x)) + 1
+        index.next_vertex[index.vertex_offsets[1:] - 1] = index.vertex_offsets[:-1]
+        starts = index.vertex_offsets[:-1]
+        index.boxes = np.column_stack((np.minimum.reduceat(index.x, starts), np.minimum.reduceat(index.y, starts),
+                                       np.maximum.reduceat(index.x, starts), np.maximum.reduceat(index.y, starts)))
+        index.grid = spatial_index.GridIndex(index.boxes)
+        logging.info(f'indexed {len(index)} road objects with {len(index.x)} outline vertices')
+        return index
+
+    def polygon(self, i:int) -> np.ndarray:
+        # (k, 2) world outline of object i
+        a, b = self.vertex_offsets[i], self.vertex_offsets[i + 1]
+        return np.column_stack((self.x[a:b], self.y[a:b]))
+
+    def _pair_edges(self, objects:np.ndarray):
+        # every edge of every candidate object: (pair of each edge, first vertex, second vertex, group starts)
+        counts = np.diff(self.vertex_offsets)[objects]
+        pair = np.repeat(np.arange(len(objects)), counts)
+        vertex = np.repeat(self.vertex_offsets[objects] - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+        return pair, vertex, self.next_vertex[vertex], np.cumsum(counts) - counts
+
+    def _inside(self, px, py, a, b, starts) -> np.ndarray:
+        # even-odd test of each pair's point against its object's edges
+        x0, y0, x1, y1 = self.x[a], self.y[a], self.x[b], self.y[b]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = ((y0 > py) != (y1 > py)) & (px < (x1 - x0)*(py - y0) / (y1 - y0) + x0)
+        return (np.add.reduceat(crossing.astype(np.int64), starts) % 2 == 1) if len(starts) else np.zeros(0, dtype=bool)
+
+    def within_radius_batch(self, x, y, radius:float):
+        # all (point index, object index, distance) with the object's outline or area within radius of the point;
+        # distance is 0 inside an object
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        points, objects = self.grid.query_batch(x, y, radius)
+        if len(points) == 0:
+            return points, objects, np.zeros(0)
+        pair, a, b, starts = self._pair_edges(objects)
+        px, py = x[points][pair], y[points][pair]
+        dist2 = np.minimum.reduceat(_segment_dist2(px, py, self.x[a], self.y[a], self.x[b], self.y[b]), starts)
+        dist2[self._inside(px, py, a, b, starts)] = 0.0
+        keep = dist2 <= radius*radius
+        return points[keep], objects[keep], np.sqrt(dist2[keep])
+
+    def within_radius(self, x:float, y:float, radius:float):
+        # object indices within radius of one point, nearest first, and their distances
+        _, objects, dist = self.within_radius_batch(x, y, radius)
+        order = np.argsort(dist, kind='stable')
+        return objects[order], dist[order]
+
+    def intersect_segments_batch(self, x0, y0, x1, y1):
+        # all (segment index, object index) where the segment crosses, touches or lies inside the object
+        x0, y0, x1, y1 = (np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (x0, y0, x1, y1))
+        # candidates: boxes within half the segment length of its midpoint, then the segment box itself.
+        # segments are queried in groups of similar length so one long segment does not widen every query
+        mx, my = 0.5*(x0 + x1), 0.5*(y0 + y1)
+        half = 0.5*np.hypot(x1 - x0, y1 - y0)
+        level = np.ceil(np.log2(np.maximum(half / self.grid.cell_size, 1.0))).astype(np.int64)
+        segment_parts, object_parts = [], []
+        for value in np.unique(level):
+            members = np.flatnonzero(level == value)
+            found, objects = self.grid.query_batch(mx[members], my[members], float(half[members].max()))
+            segment_parts.append(members[found])
+            object_parts.append(objects)
+        segments = np.concatenate(segment_parts) if segment_parts else np.zeros(0, dtype=np.int64)
+        objects = np.concatenate(object_parts) if object_parts else np.zeros(0, dtype=np.int64)
+        boxes = self.boxes[objects]
+        keep = ((boxes[:, 0] <= np.maximum(x0, x1)[segments]) & (boxes[:, 2] >= np.minimum(x0, x1)[segments]) &
+                (boxes[:, 1] <= np.maximum(y0, y1)[segments]) & (boxes[:, 3] >= np.minimum(y0, y1)[segments]))
+        segments, objects = segments[keep], objects[keep]
+        if len(segments) == 0:
+            return segments, objects
+        pair, a, b, starts = self._pair_edges(objects)
+        sx0, sy0 = x0[segments][pair], y0[segments][pair]
+        sx1, sy1 = x1[segments][pair], y1[segments][pair]
+        ex0, ey0, ex1, ey1 = self.x[a], self.y[a], self.x[b], self.y[b]
+        d1 = _cross(ex1 - ex0, ey1 - ey0, sx0 - ex0, sy0 - ey0)
+        d2 = _cross(ex1 - ex0, ey1 - ey0, sx1 - ex0, sy1 - ey0)
+        d3 = _cross(sx1 - sx0, sy1 - sy0, ex0 - sx0, ey0 - sy0)
+        d4 = _cross(sx1 - sx0, sy1 - sy0, ex1 - sx0, ey1 - sy0)
+        crossing = (d1*d2 <= 0.0) & (d3*d4 <= 0.0)
+        # collinear pieces only touch when their extents overlap
+        collinear = (d1 == 0.0) & (d2 == 0.0)
+        overlap = ((np.minimum(sx0, sx1) <= np.maximum(ex0, ex1)) & (np.minimum(ex0, ex1) <= np.maximum(sx0, sx1)) &
+                   (np.minimum(sy0, sy1) <= np.maximum(ey0, ey1)) & (np.minimum(ey0, ey1) <= np.maximum(sy0, sy1)))
+        crossing &= ~collinear | overlap
+        hit = np.add.reduceat(crossing.astype(np.int64), starts) > 0
+        hit |= self._inside(sx0, sy0, a, b, starts)
+        return segments[hit], objects[hit]
+
+    def intersect_segment(self, x0:float, y0:float, x1:float, y1:float) -> np.ndarray:
+        # indices of the objects hit by one segment
+        return self.intersect_segments_batch(x0, y0, x1, y1)[1]
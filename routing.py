@@ -0,0 +1,375 @@
+import heapq
+import logging
+import numpy as np
+from functools import lru_cache
+from typing import List
+import constants
+import instrumentation
+
+# 车道级路网拓扑：节点 = (道路, 车道段, 车道)，边来自车道 link、道路 predecessor/successor
+# 以及 junction connection 的 laneLink，以 CSR（indptr/indices/weights/lengths）存储，
+# weights 为搜索代价（含变道代价），lengths 为沿道路的实际长度；
+# 路径搜索使用 A*（启发函数为到终点的直线距离乘以一个不大于 1 的系数，系数由每条边的代价与其两端节点间
+# 距离之比的最小值求出，保证启发函数一致），h = 0 时即 Dijkstra
+
+DEFAULT_LANE_TYPES = ('driving',)
+LANE_CHANGE_COST = 10.0 # 同向相邻车道变道代价 (m)，只计入搜索代价，不计入路线长度
+
+class RoutingGraph:
+    def __init__(self):
+        # node arrays, node i is lane node_lane[i] of section node_section[i] of road node_road[i];
+        # node_road is -1 for nodes retired by patch, which have no edges
+        self.node_road = np.zeros(0, dtype=np.int64)
+        self.node_section = np.zeros(0, dtype=np.int64)
+        self.node_lane = np.zeros(0, dtype=np.int32)
+        self.node_s0 = np.zeros(0)
+        self.node_length = np.zeros(0)
+        self.node_x = np.zeros(0) # reference line point where travel on the lane enters the section
+        self.node_y = np.zeros(0)
+        # lane graph, out edges of node i are indices[indptr[i]:indptr[i+1]]
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.weights = np.zeros(0) # search cost of each edge
+        self.lengths = np.zeros(0) # distance along the road of each edge, 0 for lane changes
+        # heuristic factor: the smallest ratio of edge weight to the distance between its nodes, at most 1
+        self.heuristic_scale = 1.0
+        # road graph, same layout over road indices
+        self.road_indptr = np.zeros(1, dtype=np.int64)
+        self.road_indices = np.zeros(0, dtype=np.int64)
+        self.road_weights = np.zeros(0)
+        self.road_ids:List[str] = []
+        self.road_index_by_id = {}
+        self.lane_types = set(DEFAULT_LANE_TYPES)
+        self._node_by_key = {} # (road id, section, lane id) -> node
+        self._lane_nodes = {} # (road id, lane id) -> nodes of that lane in section order
+        self._search_nodes = None
+        self._search_roads = None
+        self.set_cache_size(1024)
+
+    @classmethod
+    def build(cls, roads, junctions:List[constants.Junction], position_fn, lane_types=DEFAULT_LANE_TYPES) -> 'RoutingGraph':
+        # position_fn(road_id, s array) -> (x, y) on the reference line of that road
+        graph = cls()
+        graph.lane_types = set(lane_types)
+        graph.road_ids = [road.id for road in roads]
+        graph.road_index_by_id = {road_id: i for i, road_id in enumerate(graph.road_ids)}
+        graph._append_nodes(roads, range(len(roads)), position_fn)
+
+        connections_by_incoming = cls._connections_by_incoming(junctions)
+        sources, targets, weights, lengths = graph._out_edges(roads, connections_by_incoming, graph._node_by_key.items())
+        graph.indptr, graph.indices, graph.weights, graph.lengths = cls._csr(len(graph.node_road), sources, targets, weights, lengths)
+        graph._build_road_graph(roads, sources, targets)
+        graph._update_heuristic_scale()
+        logging.info(f'routing graph built: {len(graph.node_road)} lane nodes, {len(graph.indices)} lane edges, {len(graph.road_indices)} road edges')
+        return graph
+
+    def patch(self, roads, junctions:List[constants.Junction], position_fn, changed_road_ids, changed_junction_ids) -> 'RoutingGraph':
+        # update for new roads/junctions lists in which the elements with the given ids were added, changed or removed.
+        # nodes of the other roads keep their index and position, nodes of changed roads are retired and added again
+        # at the end, and out edges are recomputed only for roads whose links may lead somewhere else now.
+        # returns self, or a graph built from scratch once retired nodes outnumber live ones
+        changed_road_ids = set(changed_road_ids)
+        old_road_ids = self.road_ids
+        self.road_ids = [road.id for road in roads]
+        self.road_index_by_id = {road_id: i for i, road_id in enumerate(self.road_ids)}
+        road_map = np.full(len(old_road_ids) + 1, -1, dtype=np.int64) # old road index -> new one, last entry for retired nodes
+        for i, road_id in enumerate(old_road_ids):
+            if road_id not in changed_road_ids:
+                road_map[i] = self.road_index_by_id.get(road_id, -1)
+        retired = np.flatnonzero((self.node_road >= 0) & (road_map[self.node_road] < 0))
+        for u in retired:
+            self._node_by_key.pop((old_road_ids[self.node_road[u]], int(self.node_section[u]), int(self.node_lane[u])), None)
+            self._lane_nodes.pop((old_road_ids[self.node_road[u]], int(self.node_lane[u])), None)
+        self.node_road = road_map[self.node_road]
+        if 2 * np.count_nonzero(self.node_road < 0) > len(self.node_road):
+            graph = RoutingGraph.build(roads, junctions, position_fn, tuple(self.lane_types))
+            graph.set_cache_size(self.cache_info().maxsize)
+            return graph
+
+        # roads whose out edges may differ: the changed ones, and those linking to a changed road or to a junction
+        # that changed or connects a changed road
+        junction_ids = set(changed_junction_ids)
+        for junction in junctions:
+            if any(connection.connecting_road_id in changed_road_ids or connection.incomming_road_id in changed_road_ids
+                   for connection in junction.connections):
+                junction_ids.add(junction.id)
+        added_roads = [self.road_index_by_id[road_id] for road_id in changed_road_ids if road_id in self.road_index_by_id]
+        affected = np.zeros(len(roads) + 1, dtype=bool)
+        affected[added_roads] = True
+        for i, road in enumerate(roads):
+            for link_end in (road.link.predecessor, road.link.successor):
+                if ((link_end.element_type == 'road' and link_end.element_id in changed_road_ids) or
+                        (link_end.element_type == 'junction' and link_end.element_id in junction_ids)):
+                    affected[i] = True
+        n_old = len(self.node_road)
+        self._append_nodes(roads, sorted(added_roads), position_fn)
+
+        old_sources = np.repeat(np.arange(n_old), np.diff(self.indptr))
+        keep = ~affected[self.node_road[old_sources]] & (self.node_road[old_sources] >= 0) & (self.node_road[self.indices] >= 0)
+        recompute = np.flatnonzero(affected[self.node_road])
+        sources, targets, weights, lengths = self._out_edges(roads, self._connections_by_incoming(junctions),
+            [((self.road_ids[self.node_road[u]], int(self.node_section[u]), int(self.node_lane[u])), int(u)) for u in recompute])
+        sources = np.concatenate((old_sources[keep], np.asarray(sources, dtype=np.int64)))
+        targets = np.concatenate((self.indices[keep], np.asarray(targets, dtype=np.int64)))
+        weights = np.concatenate((self.weights[keep], np.asarray(weights, dtype=np.float64)))
+        lengths = np.concatenate((self.lengths[keep], np.asarray(lengths, dtype=np.float64)))
+        self.indptr, self.indices, self.weights, self.lengths = self._csr(len(self.node_road), sources, targets, weights, lengths)
+        self._build_road_graph(roads, sources, targets)
+        self._update_heuristic_scale()
+        self.set_cache_size(self.cache_info().maxsize) # cached routes may use retired nodes or missing edges
+        logging.info(f'routing graph patched: {len(recompute)} lane nodes re-linked, {len(retired)} retired')
+        return self
+
+    def _append_nodes(self, roads, road_indices, position_fn) -> List[tuple]:
+        # add a node per lane of the lane types in every section of the given roads, returns their (key, node) items
+        node_road, node_section, node_lane, node_s0, node_length = [], [], [], [], []
+        added = []
+        first = len(self.node_road)
+        for i in road_indices:
+            road = roads[i]
+            sections = road.lanes.sections
+            for k, section in enumerate(sections):
+                s1 = sections[k + 1].s if k + 1 < len(sections) else road.length
+                for lane_id, lane_type in zip(section.lane_ids, section.lane_types):
+                    if lane_id == 0 or lane_type not in self.lane_types:
+                        continue
+                    key = (road.id, k, int(lane_id))
+                    self._node_by_key[key] = first + len(node_road)
+                    self._lane_nodes.setdefault((road.id, int(lane_id)), []).append(first + len(node_road))
+                    added.append((key, first + len(node_road)))
+                    node_road.append(i)
+                    node_section.append(k)
+                    node_lane.append(int(lane_id))
+                    node_s0.append(section.s)
+                    node_length.append(max(s1 - section.s, 0.0))
+        node_road = np.array(node_road, dtype=np.int64)
+        node_s0 = np.array(node_s0, dtype=np.float64)
+        node_length = np.array(node_length, dtype=np.float64)
+        # right lanes enter their section at its start, left lanes at its end
+        s_entry = np.where(np.array(node_lane, dtype=np.int32) < 0, node_s0, node_s0 + node_length)
+        node_x = np.zeros(len(node_road))
+        node_y = np.zeros(len(node_road))
+        bounds = np.flatnonzero(np.diff(node_road, prepend=-1, append=-1) != 0)
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            road = roads[int(node_road[a])]
+            node_x[a:b], node_y[a:b] = position_fn(road.id, np.clip(s_entry[a:b], 0.0, road.length))
+        self.node_road = np.concatenate((self.node_road, node_road))
+        self.node_section = np.concatenate((self.node_section, np.array(node_section, dtype=np.int64)))
+        self.node_lane = np.concatenate((self.node_lane, np.array(node_lane, dtype=np.int32)))
+        self.node_s0 = np.concatenate((self.node_s0, node_s0))
+        self.node_length = np.concatenate((self.node_length, node_length))
+        self.node_x = np.concatenate((self.node_x, node_x))
+        self.node_y = np.concatenate((self.node_y, node_y))
+        return added
+
+    @staticmethod
+    def _connections_by_incoming(junctions:List[constants.Junction]) -> dict:
+        connections_by_incoming = {}
+        for junction in junctions:
+            for connection in junction.connections:
+                connections_by_incoming.setdefault((junction.id, connection.incomming_road_id), []).append(connection)
+        return connections_by_incoming
+
+    def _out_edges(self, roads, connections_by_incoming, keyed_nodes):
+        # (sources, targets, weights, lengths) of the out edges of the given ((road id, section, lane), node) items
+        sources, targets, weights, lengths = [], [], [], []
+        for (road_id, k, lane_id), u in keyed_nodes:
+            forward = lane_id < 0 # right lanes run along +s
+            i = self.road_index_by_id[road_id]
+            for v in self._successors(roads, connections_by_incoming, i, k, lane_id, forward):
+                sources.append(u)
+                targets.append(v)
+                weights.append(self.node_length[u])
+                lengths.append(self.node_length[u])
+            # lane change to a neighbouring lane of the same direction
+            for neighbour in (lane_id - 1, lane_id + 1):
+                v = self._node_by_key.get((road_id, k, neighbour))
+                if neighbour != 0 and v is not None:
+                    sources.append(u)
+                    targets.append(v)
+                    weights.append(LANE_CHANGE_COST)
+                    lengths.append(0.0)
+        return sources, targets, weights, lengths
+
+    def _build_road_graph(self, roads, sources, targets):
+        # road graph: an edge wherever some lane of one road continues onto another
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        road_source = self.node_road[sources] if len(sources) else np.zeros(0, dtype=np.int64)
+        road_target = self.node_road[targets] if len(targets) else np.zeros(0, dtype=np.int64)
+        between = road_source != road_target
+        pair_keys = np.unique(road_source[between] * len(roads) + road_target[between])
+        road_source, road_target = pair_keys // max(len(roads), 1), pair_keys % max(len(roads), 1)
+        road_lengths = np.array([road.length for road in roads], dtype=np.float64)
+        self.road_indptr, self.road_indices, self.road_weights = self._csr(
+            len(roads), road_source, road_target, road_lengths[road_source] if len(road_source) else [])
+
+    def _update_heuristic_scale(self):
+        # with node positions p, h(u) = scale * |p(u) - p(goal)| is consistent when scale * |p(u) - p(v)| <= weight(u, v)
+        # on every edge. Each edge is bounded by its own geometry: where linked reference lines are apart (e.g. junction
+        # roads offset by some lanes) that edge's gap lowers its ratio, lane changes do not move and never limit it
+        sources = np.repeat(np.arange(len(self.node_road)), np.diff(self.indptr))
+        distance = np.hypot(self.node_x[sources] - self.node_x[self.indices], self.node_y[sources] - self.node_y[self.indices])
+        moving = distance > 0.0
+        ratio = self.weights[moving] / distance[moving]
+        self.heuristic_scale = float(min(ratio.min(), 1.0)) if len(ratio) else 1.0
+
+    @staticmethod
+    def _csr(n:int, sources, targets, *values):
+        # (indptr, indices, *values) with the edges sorted by source
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        return (indptr, np.asarray(targets, dtype=np.int64)[order]) + tuple(np.asarray(v, dtype=np.float64)[order] for v in values)
+
+    def _entry_node(self, roads, road_id:str, contact_point:str, lane_id:int):
+        # node of lane_id in the first ("start") or last ("end") lane section of road_id
+        j = self.road_index_by_id.get(road_id)
+        if j is None or lane_id == 0 or not roads[j].lanes.sections:
+            return None
+        k = 0 if contact_point == 'start' else len(roads[j].lanes.sections) - 1
+        return self._node_by_key.get((road_id, k, int(lane_id)))
+
+    def _successors(self, roads, connections_by_incoming, i:int, k:int, lane_id:int, forward:bool) -> List[int]:
+        road = roads[i]
+        sections = road.lanes.sections
+        section = sections[k]
+        lane_row = np.flatnonzero(section.lane_ids == lane_id)[0]
+        linked_lane = int((section.lane_successors if forward else section.lane_predecessors)[lane_row])
+
+        # next lane section of the same road
+        k_next = k + 1 if forward else k - 1
+        if 0 <= k_next < len(sections):
+            v = self._node_by_key.get((road.id, k_next, linked_lane if linked_lane != 0 else lane_id))
+            return [] if v is None else [v]
+
+        link_end = road.link.successor if forward else road.link.predecessor
+        if link_end.element_type == 'road':
+            v = self._entry_node(roads, link_end.element_id, link_end.contact_point, linked_lane)
+            return [] if v is None else [v]
+        if link_end.element_type == 'junction':
+            nodes = []
+            for connection in connections_by_incoming.get((link_end.element_id, road.id), []):
+                for lane_link in connection.lane_links:
+                    if int(lane_link.from_lane_id or 0) != lane_id:
+                        continue
+                    v = self._entry_node(roads, connection.connecting_road_id, connection.contact_point, int(lane_link.to_lane_id or 0))
+                    if v is not None:
+                        nodes.append(v)
+            return nodes
+        return []
+
+    def node(self, road_id:str, lane_id:int, s:float=None):
+        # node of the lane at road s, s=None means the section where travel on that lane begins
+        nodes = self._lane_nodes.get((road_id, int(lane_id)))
+        if not nodes:
+            return None
+        if s is None:
+            return nodes[0] if lane_id < 0 else nodes[-1]
+        k = np.searchsorted(self.node_s0[nodes], s, side='right') - 1
+        return nodes[max(k, 0)]
+
+    def set_cache_size(self, maxsize:int):
+        # LRU of recent (start, goal) searches, cleared when resized
+        self._search_nodes = lru_cache(maxsize=maxsize)(self._astar)
+        self._search_roads = lru_cache(maxsize=maxsize)(self._dijkstra_roads)
+
+    def cache_info(self):
+        return self._search_nodes.cache_info()
+
+    def heuristic(self, goal:int) -> np.ndarray:
+        # lower bound of the remaining cost from every node to goal: straight line between their entry points,
+        # scaled so that no edge covers more distance than its weight
+        return self.heuristic_scale * np.hypot(self.node_x - self.node_x[goal], self.node_y - self.node_y[goal])
+
+    def _astar(self, start:int, goal:int, use_heuristic:bool=True):
+        # node path start .. goal, its cost and its length along the roads, or None when goal is unreachable
+        h = self.heuristic(goal) if use_heuristic else np.zeros(len(self.node_road))
+        cost = np.full(len(self.node_road), np.inf)
+        length = np.zeros(len(self.node_road))
+        parent = np.full(len(self.node_road), -1, dtype=np.int64)
+        cost[start] = 0.0
+        heap = [(h[start], 0.0, start)]
+        expanded = 0
+        while heap:
+            _, c_u, u = heapq.heappop(heap)
+            if u == goal:
+                break
+            if c_u > cost[u]:
+                continue
+            expanded += 1
+            a, b = self.indptr[u], self.indptr[u + 1]
+            for v, w, d in zip(self.indices[a:b].tolist(), self.weights[a:b].tolist(), self.lengths[a:b].tolist()):
+                c = c_u + w
+                if c < cost[v]:
+                    cost[v] = c
+                    length[v] = length[u] + d
+                    parent[v] = u
+                    heapq.heappush(heap, (c + h[v], c, v))
+        instrumentation.count('route/expanded_nodes', expanded)
+        if not np.isfinite(cost[goal]):
+            return None
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(parent[path[-1]]))
+        return tuple(reversed(path)), float(cost[goal]), float(length[goal])
+
+    def _dijkstra_roads(self, start:int, goal:int):
+        cost = np.full(len(self.road_ids), np.inf)
+        parent = np.full(len(self.road_ids), -1, dtype=np.int64)
+        cost[start] = 0.0
+        heap = [(0.0, start)]
+        while heap:
+            c_u, u = heapq.heappop(heap)
+            if u == goal:
+                break
+            if c_u > cost[u]:
+                continue
+            a, b = self.road_indptr[u], self.road_indptr[u + 1]
+            for v, w in zip(self.road_indices[a:b].tolist(), self.road_weights[a:b].tolist()):
+                if c_u + w < cost[v]:
+                    cost[v] = c_u + w
+                    parent[v] = u
+                    heapq.heappush(heap, (c_u + w, v))
+        if not np.isfinite(cost[goal]):
+            return None
+        path = [goal]
+        while path[-1] != start:
+            path.append(int(parent[path[-1]]))
+        return tuple(reversed(path))
+
+    def route(self, from_road:str, from_lane:int, to_road:str, to_lane:int,
+              from_s:float=None, to_s:float=None, use_heuristic:bool=True):
+        # lane-level route as constants.Route, or None when there is none.
+        # length counts whole sections, trimmed to from_s/to_s on the first and last one when given
+        start = self.node(from_road, from_lane, from_s)
+        goal = self.node(to_road, to_lane, to_s)
+        if start is None or goal is None:
+            return None
+        found = self._search_nodes(start, goal, use_heuristic)
+        if found is None:
+            return None
+        path, _, length = found
+        length += self.node_length[goal]
+        if from_s is not None:
+            travelled = from_s - self.node_s0[start]
+            length -= travelled if from_lane < 0 else self.node_length[start] - travelled
+        if to_s is not None:
+            remaining = self.node_s0[goal] + self.node_length[goal] - to_s
+            length -= remaining if to_lane < 0 else self.node_length[goal] - remaining
+        route = constants.Route(length=float(max(length, 0.0)))
+        for u in path:
+            route.road_ids.append(self.road_ids[int(self.node_road[u])])
+            route.sections.append(int(self.node_section[u]))
+            route.lane_ids.append(int(self.node_lane[u]))
+        return route
+
+    def road_route(self, from_road:str, to_road:str) -> List[str]:
+        # road ids from from_road to to_road over the road graph, empty when unreachable
+        start = self.road_index_by_id.get(from_road)
+        goal = self.road_index_by_id.get(to_road)
+        if start is None or goal is None:
+            return []
+        path = self._search_roads(start, goal)
+        return [] if path is None else [self.road_ids[i] for i in path]
@@ -0,0 +1,124 @@
+import os
+import json
+import numpy as np
+import constants
+import network_store
+
+# 采样点导出为可 mmap 的单文件，其他进程可 np.memmap 后零拷贝读取任意道路片段。
+#
+# 文件布局（小端）：
+#   header       HEADER_DTYPE，固定 128 字节
+#   road_offsets         int64[n_roads + 1]       道路 i 的采样点为 [road_offsets[i], road_offsets[i+1])
+#   geometry_offsets     int64[n_geometries + 1]  全局几何段 j 的采样点区间，同上
+#   road_geometry_offsets int64[n_roads + 1]      道路 i 的几何段为 [road_geometry_offsets[i], road_geometry_offsets[i+1])
+#   points               float64[6][n_points]     按列存储 s, x, y, hdg, z, roll（与 NetworkStore.samples 相同）
+#   road_ids             utf-8 JSON 字符串数组
+# 每一节都按 64 字节对齐，header 中记录每一节的起始位置。
+
+MAGIC = b'XODRSMPL'
+EXPORT_VERSION = 2
+ALIGNMENT = 64
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('n_columns', '<u4'),
+    ('n_roads', '<u8'),
+    ('n_geometries', '<u8'),
+    ('n_points', '<u8'),
+    ('road_offsets_pos', '<u8'),
+    ('geometry_offsets_pos', '<u8'),
+    ('road_geometry_offsets_pos', '<u8'),
+    ('points_pos', '<u8'),
+    ('road_ids_pos', '<u8'),
+    ('road_ids_nbytes', '<u8'),
+    ('reserved', '<u8', (5,)),
+])
+assert HEADER_DTYPE.itemsize == 128
+
+def _align(pos:int) -> int:
+    return (pos + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def export_samples(path:str, network):
+    # network must be sampled; a compacted network is exported straight from its buffer
+    store = network.store
+    if store is None:
+        store = network_store.NetworkStore.from_roads(network.odr_doc['roads'], network.road_samples)
+    road_ids = json.dumps(store.road_ids).encode('utf-8')
+    sections = [
+        ('road_offsets_pos', store.road_sample_offsets.astype('<i8')),
+        ('geometry_offsets_pos', store.geometry_sample_offsets.astype('<i8')),
+        ('road_geometry_offsets_pos', store.road_geometry_offsets.astype('<i8')),
+        ('points_pos', np.ascontiguousarray(store.samples, dtype='<f8')),
+    ]
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = EXPORT_VERSION
+    header['n_columns'] = network_store.SAMPLE_COLUMNS
+    header['n_roads'] = len(store.road_ids)
+    header['n_geometries'] = len(store.geometries)
+    header['n_points'] = store.samples.shape[1]
+    pos = HEADER_DTYPE.itemsize
+    for name, array in sections:
+        pos = _align(pos)
+        header[name] = pos
+        pos += array.nbytes
+    header['road_ids_pos'] = _align(pos)
+    header['road_ids_nbytes'] = len(road_ids)
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(header.tobytes())
+        for name, array in sections:
+            f.seek(int(header[name][0]))
+            f.write(array.tobytes())
+        f.seek(int(header['road_ids_pos'][0]))
+        f.write(road_ids)
+    os.replace(tmp_path, path)
+
+class MappedSamples:
+    # read-only, zero-copy view of an exported file; all arrays are np.memmap backed by the page cache
+    def __init__(self, path:str):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) != 1 or header['magic'][0] != MAGIC:
+            raise ValueError(f'{path} is not a sample export file')
+        header = header[0]
+        if header['version'] != EXPORT_VERSION:
+            raise ValueError(f"{path} has export version {header['version']}, expected {EXPORT_VERSION}")
+        n_roads = int(header['n_roads'])
+        n_geometries = int(header['n_geometries'])
+        n_points = int(header['n_points'])
+        self.road_offsets = self._map(header['road_offsets_pos'], '<i8', (n_roads + 1,))
+        self.geometry_offsets = self._map(header['geometry_offsets_pos'], '<i8', (n_geometries + 1,))
+        self.road_geometry_offsets = self._map(header['road_geometry_offsets_pos'], '<i8', (n_roads + 1,))
+        self.points = self._map(header['points_pos'], '<f8', (int(header['n_columns']), n_points))
+        with open(path, 'rb') as f:
+            f.seek(int(header['road_ids_pos']))
+            self.road_ids = json.loads(f.read(int(header['road_ids_nbytes'])).decode('utf-8'))
+        self.road_index_by_id = {road_id: i for i, road_id in enumerate(self.road_ids)}
+
+    def _map(self, pos, dtype, shape):
+        if np.prod(shape) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=int(pos), shape=shape)
+
+    def __len__(self):
+        return len(self.road_ids)
+
+    def road(self, road_index:int) -> constants.RoadSamples:
+        a, b = self.road_offsets[road_index], self.road_offsets[road_index + 1]
+        g0, g1 = self.road_geometry_offsets[road_index], self.road_geometry_offsets[road_index + 1]
+        samples = constants.RoadSamples()
+        samples.road_id = self.road_ids[road_index]
+        samples.s = self.points[network_store.SAMPLE_S, a:b]
+        samples.x = self.points[network_store.SAMPLE_X, a:b]
+        samples.y = self.points[network_store.SAMPLE_Y, a:b]
+        samples.hdg = self.points[network_store.SAMPLE_HDG, a:b]
+        samples.z = self.points[network_store.SAMPLE_Z, a:b]
+        samples.roll = self.points[network_store.SAMPLE_ROLL, a:b]
+        samples.geometry_offsets = np.asarray(self.geometry_offsets[g0:g1 + 1]) - a
+        return samples
+
+    def road_by_id(self, road_id:str) -> constants.RoadSamples:
+        return self.road(self.road_index_by_id[road_id])
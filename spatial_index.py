@@ -0,0 +1,140 @@
+import numpy as np
+
+# 均匀网格空间索引：每个几何段的包围盒登记到其覆盖的所有网格，
+# 网格 -> 几何段 以 CSR 形式存储（按网格 key 排序 + 偏移数组）
+
+class GridIndex:
+    def __init__(self, boxes:np.ndarray, cell_size:float=None):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        if cell_size is None:
+            extents = np.maximum(self.boxes[:, 2] - self.boxes[:, 0], self.boxes[:, 3] - self.boxes[:, 1])
+            cell_size = float(np.clip(np.median(extents), 5.0, 500.0)) if len(extents) > 0 else 50.0
+        self.cell_size = cell_size
+        if len(self.boxes) > 0:
+            self.x0 = float(self.boxes[:, 0].min())
+            self.y0 = float(self.boxes[:, 1].min())
+        else:
+            self.x0 = self.y0 = 0.0
+        self._build()
+
+    def _cell_range(self, xmin, ymin, xmax, ymax):
+        ix0 = np.floor((xmin - self.x0) / self.cell_size).astype(np.int64)
+        iy0 = np.floor((ymin - self.y0) / self.cell_size).astype(np.int64)
+        ix1 = np.floor((xmax - self.x0) / self.cell_size).astype(np.int64)
+        iy1 = np.floor((ymax - self.y0) / self.cell_size).astype(np.int64)
+        return ix0, iy0, ix1, iy1
+
+    def _build(self):
+        _, _, ix1, _ = self._cell_range(self.boxes[:, 0], self.boxes[:, 1], self.boxes[:, 2], self.boxes[:, 3])
+        self.n_cols = int(ix1.max()) + 1 if len(self.boxes) > 0 else 1
+        self._index(*self._cells(np.arange(len(self.boxes))))
+
+    def _cells(self, indices:np.ndarray):
+        # (cell key, box index) of every cell covered by the given boxes
+        ix0, iy0, ix1, iy1 = self._cell_range(*self.boxes[indices].T)
+        keys = []
+        items = []
+        for k, i in enumerate(indices):
+            gx, gy = np.meshgrid(np.arange(ix0[k], ix1[k] + 1), np.arange(iy0[k], iy1[k] + 1))
+            cell_keys = (gy * self.n_cols + gx).ravel()
+            keys.append(cell_keys)
+            items.append(np.full(len(cell_keys), i, dtype=np.int64))
+        keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+        items = np.concatenate(items) if items else np.empty(0, dtype=np.int64)
+        return keys, items
+
+    def _index(self, keys:np.ndarray, items:np.ndarray):
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        self.items = items[order]
+        # unique cell keys and [offsets[k], offsets[k+1]) ranges into items
+        self.cell_keys, starts = np.unique(keys, return_index=True)
+        self.cell_offsets = np.append(starts, len(keys)).astype(np.int64)
+
+    def update(self, boxes:np.ndarray, item_map:np.ndarray, added:np.ndarray):
+        # switch to a new set of boxes in place: item_map[i] is the new index of box i (-1 when it is gone) and
+        # added are the new indices of the boxes that were not indexed before; only those are rasterized into
+        # cells, unless one falls outside the current grid, which is then rebuilt with the same cell size
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        added = np.asarray(added, dtype=np.int64)
+        ix0, iy0, ix1, _ = self._cell_range(*boxes[added].T)
+        if len(added) > 0 and (ix0.min() < 0 or iy0.min() < 0 or ix1.max() >= self.n_cols):
+            self.boxes = boxes
+            self.x0 = float(boxes[:, 0].min())
+            self.y0 = float(boxes[:, 1].min())
+            self._build()
+            return
+        keys = np.repeat(self.cell_keys, np.diff(self.cell_offsets))
+        items = np.asarray(item_map, dtype=np.int64)[self.items]
+        keep = items >= 0
+        self.boxes = boxes
+        added_keys, added_items = self._cells(added)
+        self._index(np.concatenate((keys[keep], added_keys)), np.concatenate((items[keep], added_items)))
+
+    def query(self, x:float, y:float, max_dist:float=0.0) -> np.ndarray:
+        # indices of the boxes within max_dist of (x, y)
+        ix0, iy0, ix1, iy1 = self._cell_range(np.float64(x - max_dist), np.float64(y - max_dist),
+                                              np.float64(x + max_dist), np.float64(y + max_dist))
+        ix0 = max(int(ix0), 0)
+        ix1 = min(int(ix1), self.n_cols - 1)
+        if ix1 < ix0 or iy1 < 0:
+            return np.empty(0, dtype=np.int64)
+        iy0 = max(int(iy0), 0)
+        parts = []
+        for iy in range(iy0, int(iy1) + 1):
+            k0 = np.searchsorted(self.cell_keys, iy * self.n_cols + ix0, side='left')
+            k1 = np.searchsorted(self.cell_keys, iy * self.n_cols + ix1, side='right')
+            if k1 > k0:
+                parts.append(self.items[self.cell_offsets[k0]:self.cell_offsets[k1]])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.unique(np.concatenate(parts))
+        boxes = self.boxes[candidates]
+        dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0.0)
+        dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0.0)
+        return candidates[dx * dx + dy * dy <= max_dist * max_dist]
+
+    def query_batch(self, x, y, max_dist:float=0.0):
+        # all (point index, box index) pairs with the box within max_dist of the point, vectorized over points
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        if len(self.cell_keys) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        r = int(np.ceil(max_dist / self.cell_size))
+        ix = np.floor((x - self.x0) / self.cell_size).astype(np.int64)
+        iy = np.floor((y - self.y0) / self.cell_size).astype(np.int64)
+        point_parts = []
+        item_parts = []
+        for dy in range(-r, r + 1):
+            for dx in range(-r, r + 1):
+                cx = ix + dx
+                cy = iy + dy
+                keys = cy * self.n_cols + cx
+                k = np.searchsorted(self.cell_keys, keys)
+                k_valid = np.minimum(k, len(self.cell_keys) - 1)
+                hit = (cx >= 0) & (cx < self.n_cols) & (cy >= 0) & (k < len(self.cell_keys))
+                hit &= self.cell_keys[k_valid] == keys
+                points = np.flatnonzero(hit)
+                starts = self.cell_offsets[k[hit]]
+                counts = self.cell_offsets[k[hit] + 1] - starts
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                # expand each [start, start + count) range without a Python loop
+                run_starts = np.cumsum(counts) - counts
+                positions = np.repeat(starts - run_starts, counts) + np.arange(total)
+                point_parts.append(np.repeat(points, counts))
+                item_parts.append(self.items[positions])
+        if not point_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        pair_keys = np.sort(np.concatenate(point_parts) * len(self.boxes) + np.concatenate(item_parts))
+        pair_keys = pair_keys[np.concatenate(([True], np.diff(pair_keys) != 0))]
+        points = pair_keys // len(self.boxes)
+        items = pair_keys % len(self.boxes)
+        boxes = self.boxes[items]
+        px = x[points]
+        py = y[points]
+        ddx = np.maximum(np.maximum(boxes[:, 0] - px, px - boxes[:, 2]), 0.0)
+        ddy = np.maximum(np.maximum(boxes[:, 1] - py, py - boxes[:, 3]), 0.0)
+        keep = ddx * ddx + ddy * ddy <= max_dist * max_dist
+        return points[keep], items[keep]
@@ -0,0 +1,12 @@
+import os
+import sys
+import pytest
+
+# 测试共用：把仓库根目录加入 sys.path，样例地图路径作为 fixture
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture
+def sample_xodr() -> str:
+    return os.path.join(ROOT, 'lv20230504.xodr')
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import constants
+import road_network
+
+def _chord_distance(s_chords, x_chords, y_chords, s, x, y):
+    # distance of each point (at s) to the chord of the polyline that spans its s
+    i = np.clip(np.searchsorted(s_chords, s, side='right') - 1, 0, len(s_chords) - 2)
+    ax, ay = x_chords[i], y_chords[i]
+    dx, dy = x_chords[i + 1] - ax, y_chords[i + 1] - ay
+    u = np.clip(((x - ax)*dx + (y - ay)*dy) / np.maximum(dx*dx + dy*dy, 1e-300), 0.0, 1.0)
+    return np.hypot(ax + u*dx - x, ay + u*dy - y)
+
+@pytest.mark.parametrize('max_error', [0.01, 0.1])
+def test_chord_error_bound_against_dense_polyline(sample_xodr, max_error):
+    # per geometry, the chords between its samples and its end point against the curve sampled every 5 cm
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    adaptive = network.sample_roads(max_error=max_error)
+    assert network.sample_error <= max_error
+    table = network.geometry_table()
+    offsets = table.road_geometry_offsets(len(network.odr_doc['roads']))
+    dense_points = adaptive_points = 0
+    worst = 0.0
+    for i, road in enumerate(network.odr_doc['roads']):
+        samples = adaptive[road.id]
+        adaptive_points += len(samples.s)
+        for k, j in enumerate(range(offsets[i], offsets[i + 1])):
+            a, b = samples.geometry_offsets[k], samples.geometry_offsets[k + 1]
+            # the last geometry of a road already ends with the closing sample
+            s_chords = np.unique(np.append(samples.s[a:b] - table.s[j], table.length[j]))
+            x_chords, y_chords, _ = table.pose(j, s_chords)
+            s = np.linspace(0.0, table.length[j], max(int(table.length[j] / 0.05), 2))
+            x, y, _ = table.pose(j, s)
+            error = _chord_distance(s_chords, x_chords, y_chords, s, x, y)
+            assert error.max() <= samples.max_chord_error + 1e-9
+            worst = max(worst, float(error.max()))
+            dense_points += len(s)
+    # the bound is reached somewhere, with far fewer points than a fixed 5 cm step
+    assert worst > 0.5 * max_error
+    assert adaptive_points < 0.1 * dense_points
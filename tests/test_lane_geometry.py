@@ -0,0 +1,101 @@
+import numpy as np
+from lxml import etree
+import constants
+import road_network
+import lane_geometry
+
+def _cubic(records, s:float) -> float:
+    # records (start, a, b, c, d) sorted by start; the first one also applies before its start
+    active = [r for r in records if r[0] <= s] or records[:1]
+    if not active:
+        return 0.0
+    start, a, b, c, d = active[-1]
+    ds = s - start
+    return a + b*ds + c*ds**2 + d*ds**3
+
+def _records(elements, start:str):
+    return sorted(tuple(float(e.get(name)) for name in (start, 'a', 'b', 'c', 'd')) for e in elements)
+
+def _expected_boundaries(road_element, s:float) -> dict:
+    # lane id -> outer boundary t at road s, one lane and one record at a time straight from the XML
+    offset = _cubic(_records(road_element.findall('lanes/laneOffset'), 's'), s)
+    sections = road_element.findall('lanes/laneSection')
+    section = [e for e in sections if float(e.get('s')) <= s][-1]
+    ds = s - float(section.get('s'))
+    boundaries = {0:offset}
+    for side, sign in (('left', 1.0), ('right', -1.0)):
+        lanes = sorted(section.findall(f'{side}/lane'), key=lambda lane: abs(int(lane.get('id'))))
+        t = offset
+        for lane in lanes:
+            t += sign * _cubic(_records(lane.findall('width'), 'sOffset'), ds)
+            boundaries[int(lane.get('id'))] = t
+    return boundaries
+
+def test_lane_boundaries_match_xml(sample_xodr):
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    root = etree.parse(sample_xodr).getroot()
+    checked = 0
+    for road_element in root.findall('road'):
+        road_id = road_element.get('id')
+        s = np.linspace(0.0, network.reference_line(road_id).total_length, 7)
+        x, y, hdg, _ = network.st_to_xy(road_id, s)
+        for section in network.lane_boundaries(road_id, s).sections:
+            for k, s_k in enumerate(section.s):
+                expected = _expected_boundaries(road_element, s_k)
+                assert sorted(expected) == sorted(section.lane_ids.tolist())
+                for row, lane_id in enumerate(section.lane_ids):
+                    t = expected[int(lane_id)]
+                    np.testing.assert_allclose(section.t[row, k], t, atol=1e-9)
+                    i = int(np.searchsorted(s, s_k))
+                    np.testing.assert_allclose((section.x[row, k], section.y[row, k]),
+                                               (x[i] - t*np.sin(hdg[i]), y[i] + t*np.cos(hdg[i])), atol=1e-9)
+                    checked += 1
+    assert checked > 1000
+
+def _lane_centres(network, road_id:str, n:int=9):
+    # (section, lane id, s, t, x, y) at the middle of every lane wider than 0.5 m, at n s values
+    s = np.linspace(0.0, network.reference_line(road_id).total_length, n + 2)[1:-1]
+    x, y, hdg, _ = network.st_to_xy(road_id, s)
+    centres = []
+    for k, section in enumerate(network.lane_boundaries(road_id, s).sections):
+        ids = section.lane_ids.tolist()
+        for row, lane_id in enumerate(ids):
+            if lane_id == 0:
+                continue
+            inner = section.t[ids.index(lane_id - 1 if lane_id > 0 else lane_id + 1)]
+            t = 0.5 * (inner + section.t[row])
+            for j in np.flatnonzero(np.abs(section.t[row] - inner) > 0.5):
+                i = int(np.searchsorted(s, section.s[j]))
+                centres.append((k, lane_id, s[i], t[j], x[i] - t[j]*np.sin(hdg[i]), y[i] + t[j]*np.cos(hdg[i])))
+    return centres
+
+def test_locate_in_lanes_at_lane_centres(sample_xodr):
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    for road in network.odr_doc['roads']:
+        centres = _lane_centres(network, road.id)
+        if not centres:
+            continue
+        section, lane_id, s, t, _, _ = (np.array(column) for column in zip(*centres))
+        found_section, found_lane = lane_geometry.locate_in_lanes(road.lanes, s, t)
+        np.testing.assert_array_equal(found_section, section)
+        np.testing.assert_array_equal(found_lane, lane_id)
+    # outside the outermost boundary there is no lane
+    road = network.odr_doc['roads'][0]
+    _, found_lane = lane_geometry.locate_in_lanes(road.lanes, np.array([1.0, 1.0]), np.array([1e3, -1e3]))
+    np.testing.assert_array_equal(found_lane, [0, 0])
+
+def test_locate_lanes_at_lane_centres(sample_xodr):
+    # world points at the lane centres of roads outside junctions, where roads do not overlap; max_dist is measured
+    # to the reference line, which some outer lanes are more than 30 m away from
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    expected = [(road.id, lane_id, s, t, x, y) for road in network.odr_doc['roads'] if road.junction_id in ('', '-1')
+                for _, lane_id, s, t, x, y in _lane_centres(network, road.id)]
+    road_id, lane_id, s, t, x, y = (np.array(column) for column in zip(*expected))
+    positions = network.locate_lanes(np.column_stack((x, y)), max_dist=50.0)
+    np.testing.assert_array_equal(positions.road_id, road_id)
+    np.testing.assert_array_equal(positions.lane_id, lane_id)
+    np.testing.assert_allclose(positions.s, s, atol=1e-6)
+    np.testing.assert_allclose(positions.t, t, atol=1e-6)
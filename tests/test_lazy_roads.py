@@ -0,0 +1,29 @@
+import numpy as np
+import lazy_roads
+import xodr_diff
+
+def test_scan_matches_fingerprint_spans(sample_xodr):
+    # the lazy scan and the reload fingerprints split the file into the same elements
+    with open(sample_xodr, 'rb') as f:
+        data = f.read()
+    scan = lazy_roads.RoadScan.from_bytes(sample_xodr, data)
+    fingerprints = xodr_diff.ElementFingerprints.scan(data)
+    assert scan.road_ids == fingerprints.road_ids
+    assert [(int(a), int(b)) for a, b in zip(scan.road_starts, scan.road_ends)] == \
+           [fingerprints.road_spans[road_id] for road_id in fingerprints.road_ids]
+    start, end = fingerprints.header_span
+    assert scan.header_xml == data[start:end]
+    assert scan.junction_xml == [data[a:b] for a, b in (fingerprints.junction_spans[i] for i in fingerprints.junction_ids)]
+
+def test_scan_self_closing_road():
+    data = (b'<?xml version="1.0"?><OpenDRIVE><header revMajor="1"/>'
+            b'<road id="1" length="0"/>'
+            b'<road id="2" length="10.0"><planView><geometry s="0" x="1" y="2" hdg="0" length="10.0"><line/></geometry></planView></road>'
+            b'<junction id="3"/></OpenDRIVE>')
+    scan = lazy_roads.RoadScan.from_bytes('memory.xodr', data)
+    assert scan.road_ids == ['1', '2']
+    assert data[scan.road_starts[0]:scan.road_ends[0]] == b'<road id="1" length="0"/>'
+    assert data[scan.road_ends[1] - 7:scan.road_ends[1]] == b'</road>'
+    np.testing.assert_allclose(scan.road_length, [0.0, 10.0])
+    np.testing.assert_allclose(scan.boxes[1], [-9.0, -8.0, 11.0, 12.0])
+    assert scan.junction_xml == [b'<junction id="3"/>']
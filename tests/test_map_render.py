@@ -0,0 +1,25 @@
+import os
+import numpy as np
+import constants
+import road_network
+
+def _tiles(out_dir:str) -> dict:
+    tiles = {}
+    for root, _, files in os.walk(out_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            tiles[os.path.relpath(path, out_dir)] = np.load(path)
+    return tiles
+
+def test_pyramid_workers_match_serial(sample_xodr, tmp_path):
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    network.sample_roads(delta_step=0.5)
+    renderer = network.renderer(tile_size=64)
+    serial = renderer.render_pyramid(str(tmp_path / 'serial'), 3, workers=1, fmt='npy')
+    parallel = renderer.render_pyramid(str(tmp_path / 'parallel'), 3, workers=2, fmt='npy')
+    assert serial == parallel > 0
+    expected, tiles = _tiles(str(tmp_path / 'serial')), _tiles(str(tmp_path / 'parallel'))
+    assert sorted(tiles) == sorted(expected)
+    for name, raster in tiles.items():
+        np.testing.assert_array_equal(raster, expected[name])
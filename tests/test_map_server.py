@@ -0,0 +1,87 @@
+import asyncio
+import numpy as np
+import pytest
+import constants
+import road_network
+import map_server
+import map_client
+
+@pytest.fixture
+def network(sample_xodr):
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    return network
+
+def _two_roads(network):
+    roads = network.odr_doc['roads']
+    return roads[0], roads[1]
+
+def test_bad_request_only_fails_itself(network):
+    service = map_server.MapQueryService(network)
+    a, b = _two_roads(network)
+    results = service.run('st_to_xy', [{'road_id':a.id, 's':1.0, 't':0.0}, {'road_id':b.id, 's':'x'},
+                                       {'road_id':b.id}, {'s':1.0}])
+    x, y, _, _ = network.st_to_xy(a.id, 1.0)
+    np.testing.assert_allclose((results[0]['x'], results[0]['y']), (float(x), float(y)))
+    assert all(isinstance(result, map_server.QueryError) for result in results[1:])
+
+def test_t_defaults_to_zero(network):
+    service = map_server.MapQueryService(network)
+    a, b = _two_roads(network)
+    results = service.run('st_to_xy', [{'road_id':a.id, 's':1.0, 't':0.0}, {'road_id':b.id, 's':[1.0, 2.0]}])
+    x, y, _, _ = network.st_to_xy(b.id, [1.0, 2.0])
+    np.testing.assert_allclose(results[1]['x'], x)
+    np.testing.assert_allclose(results[1]['y'], y)
+    assert isinstance(results[0]['x'], float)
+
+def test_s_out_of_range_fails_only_its_request(network):
+    service = map_server.MapQueryService(network)
+    a, _ = _two_roads(network)
+    results = service.run('st_to_xy', [{'road_id':a.id, 's':1.0, 't':0.0}, {'road_id':a.id, 's':1e9, 't':0.0},
+                                       {'road_id':a.id, 's':[0.0, a.length], 't':1.0}])
+    assert isinstance(results[1], map_server.QueryError)
+    x, y, _, _ = network.st_to_xy(a.id, [0.0, a.length], 1.0)
+    np.testing.assert_allclose(results[2]['x'], x)
+    np.testing.assert_allclose(results[2]['y'], y)
+    assert isinstance(results[0]['x'], float)
+
+def test_route_converts_and_rejects_per_request(network):
+    service = map_server.MapQueryService(network)
+    graph = network.routing_graph()
+    road = network.odr_doc['roads'][int(graph.node_road[np.flatnonzero(graph.node_road >= 0)[0]])]
+    lane = int(graph.node_lane[np.flatnonzero(graph.node_road == graph.road_index_by_id[road.id])[0]])
+    request = {'from_road':road.id, 'from_lane':lane, 'to_road':road.id, 'to_lane':lane}
+    results = service.run('route', [dict(request, from_s='1', to_s=road.length), dict(request, from_s='x'),
+                                    dict(request, from_s=[1.0]), dict(request, to_road='no such road')])
+    expected = network.route(road.id, lane, road.id, lane, 1.0, road.length)
+    np.testing.assert_allclose(results[0]['length'], expected.length)
+    assert all(isinstance(result, map_server.QueryError) for result in results[1:3])
+    assert results[3] is None # an unknown road has no route
+
+def test_server_batches_mixed_requests(network):
+    a, b = _two_roads(network)
+
+    async def session():
+        server = await map_server.MapServer(network, window=0.05).start(port=0)
+        client = await map_client.AsyncMapClient.connect(*server.address())
+        calls = [client.st_to_xy(a.id, 1.0), client.st_to_xy(a.id, 1e9), client.st_to_xy(b.id, [1.0, 2.0], 0.5),
+                 client.call({'op':'st_to_xy', 'road_id':'no such road', 's':1.0}),
+                 client.call({'op':'st_to_xy', 'road_id':b.id, 's':1.0, 't':[0.0, 1.0, 2.0], 'x':0}),
+                 client.xy_to_st(a.id, [0.0], [0.0])]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        stats = await client.stats()
+        await client.close()
+        await server.close()
+        return results, stats
+    results, stats = asyncio.run(session())
+
+    x, y, _, _ = network.st_to_xy(b.id, [1.0, 2.0], 0.5)
+    np.testing.assert_allclose(results[2]['x'], x)
+    np.testing.assert_allclose(results[2]['y'], y)
+    assert isinstance(results[0]['x'], float)
+    assert isinstance(results[1], map_client.MapQueryError)
+    assert 'unknown road' in str(results[3])
+    assert len(results[4]['x']) == 3
+    assert len(results[5]['s']) == 1
+    # the five st_to_xy requests went out together and shared one batch
+    assert stats['requests'] == 6 and stats['batches'] == 2
@@ -0,0 +1,47 @@
+import os
+import shutil
+import threading
+import constants
+import road_network
+import network_cache
+
+DELTA_STEP = 0.5
+
+def _sampled(xodr_file:str) -> road_network.RoadNetwork:
+    network = road_network.RoadNetwork(xodr_file)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    network.sample_roads(DELTA_STEP)
+    return network
+
+def _hit(cache:network_cache.NetworkCache, xodr_file:str) -> bool:
+    return cache.load(road_network.RoadNetwork(xodr_file), DELTA_STEP)
+
+def test_concurrent_writers_keep_one_entry(sample_xodr, tmp_path):
+    cache = network_cache.NetworkCache(str(tmp_path))
+    network = _sampled(sample_xodr)
+    network.compact()
+    errors = []
+    def save():
+        try:
+            cache.save(network, DELTA_STEP)
+        except Exception as e:
+            errors.append(e)
+    writers = [threading.Thread(target=save) for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert errors == []
+    assert [name for name in os.listdir(tmp_path)] == [cache.key(sample_xodr, DELTA_STEP)]
+    assert _hit(cache, sample_xodr)
+
+def test_partial_entry_is_a_miss_and_replaced(sample_xodr, tmp_path):
+    cache = network_cache.NetworkCache(str(tmp_path))
+    network = _sampled(sample_xodr)
+    cache.save(network, DELTA_STEP)
+    path = cache.entry_path(cache.key(sample_xodr, DELTA_STEP))
+    shutil.rmtree(os.path.join(path, 'store'))
+    assert not _hit(cache, sample_xodr)
+    assert os.path.isdir(path) # a reader never deletes
+    cache.save(network, DELTA_STEP)
+    assert _hit(cache, sample_xodr)
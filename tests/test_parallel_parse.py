@@ -0,0 +1,32 @@
+import numpy as np
+import constants
+import road_network
+
+def _parsed(xodr_file:str, workers:int) -> road_network.RoadNetwork:
+    network = road_network.RoadNetwork(xodr_file, workers=workers)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    return network
+
+def test_parallel_parse_matches_serial(sample_xodr):
+    serial = _parsed(sample_xodr, 1)
+    parallel = _parsed(sample_xodr, 3)
+    assert [road.id for road in parallel.odr_doc['roads']] == [road.id for road in serial.odr_doc['roads']]
+    assert parallel.odr_doc['header'] == serial.odr_doc['header']
+    assert [(junction.id, [(c.incomming_road_id, c.connecting_road_id, c.contact_point) for c in junction.connections])
+            for junction in parallel.odr_doc['junctions']] == \
+           [(junction.id, [(c.incomming_road_id, c.connecting_road_id, c.contact_point) for c in junction.connections])
+            for junction in serial.odr_doc['junctions']]
+    table, expected = parallel.geometry_table(), serial.geometry_table()
+    for name in ('x', 'y', 'hdg', 's', 'length', 'type_code', 'road_index', 'param_poly3'):
+        np.testing.assert_array_equal(getattr(table, name), getattr(expected, name))
+    for road, expected_road in zip(parallel.odr_doc['roads'], serial.odr_doc['roads']):
+        assert road.link == expected_road.link
+        for section, expected_section in zip(road.lanes.sections, expected_road.lanes.sections):
+            np.testing.assert_array_equal(section.lane_ids, expected_section.lane_ids)
+            np.testing.assert_array_equal(section.width_coeffs, expected_section.width_coeffs)
+            np.testing.assert_array_equal(section.lane_successors, expected_section.lane_successors)
+
+def test_parallel_parse_rejects_non_opendrive(tmp_path):
+    path = tmp_path / 'other.xml'
+    path.write_bytes(b'<?xml version="1.0"?><Other><header/><road id="1"/></Other>')
+    assert road_network.RoadNetwork(str(path), workers=2).parse_xodr() == constants.ErrorCode.INVALID_FORMAT
@@ -0,0 +1,76 @@
+import re
+import math
+import numpy as np
+import pytest
+from scipy.integrate import quad
+from scipy.optimize import brentq
+import constants
+import geometry_math
+import road_network
+
+LENGTH = 3.7689004421761712e+2 # road 0 of the sample map, a single line geometry
+CURVES = {
+    # name: (xml replacing <line/>, u coefficients, v coefficients, p_max; None for poly3 where p = u is solved from length)
+    'poly3':('<poly3 a="0.0" b="0.02" c="1e-4" d="-2e-7"/>', (0.0, 1.0, 0.0, 0.0), (0.0, 0.02, 1e-4, -2e-7), None),
+    'normalized':('<paramPoly3 aU="0.0" bU="376.0" cU="0.5" dU="0.0" aV="0.0" bV="0.0" cV="20.0" dV="-8.0" pRange="normalized"/>',
+                   (0.0, 376.0, 0.5, 0.0), (0.0, 0.0, 20.0, -8.0), 1.0),
+    'arcLength':('<paramPoly3 aU="0.0" bU="1.0" cU="0.0" dU="0.0" aV="0.0" bV="0.0" cV="1e-4" dV="-1e-7" pRange="arcLength"/>',
+                  (0.0, 1.0, 0.0, 0.0), (0.0, 0.0, 1e-4, -1e-7), LENGTH),
+}
+
+def _speed(u_coeffs, v_coeffs):
+    du = np.polynomial.polynomial.polyder(u_coeffs)
+    dv = np.polynomial.polynomial.polyder(v_coeffs)
+    return lambda p: math.hypot(np.polynomial.polynomial.polyval(p, du), np.polynomial.polynomial.polyval(p, dv))
+
+def _reference_poses(x0, y0, hdg0, u_coeffs, v_coeffs, p_max, s):
+    # pose at local s with p found from the quad arc length, the curve's arc length scaled onto [0, LENGTH]
+    speed = _speed(u_coeffs, v_coeffs)
+    arc = lambda p: quad(speed, 0.0, p, epsabs=1e-12, epsrel=1e-12)[0]
+    if p_max is None:
+        p_max = brentq(lambda p: arc(p) - LENGTH, 0.0, 2.0 * LENGTH, xtol=1e-14)
+    scale = arc(p_max) / LENGTH
+    poses = []
+    for si in s:
+        p = brentq(lambda p: arc(p) - si * scale, 0.0, p_max, xtol=1e-14) if si > 0 else 0.0
+        u = np.polynomial.polynomial.polyval(p, u_coeffs)
+        v = np.polynomial.polynomial.polyval(p, v_coeffs)
+        du = np.polynomial.polynomial.polyval(p, np.polynomial.polynomial.polyder(u_coeffs))
+        dv = np.polynomial.polynomial.polyval(p, np.polynomial.polynomial.polyder(v_coeffs))
+        poses.append((x0 + u * math.cos(hdg0) - v * math.sin(hdg0), y0 + u * math.sin(hdg0) + v * math.cos(hdg0),
+                      hdg0 + math.atan2(dv, du)))
+    return np.array(poses).T
+
+S = np.array([0.0, 0.3, 17.0, 100.25, 188.4, 250.0, 376.0, LENGTH])
+
+@pytest.mark.parametrize('name', list(CURVES))
+def test_curve_pose_against_quad_arc_length(name):
+    _, u_coeffs, v_coeffs, p_max = CURVES[name]
+    x0, y0, hdg0 = 12.0, -7.5, 2.1
+    curve = geometry_math.ParamPoly3Curve(x0, y0, hdg0, LENGTH, u_coeffs, v_coeffs, p_max)
+    x, y, hdg = curve.pose(S)
+    x_ref, y_ref, hdg_ref = _reference_poses(x0, y0, hdg0, u_coeffs, v_coeffs, p_max, S)
+    np.testing.assert_allclose(x, x_ref, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(y, y_ref, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(hdg, hdg_ref, rtol=0, atol=1e-8)
+
+def _curved_map(sample_xodr:str, tmp_path, name:str) -> str:
+    with open(sample_xodr, 'r', encoding='utf-8') as f:
+        data = f.read()
+    road = re.search(r'<road\b[^>]*\sid="0".*?</road>', data, re.S)
+    road_xml = road.group(0).replace('<line/>', CURVES[name][0], 1)
+    path = tmp_path / f'{name}.xodr'
+    path.write_text(data[:road.start()] + road_xml + data[road.end():], encoding='utf-8')
+    return str(path)
+
+@pytest.mark.parametrize('name', list(CURVES))
+def test_network_pose_against_quad_arc_length(sample_xodr, tmp_path, name):
+    network = road_network.RoadNetwork(_curved_map(sample_xodr, tmp_path, name))
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    x, y, hdg, _ = network.st_to_xy('0', S)
+    x0, y0, hdg0 = 7.9927636768682896e+2, 6.3009665665181478e+2, 3.0839606763637724e+0
+    _, u_coeffs, v_coeffs, p_max = CURVES[name]
+    x_ref, y_ref, hdg_ref = _reference_poses(x0, y0, hdg0, u_coeffs, v_coeffs, p_max, S)
+    np.testing.assert_allclose(x, x_ref, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(y, y_ref, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(hdg, hdg_ref, rtol=0, atol=1e-8)
@@ -0,0 +1,87 @@
+import math
+import numpy as np
+import pytest
+from scipy.integrate import quad
+import constants
+import road_network
+import proj_trans
+
+UTM32 = '+proj=utm +zone=32 +ellps=WGS84 +datum=WGS84 +units=m +no_defs' # the sample map's geoReference
+A, F = 6378137.0, 1.0 / 298.257223563
+E2 = F*(2.0 - F)
+
+def _meridian_arc(lat:float) -> float:
+    # WGS84 distance from the equator along a meridian
+    return quad(lambda phi: A*(1.0 - E2) / (1.0 - E2*math.sin(phi)**2)**1.5, 0.0, math.radians(lat), epsabs=1e-8, epsrel=1e-13)[0]
+
+def _redfearn(lon:float, lat:float):
+    # UTM zone 32 by the Snyder (8-9, 8-10) series, millimetre accurate within 3 degrees of the central meridian
+    ep2 = E2 / (1.0 - E2)
+    phi = math.radians(lat)
+    n = A / math.sqrt(1.0 - E2*math.sin(phi)**2)
+    t = math.tan(phi)**2
+    c = ep2*math.cos(phi)**2
+    a = math.radians(lon - 9.0)*math.cos(phi)
+    x = 0.9996*n*(a + (1 - t + c)*a**3/6 + (5 - 18*t + t*t + 72*c - 58*ep2)*a**5/120)
+    y = 0.9996*(_meridian_arc(lat) + n*math.tan(phi)*(a*a/2 + (5 - t + 9*c + 4*c*c)*a**4/24
+                                                       + (61 - 58*t + t*t + 600*c - 330*ep2)*a**6/720))
+    return 500000.0 + x, y
+
+def test_snyder_worked_example():
+    # Snyder, Map Projections - A Working Manual, p. 269: Clarke 1866, lon_0 = 75W, k_0 = 0.9996
+    tmerc = proj_trans.TransverseMercator(6378206.4, 1.0 / 294.9786982, lon_0=-75.0, k_0=0.9996, x_0=0.0)
+    x, y = tmerc.forward(-73.5, 40.5)
+    np.testing.assert_allclose((x, y), (127106.5, 4484124.4), rtol=0, atol=0.05)
+    lon, lat = tmerc.inverse(127106.467, 4484124.434)
+    np.testing.assert_allclose((lon, lat), (-73.5, 40.5), rtol=0, atol=1e-8)
+
+@pytest.mark.parametrize('lat', [0.0, 1.0, 30.0, 45.0, 60.0, 84.0])
+def test_central_meridian(lat):
+    utm = proj_trans.TransverseMercator.from_proj(UTM32)
+    x, y = utm.forward(9.0, lat)
+    np.testing.assert_allclose((x, y), (500000.0, 0.9996*_meridian_arc(lat)), rtol=0, atol=1e-6)
+    if lat == 45.0:
+        np.testing.assert_allclose(y, 4982950.400, rtol=0, atol=1e-3) # published UTM northing of 45N on a central meridian
+    lon, lat_back = utm.inverse(x, y)
+    np.testing.assert_allclose((lon, lat_back), (9.0, lat), rtol=0, atol=1e-10)
+
+def test_off_meridian_against_series():
+    utm = proj_trans.TransverseMercator.from_proj(UTM32)
+    lon, lat = np.meshgrid(np.linspace(6.0, 12.0, 7), np.linspace(-60.0, 70.0, 14))
+    x, y = utm.forward(lon, lat)
+    assert x.shape == lon.shape
+    expected = np.array([_redfearn(lo, la) for lo, la in zip(lon.ravel(), lat.ravel())])
+    np.testing.assert_allclose(x.ravel(), expected[:, 0], rtol=0, atol=5e-3)
+    np.testing.assert_allclose(y.ravel(), expected[:, 1], rtol=0, atol=5e-3)
+    lon_back, lat_back = utm.inverse(x, y)
+    np.testing.assert_allclose(lon_back, lon, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(lat_back, lat, rtol=0, atol=1e-10)
+
+def test_southern_hemisphere():
+    north = proj_trans.TransverseMercator.from_proj(UTM32)
+    south = proj_trans.TransverseMercator.from_proj(UTM32 + ' +south')
+    x, y = south.forward(10.5, -33.0)
+    x_north, y_north = north.forward(10.5, -33.0)
+    np.testing.assert_allclose((x, y), (x_north, y_north + 10000000.0), rtol=0, atol=1e-6)
+    np.testing.assert_allclose(south.inverse(x, y), (10.5, -33.0), rtol=0, atol=1e-10)
+
+def test_geo_transform_offset(sample_xodr):
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    transform = network.geo_transform()
+    assert transform.proj_string == UTM32
+    # the header has no offset: local map xy are UTM zone 32 coordinates
+    lon, lat = transform.to_lonlat(500000.0, 0.9996*_meridian_arc(45.0))
+    np.testing.assert_allclose((lon, lat), (9.0, 45.0), rtol=0, atol=1e-10)
+    # an <offset>: projected = R(hdg) * local + (x, y)
+    shifted = proj_trans.GeoTransform(UTM32, 512000.0, 5300000.0, 0.3, use_pyproj=False)
+    x, y = np.array([[0.0, 120.0], [-35.5, 800.0]]), np.array([[0.0, -40.0], [260.0, 15.0]])
+    lon, lat = shifted.to_lonlat(x, y)
+    px = np.cos(0.3)*x - np.sin(0.3)*y + 512000.0
+    py = np.sin(0.3)*x + np.cos(0.3)*y + 5300000.0
+    expected = np.array([_redfearn(lo, la) for lo, la in zip(lon.ravel(), lat.ravel())])
+    np.testing.assert_allclose(expected[:, 0], px.ravel(), rtol=0, atol=5e-3)
+    np.testing.assert_allclose(expected[:, 1], py.ravel(), rtol=0, atol=5e-3)
+    x_back, y_back = shifted.from_lonlat(lon, lat)
+    np.testing.assert_allclose(x_back, x, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(y_back, y, rtol=0, atol=1e-6)
@@ -0,0 +1,61 @@
+import re
+import shutil
+import numpy as np
+import constants
+import road_network
+
+def _move_first_geometry(path:str, road_id:str, dx:float):
+    with open(path, 'rb') as f:
+        data = f.read()
+    road = re.compile(rb'<road\b[^>]*\sid="' + road_id.encode() + rb'"').search(data)
+    x = re.compile(rb'<geometry\b[^>]*\sx="([^"]*)"').search(data, road.end())
+    with open(path, 'wb') as f:
+        f.write(data[:x.start(1)] + repr(float(x.group(1)) + dx).encode() + data[x.end(1):])
+
+def _parsed(path:str, lazy:bool, track_changes:bool=False) -> road_network.RoadNetwork:
+    network = road_network.RoadNetwork(path, track_changes=track_changes)
+    assert network.parse_xodr(lazy=lazy) == constants.ErrorCode.OK
+    return network
+
+def _assert_same_network(network:road_network.RoadNetwork, expected:road_network.RoadNetwork):
+    table, expected_table = network.geometry_table(), expected.geometry_table()
+    for name in ('x', 'y', 'hdg', 's', 'length', 'road_index'):
+        np.testing.assert_array_equal(getattr(table, name), getattr(expected_table, name))
+    assert [issue.check for issue in network.validate()] == [issue.check for issue in expected.validate()]
+    points = np.column_stack((expected_table.x, expected_table.y)) + 0.5
+    positions, expected_positions = network.locate_lanes(points), expected.locate_lanes(points)
+    assert list(positions.road_id) == list(expected_positions.road_id)
+    np.testing.assert_array_equal(positions.lane_id, expected_positions.lane_id)
+    np.testing.assert_allclose(positions.s, expected_positions.s)
+    road_id = expected.odr_doc['roads'][3].id
+    for value, expected_value in zip(network.xy_to_st(road_id, points[:, 0], points[:, 1]),
+                                     expected.xy_to_st(road_id, points[:, 0], points[:, 1])):
+        np.testing.assert_allclose(value, expected_value)
+
+def test_reload_matches_fresh_parse(sample_xodr, tmp_path):
+    path = str(tmp_path / 'map.xodr')
+    shutil.copy(sample_xodr, path)
+    network = _parsed(path, lazy=False, track_changes=True)
+    network.build_spatial_index()
+    road_id = network.odr_doc['roads'][3].id
+    _move_first_geometry(path, road_id, 5.0)
+    report = network.reload()
+    assert report.error == constants.ErrorCode.OK and not report.full
+    assert report.changed_roads == [road_id]
+    _assert_same_network(network, _parsed(path, lazy=False))
+
+def test_lazy_reload_matches_fresh_parse(sample_xodr, tmp_path):
+    path = str(tmp_path / 'map.xodr')
+    shutil.copy(sample_xodr, path)
+    network = _parsed(path, lazy=True, track_changes=True)
+    # whole-network structures built before the edit must not survive the reload
+    network.build_spatial_index()
+    assert network.validate() is not None
+    road_id = network.odr_doc['roads'][3].id
+    _move_first_geometry(path, road_id, 5.0)
+    report = network.reload()
+    assert report.error == constants.ErrorCode.OK and not report.full
+    assert report.changed_roads == [road_id]
+    fresh = _parsed(path, lazy=False)
+    assert any(issue.check == 'geometry_gap' and issue.road_id == road_id for issue in network.validate())
+    _assert_same_network(network, fresh)
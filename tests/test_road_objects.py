@@ -0,0 +1,84 @@
+import math
+import numpy as np
+import pytest
+import constants
+import road_network
+
+@pytest.fixture
+def index(sample_xodr):
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    index = network.object_index()
+    assert len(index) > 0
+    return index
+
+def _polygons(index):
+    return [[tuple(vertex) for vertex in index.polygon(i)] for i in range(len(index))]
+
+def _inside(polygon, px, py) -> bool:
+    inside = False
+    for (x0, y0), (x1, y1) in zip(polygon, polygon[1:] + polygon[:1]):
+        if (y0 > py) != (y1 > py) and px < (x1 - x0)*(py - y0) / (y1 - y0) + x0:
+            inside = not inside
+    return inside
+
+def _point_segment_dist(px, py, x0, y0, x1, y1) -> float:
+    dx, dy = x1 - x0, y1 - y0
+    length2 = dx*dx + dy*dy
+    u = min(max(((px - x0)*dx + (py - y0)*dy) / length2, 0.0), 1.0) if length2 > 0.0 else 0.0
+    return math.hypot(x0 + u*dx - px, y0 + u*dy - py)
+
+def _distance(polygon, px, py) -> float:
+    if _inside(polygon, px, py):
+        return 0.0
+    return min(_point_segment_dist(px, py, *a, *b) for a, b in zip(polygon, polygon[1:] + polygon[:1]))
+
+def _segments_cross(a, b, c, d) -> bool:
+    orient = lambda p, q, r: (q[0] - p[0])*(r[1] - p[1]) - (q[1] - p[1])*(r[0] - p[0])
+    return orient(c, d, a)*orient(c, d, b) <= 0.0 and orient(a, b, c)*orient(a, b, d) <= 0.0
+
+def _hits(polygon, a, b) -> bool:
+    return _inside(polygon, *a) or any(_segments_cross(a, b, c, d) for c, d in zip(polygon, polygon[1:] + polygon[:1]))
+
+def _points_near_objects(index, n:int, spread:float, seed:int):
+    rng = np.random.default_rng(seed)
+    centres = np.column_stack(((index.boxes[:, 0] + index.boxes[:, 2]) / 2, (index.boxes[:, 1] + index.boxes[:, 3]) / 2))
+    picks = centres[rng.integers(0, len(centres), n)]
+    return picks[:, 0] + rng.uniform(-spread, spread, n), picks[:, 1] + rng.uniform(-spread, spread, n)
+
+def test_within_radius_against_brute_force(index):
+    polygons = _polygons(index)
+    x, y = _points_near_objects(index, 100, 15.0, seed=7)
+    distances = np.array([[_distance(polygon, px, py) for polygon in polygons] for px, py in zip(x, y)])
+    for radius in (0.5, 3.0, 25.0):
+        points, objects, dist = index.within_radius_batch(x, y, radius)
+        found = {(int(p), int(o)): d for p, o, d in zip(points, objects, dist)}
+        expected = {(int(p), int(o)): distances[p, o] for p, o in zip(*np.nonzero(distances <= radius))}
+        assert len(expected) > 0
+        assert found.keys() == expected.keys()
+        np.testing.assert_allclose([found[key] for key in expected], list(expected.values()), rtol=0, atol=1e-9)
+
+def test_within_radius_is_sorted(index):
+    x, y = _points_near_objects(index, 1, 5.0, seed=3)
+    objects, dist = index.within_radius(x[0], y[0], 50.0)
+    polygons = _polygons(index)
+    assert len(objects) > 0
+    assert np.all(np.diff(dist) >= 0.0)
+    np.testing.assert_allclose(dist, [_distance(polygons[o], x[0], y[0]) for o in objects], rtol=0, atol=1e-9)
+
+@pytest.mark.parametrize('spread, reach', [(5.0, 2.0), (20.0, 40.0), (50.0, 400.0)])
+def test_intersect_segments_against_brute_force(index, spread, reach):
+    polygons = _polygons(index)
+    x0, y0 = _points_near_objects(index, 100, spread, seed=11)
+    rng = np.random.default_rng(13)
+    angle = rng.uniform(0.0, 2.0*np.pi, len(x0))
+    length = rng.uniform(0.0, reach, len(x0))
+    x1, y1 = x0 + length*np.cos(angle), y0 + length*np.sin(angle)
+    segments, objects = index.intersect_segments_batch(x0, y0, x1, y1)
+    found = set(zip(segments.tolist(), objects.tolist()))
+    expected = {(k, o) for k in range(len(x0)) for o, polygon in enumerate(polygons)
+                if _hits(polygon, (x0[k], y0[k]), (x1[k], y1[k]))}
+    assert found == expected
+    assert len(expected) > 0
+    np.testing.assert_array_equal(np.sort(index.intersect_segment(x0[0], y0[0], x1[0], y1[0])),
+                                  sorted(o for k, o in expected if k == 0))
@@ -0,0 +1,60 @@
+import re
+import numpy as np
+import constants
+import road_network
+
+ELEVATION = [(0.0, 1.0, 0.02, 1e-4, -1e-7), (200.0, 5.0, -0.01, 0.0, 2e-8)] # s, a, b, c, d
+SUPERELEVATION = [(0.0, 0.01, 1e-4, 0.0, 0.0), (150.0, 0.03, 0.0, -1e-6, 0.0)]
+SHAPE = [(0.0, -3.5, 0.0, 0.01, 0.001, 0.0), (0.0, 0.0, 0.05, 0.0, -0.002, 0.0), (300.0, -3.0, 0.1, 0.0, 0.0, 1e-4)] # s, t, a, b, c, d
+
+def _cubic(records, s:float) -> float:
+    active = [r for r in records if r[0] <= s] or records[:1]
+    start, a, b, c, d = active[-1]
+    ds = s - start
+    return a + b*ds + c*ds**2 + d*ds**3
+
+def _shape(s:float, t:float) -> float:
+    # piecewise cubic in t per s group, linear in s between the groups
+    groups = sorted({r[0] for r in SHAPE})
+    heights = [_cubic([r[1:] for r in SHAPE if r[0] == group], t) for group in groups]
+    return float(np.interp(s, groups, heights))
+
+def _expected(s:float, t:float):
+    roll = _cubic(SUPERELEVATION, s)
+    return _cubic(ELEVATION, s) + t*np.tan(roll) + _shape(s, t), roll
+
+def _profiled_map(sample_xodr:str, tmp_path) -> str:
+    # road 0 of the sample map with the profiles above instead of its flat ones
+    with open(sample_xodr, 'r', encoding='utf-8') as f:
+        data = f.read()
+    records = lambda tag, rows, names: ''.join(f'<{tag} ' + ' '.join(f'{n}="{v!r}"' for n, v in zip(names, row)) + '/>' for row in rows)
+    elevation = '<elevationProfile>' + records('elevation', ELEVATION, ('s', 'a', 'b', 'c', 'd')) + '</elevationProfile>'
+    lateral = ('<lateralProfile>' + records('superelevation', SUPERELEVATION, ('s', 'a', 'b', 'c', 'd')) +
+               records('shape', SHAPE, ('s', 't', 'a', 'b', 'c', 'd')) + '</lateralProfile>')
+    road = re.search(r'<road\b[^>]*\sid="0".*?</road>', data, re.S)
+    road_xml = re.sub(r'<elevationProfile>.*?</elevationProfile>', elevation, road.group(0), flags=re.S)
+    road_xml = re.sub(r'<lateralProfile>.*?</lateralProfile>', lateral, road_xml, flags=re.S)
+    path = tmp_path / 'profiled.xodr'
+    path.write_text(data[:road.start()] + road_xml + data[road.end():], encoding='utf-8')
+    return str(path)
+
+def test_surface_matches_profiles(sample_xodr, tmp_path):
+    network = road_network.RoadNetwork(_profiled_map(sample_xodr, tmp_path))
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    rng = np.random.default_rng(0)
+    s = rng.uniform(0.0, network.road('0').length, 200)
+    t = rng.uniform(-6.0, 3.0, 200)
+    z, roll = network.surface('0', s, t)
+    expected = np.array([_expected(s_k, t_k) for s_k, t_k in zip(s, t)])
+    np.testing.assert_allclose(z, expected[:, 0], atol=1e-9)
+    np.testing.assert_allclose(roll, expected[:, 1], atol=1e-12)
+
+def test_sampled_reference_line_heights(sample_xodr, tmp_path):
+    network = road_network.RoadNetwork(_profiled_map(sample_xodr, tmp_path))
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    samples = network.sample_roads(delta_step=1.0)['0']
+    expected = np.array([_expected(s_k, 0.0) for s_k in samples.s])
+    np.testing.assert_allclose(samples.z, expected[:, 0], atol=1e-9)
+    np.testing.assert_allclose(samples.roll, expected[:, 1], atol=1e-12)
+    # roads without elevation records stay flat
+    assert not network.road_samples['1'].z.any()
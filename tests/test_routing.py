@@ -0,0 +1,71 @@
+import numpy as np
+import constants
+import road_network
+import instrumentation
+
+def _graph(xodr_file:str):
+    network = road_network.RoadNetwork(xodr_file)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    return network, network.routing_graph()
+
+def test_lane_change_adds_no_length(sample_xodr):
+    network, graph = _graph(sample_xodr)
+    # a single-section road with two neighbouring driving lanes: the route is one lane change
+    for road in network.odr_doc['roads']:
+        if len(road.lanes.sections) == 1 and {-1, -2} <= set(graph.node_lane[graph.node_road == graph.road_index_by_id[road.id]].tolist()):
+            break
+    route = network.route(road.id, -1, road.id, -2)
+    assert route.lane_ids == [-1, -2]
+    np.testing.assert_allclose(route.length, road.length)
+
+def test_astar_matches_dijkstra(sample_xodr):
+    _, graph = _graph(sample_xodr)
+    live = np.flatnonzero(graph.node_road >= 0)
+    rng = np.random.default_rng(0)
+    found = 0
+    for start, goal in rng.choice(live, (400, 2)):
+        astar = graph._astar(int(start), int(goal), True)
+        dijkstra = graph._astar(int(start), int(goal), False)
+        assert (astar is None) == (dijkstra is None)
+        if dijkstra is not None:
+            found += 1
+            np.testing.assert_allclose(astar[1], dijkstra[1])
+            np.testing.assert_allclose(astar[2], dijkstra[2])
+    assert found > 0
+
+def test_heuristic_is_consistent(sample_xodr):
+    # h(u) <= weight(u, v) + h(v) on every edge, for a few goals
+    _, graph = _graph(sample_xodr)
+    assert 0.9 < graph.heuristic_scale <= 1.0
+    sources = np.repeat(np.arange(len(graph.node_road)), np.diff(graph.indptr))
+    for goal in np.flatnonzero(graph.node_road >= 0)[::50]:
+        h = graph.heuristic(int(goal))
+        assert np.all(h[sources] <= graph.weights + h[graph.indices] + 1e-9)
+
+def test_astar_expands_fewer_nodes(sample_xodr):
+    # over reachable pairs; an unreachable goal makes both searches visit everything reachable from the start
+    _, graph = _graph(sample_xodr)
+    live = np.flatnonzero(graph.node_road >= 0)
+    pairs = [(int(start), int(goal)) for start, goal in np.random.default_rng(1).choice(live, (400, 2))
+             if graph._astar(int(start), int(goal), False) is not None]
+    assert len(pairs) > 10
+    expanded = {}
+    instrumentation.enable()
+    try:
+        for use_heuristic in (True, False):
+            instrumentation.reset()
+            for start, goal in pairs:
+                graph._astar(start, goal, use_heuristic)
+            expanded[use_heuristic] = instrumentation.stats()['counters']['route/expanded_nodes']
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+    assert expanded[True] < 0.8 * expanded[False]
+
+def test_node_lookup(sample_xodr):
+    network, graph = _graph(sample_xodr)
+    for u in np.flatnonzero(graph.node_road >= 0):
+        road_id = graph.road_ids[graph.node_road[u]]
+        s = graph.node_s0[u] + 0.5 * graph.node_length[u]
+        assert graph.node(road_id, int(graph.node_lane[u]), s) == u
+    assert graph.node('no such road', -1) is None
@@ -0,0 +1,41 @@
+import numpy as np
+import constants
+import road_network
+import spatial_index
+
+def _box_dist2(boxes, x, y):
+    dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0.0)
+    dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0.0)
+    return dx * dx + dy * dy
+
+def test_grid_query_matches_brute_force():
+    rng = np.random.default_rng(0)
+    corner = rng.uniform(-500.0, 500.0, (400, 2))
+    boxes = np.hstack((corner, corner + rng.uniform(0.0, 80.0, (400, 2))))
+    grid = spatial_index.GridIndex(boxes, cell_size=20.0)
+    x, y = rng.uniform(-600.0, 600.0, (2, 300))
+    pair_point, pair_box = grid.query_batch(x, y, 15.0)
+    for k in range(len(x)):
+        expected = np.flatnonzero(_box_dist2(boxes, x[k], y[k]) <= 15.0 ** 2)
+        np.testing.assert_array_equal(np.sort(grid.query(x[k], y[k], 15.0)), expected)
+        np.testing.assert_array_equal(np.sort(pair_box[pair_point == k]), expected)
+
+def test_locate_matches_brute_force(sample_xodr):
+    # nearest road by the grid against projecting every point onto every geometry
+    network = road_network.RoadNetwork(sample_xodr)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    table = network.geometry_table()
+    rng = np.random.default_rng(1)
+    j = rng.integers(0, len(table), 200)
+    xy = np.array([table.pose(int(g), rng.uniform(0.0, table.length[g]))[:2] for g in j]).reshape(-1, 2)
+    xy += rng.normal(0.0, 3.0, xy.shape)
+    all_dist2 = np.array([table.project_batch(g, xy[:, 0], xy[:, 1])[2] for g in range(len(table))]).T
+    for (x, y), dist2 in zip(xy, all_dist2):
+        located = network.locate(x, y, max_dist=5.0)
+        if dist2.min() > 25.0:
+            assert located is None
+            continue
+        road_id, _, _, dist = located
+        np.testing.assert_allclose(dist, np.sqrt(dist2.min()), atol=1e-6)
+        nearest = np.flatnonzero(dist2 <= dist2.min() + 1e-9)
+        assert road_id in {network.odr_doc['roads'][int(table.road_index[g])].id for g in nearest}
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import geometry_math
+
+SPIRALS = [
+    (0.0, 0.0, 0.3, 120.0, 0.0, 0.02), # x0, y0, hdg0, length, curv_start, curv_end
+    (10.0, -5.0, -1.2, 60.0, 0.01, -0.03),
+    (-3.0, 7.0, 2.5, 40.0, -0.05, -0.01),
+]
+
+@pytest.mark.parametrize('spiral', SPIRALS)
+def test_projection_matches_reference(spiral):
+    # points offset from known s by less than the smallest radius have a unique nearest point
+    rng = np.random.default_rng(0)
+    length, radius = spiral[3], 1.0 / max(abs(spiral[4]), abs(spiral[5]))
+    s_true = rng.uniform(0.0, length, 100)
+    t_true = rng.uniform(-0.4, 0.4, 100) * radius
+    x, y, hdg = geometry_math.spiral_pose(s_true, *spiral)
+    x, y = geometry_math.apply_t_offset(x, y, hdg, t_true)
+    s, t, dist2 = geometry_math.xy_to_st_spiral_batch(x, y, *spiral)
+    np.testing.assert_allclose(s, s_true, atol=1e-6)
+    np.testing.assert_allclose(t, t_true, atol=1e-6)
+    for k in range(0, 100, 10):
+        s_ref, t_ref, dist2_ref = geometry_math.xy_to_st_spiral_reference(x[k], y[k], *spiral)
+        np.testing.assert_allclose(s[k], s_ref, atol=1e-3)
+        np.testing.assert_allclose(t[k], t_ref, atol=1e-3)
+        assert dist2[k] <= dist2_ref + 1e-9
+        assert geometry_math.xy_to_st_spiral(x[k], y[k], *spiral)[0] == pytest.approx(s[k], abs=1e-9)
+
+def test_projection_clamps_to_the_ends():
+    spiral = SPIRALS[0]
+    x, y, hdg = geometry_math.spiral_pose(np.array([0.0, spiral[3]]), *spiral)
+    # points beyond either end along the tangent project onto that end
+    s, _, _ = geometry_math.xy_to_st_spiral_batch(x - 5.0*np.cos(hdg)*np.array([1.0, -1.0]),
+                                                  y - 5.0*np.sin(hdg)*np.array([1.0, -1.0]), *spiral)
+    np.testing.assert_allclose(s, [0.0, spiral[3]], atol=1e-9)
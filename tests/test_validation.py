@@ -0,0 +1,67 @@
+import re
+import numpy as np
+import constants
+import road_network
+
+LANE_WIDTH = 3.75
+
+def _validate(path:str):
+    network = road_network.RoadNetwork(path)
+    assert network.parse_xodr() == constants.ErrorCode.OK
+    return network.validate()
+
+def _edit_road(data:bytes, road_id:str, edit) -> bytes:
+    road = re.compile(rb'<road\b[^>]*\sid="' + road_id.encode() + rb'".*?</road>', re.S).search(data)
+    return data[:road.start()] + edit(road.group(0)) + data[road.end():]
+
+def _shift_sideways(road_xml:bytes, distance:float) -> bytes:
+    # move the whole road to the left of its first geometry's heading, keeping its shape
+    hdg = float(re.search(rb'<geometry\b[^>]*\shdg="([^"]*)"', road_xml).group(1))
+    dx, dy = -np.sin(hdg) * distance, np.cos(hdg) * distance
+    def shift(match):
+        tag = re.sub(rb'\sx="([^"]*)"', lambda m: b' x="' + repr(float(m.group(1)) + float(dx)).encode() + b'"', match.group(0))
+        return re.sub(rb'\sy="([^"]*)"', lambda m: b' y="' + repr(float(m.group(1)) + float(dy)).encode() + b'"', tag)
+    return re.sub(rb'<geometry\b[^>]*>', shift, road_xml)
+
+def test_sample_map(sample_xodr):
+    issues = _validate(sample_xodr)
+    assert [(issue.check, issue.road_id) for issue in issues] == [('geometry_gap', '108'), ('geometry_s', '108')]
+    assert all(issue.value < 0.01 for issue in issues)
+
+def test_successor_shifted_by_one_lane(sample_xodr, tmp_path):
+    # road 55 is a junction connecting road whose reference line starts on a lane boundary of road 21,
+    # one lane width further out all its lanes are still on some boundary of road 21, but not on the linked ones
+    with open(sample_xodr, 'rb') as f:
+        data = f.read()
+    path = str(tmp_path / 'shifted.xodr')
+    with open(path, 'wb') as f:
+        f.write(_edit_road(data, '55', lambda road_xml: _shift_sideways(road_xml, LANE_WIDTH)))
+    issues = [issue for issue in _validate(path) if issue.road_id in ('55', '21')]
+    checks = {(issue.check, issue.road_id) for issue in issues}
+    assert ('link_gap', '55') in checks and ('connection_gap', '21') in checks
+    gaps = [issue.value for issue in issues if issue.check in ('link_gap', 'connection_gap')]
+    np.testing.assert_allclose(gaps, LANE_WIDTH, atol=1e-3)
+    assert not any(issue.check.endswith('_offset') for issue in issues)
+
+def test_offset_without_lane_links(sample_xodr, tmp_path):
+    # the same lateral offset with no lane <link> to explain it is reported as such
+    with open(sample_xodr, 'rb') as f:
+        data = f.read()
+    path = str(tmp_path / 'unlinked.xodr')
+    with open(path, 'wb') as f:
+        f.write(_edit_road(data, '55', lambda road_xml: re.sub(rb'<predecessor id="[^"]*"[^>]*/>', b'', road_xml)))
+    checks = {(issue.check, issue.road_id) for issue in _validate(path)}
+    assert ('link_offset', '55') in checks
+    assert ('link_gap', '55') not in checks
+
+def test_malformed_lane_link(sample_xodr, tmp_path):
+    # a junction <laneLink> without from/to is reported instead of stopping the validation
+    with open(sample_xodr, 'rb') as f:
+        data = f.read()
+    path = str(tmp_path / 'lane_link.xodr')
+    with open(path, 'wb') as f:
+        f.write(data.replace(b'<laneLink from="-8" to="-1"/>', b'<laneLink from="-8" to=""/>', 1).replace(
+            b'<laneLink from="-2" to="-1"/>', b'<laneLink to="-1"/>', 1))
+    issues = [issue for issue in _validate(path) if issue.check == 'connection_lane_link']
+    assert len(issues) == 2
+    assert 'to=""' in issues[0].other and 'from=""' in issues[1].other
@@ -0,0 +1,235 @@
+import numpy as np
+from typing import List
+import constants
+import geometry_math
+import lane_geometry
+
+# 路网连续性与一致性校验：整张路网所有几何段的起点、终点位姿按类型一次批量计算（line/arc/spiral 闭式，
+# paramPoly3 直接对多项式求值，poly3 的终点参数由弧长求出），与同一道路下一几何段的起点、道路 link
+# 和 junction connection 所接的道路端点比较，并检查 s 的接续与 Road.length 一致。
+# 相接道路的参考线可以横向错开（常见于 junction 内的连接道路），此时按车道 link（道路 link 的车道前驱/后继、
+# connection 的 laneLink）配对，比较相连车道两侧边界；没有车道 link 能说明的错开单独报告为 *_offset。
+# 超出容差的每一处都报告为一个 constants.ValidationIssue。
+
+POSITION_TOLERANCE = 1e-3 # m
+HEADING_TOLERANCE = 1e-3 # rad
+LENGTH_TOLERANCE = 1e-3 # m, s continuity and road length
+
+LINE_ARC = (constants.LineType.LINE_STRAIGHT.value, constants.LineType.CIRCULAR_ARC.value)
+SPIRAL = constants.LineType.SPIRAL.value
+POLY = (constants.LineType.POLY3.value, constants.LineType.PARAM_POLY3.value)
+CONTACT_INDEX = {'start':0, 'end':1}
+
+def _wrap(angle):
+    return (angle + np.pi) % (2.0 * np.pi) - np.pi
+
+def geometry_poses(table, at_end:bool):
+    # (x, y, hdg) of every row of a network_store.GeometryTable at its start or its end
+    n = len(table)
+    s = table.length if at_end else np.zeros(n)
+    x, y, hdg = table.x.copy(), table.y.copy(), table.hdg.copy()
+    code = table.type_code
+
+    rows = np.flatnonzero(np.isin(code, LINE_ARC))
+    x[rows], y[rows], hdg[rows] = geometry_math.arc_pose_elementwise(
+        s[rows], table.x[rows], table.y[rows], table.hdg[rows], table.curv_start[rows])
+
+    rows = np.flatnonzero(code == SPIRAL)
+    length = table.length[rows]
+    gamma = np.divide(table.curv_end[rows] - table.curv_start[rows], length, out=np.zeros(len(rows)), where=length > 0)
+    x[rows], y[rows], hdg[rows] = geometry_math.spiral_pose_elementwise(
+        s[rows], table.x[rows], table.y[rows], table.hdg[rows], table.curv_start[rows], gamma)
+
+    rows = np.flatnonzero(np.isin(code, POLY))
+    p = np.zeros(len(rows))
+    if at_end:
+        p = table.p_range[rows].copy()
+        for k in np.flatnonzero(p == 0.0):
+            p[k] = table.param_poly3_curve(int(rows[k])).p_max # poly3: u at the end is found from the arc length
+    aU, bU, cU, dU, aV, bV, cV, dV = table.param_poly3[rows].T
+    u = aU + p * (bU + p * (cU + p * dU))
+    v = aV + p * (bV + p * (cV + p * dV))
+    du = bU + p * (2.0 * cU + p * 3.0 * dU)
+    dv = bV + p * (2.0 * cV + p * 3.0 * dV)
+    cos_h, sin_h = np.cos(table.hdg[rows]), np.sin(table.hdg[rows])
+    x[rows] = table.x[rows] + u * cos_h - v * sin_h
+    y[rows] = table.y[rows] + u * sin_h + v * cos_h
+    hdg[rows] = table.hdg[rows] + np.arctan2(dv, du)
+    return x, y, hdg
+
+def _end_lanes(road, at_end:bool):
+    # lane section at one end of the road and the (inner, outer) boundary t of each of its lanes, None without lanes
+    lanes = road.lanes
+    if len(lanes.sections) == 0:
+        return None
+    section = lanes.sections[-1 if at_end else 0]
+    s = np.array([road.length if at_end else 0.0])
+    offset = float(geometry_math.eval_cubic_records(lanes.lane_offset, s)[0])
+    outer = lane_geometry.boundary_t(section, lane_geometry.lane_widths(section, s - section.s), offset)[:, 0]
+    # lane_ids are sorted descending: the inner boundary of a left lane is the next row, of a right lane the previous one
+    inner = np.where(section.lane_ids > 0, np.append(outer[1:], offset), np.insert(outer[:-1], 0, offset))
+    return section, inner, outer
+
+def _lane_gap(roads, a, a_end, b, b_end, lane_pairs, x, y, road_hdg, lane_cache:dict) -> float:
+    # largest distance between the edges of lanes joined by lane_pairs ((lane of a, lane of b) ids) at the linked ends;
+    # the edges are matched either way round since the roads may run in opposite directions. None when no lane pair
+    # exists on both roads, i.e. the lane layout cannot explain reference lines that are apart
+    edges = []
+    for road, end in ((a, a_end), (b, b_end)):
+        if (road, end) not in lane_cache:
+            lane_cache[(road, end)] = _end_lanes(roads[road], end == 1)
+        lanes = lane_cache[(road, end)]
+        if lanes is None:
+            return None
+        normal_x, normal_y = -np.sin(road_hdg[road, end]), np.cos(road_hdg[road, end])
+        section, inner, outer = lanes
+        edges.append(({int(lane_id):k for k, lane_id in enumerate(section.lane_ids)},
+                      x[road, end] + inner * normal_x, y[road, end] + inner * normal_y,
+                      x[road, end] + outer * normal_x, y[road, end] + outer * normal_y))
+    gap = None
+    for lane_a, lane_b in lane_pairs:
+        row_a, row_b = edges[0][0].get(lane_a), edges[1][0].get(lane_b)
+        if row_a is None or row_b is None:
+            continue
+        _, ax_in, ay_in, ax_out, ay_out = edges[0]
+        _, bx_in, by_in, bx_out, by_out = edges[1]
+        inner_a, outer_a = (ax_in[row_a], ay_in[row_a]), (ax_out[row_a], ay_out[row_a])
+        inner_b, outer_b = (bx_in[row_b], by_in[row_b]), (bx_out[row_b], by_out[row_b])
+        same = max(np.hypot(inner_a[0] - inner_b[0], inner_a[1] - inner_b[1]), np.hypot(outer_a[0] - outer_b[0], outer_a[1] - outer_b[1]))
+        crossed = max(np.hypot(inner_a[0] - outer_b[0], inner_a[1] - outer_b[1]), np.hypot(outer_a[0] - inner_b[0], outer_a[1] - inner_b[1]))
+        gap = max(gap if gap is not None else 0.0, float(min(same, crossed)))
+    return gap
+
+def _road_lane_pairs(road, end:int):
+    # (lane, linked lane) ids of the lane <link> predecessors (end 0) or successors (end 1) of the road
+    if len(road.lanes.sections) == 0:
+        return []
+    section = road.lanes.sections[-1 if end == 1 else 0]
+    targets = section.lane_successors if end == 1 else section.lane_predecessors
+    return [(int(lane_id), int(target)) for lane_id, target in zip(section.lane_ids, targets) if lane_id != 0 and target != 0]
+
+def _issues(check:str, road_ids, geometry, other, value, tolerance:float) -> List[constants.ValidationIssue]:
+    return [constants.ValidationIssue(check, str(road_id), int(g), str(o), float(v), tolerance)
+            for road_id, g, o, v in zip(road_ids, geometry, other, value)]
+
+def validate(table, roads, junctions:List[constants.Junction], position_tolerance:float=POSITION_TOLERANCE,
+             heading_tolerance:float=HEADING_TOLERANCE, length_tolerance:float=LENGTH_TOLERANCE) -> List[constants.ValidationIssue]:
+    # every violation in the network: rows of table are grouped by road in the order of roads
+    issues:List[constants.ValidationIssue] = []
+    road_ids = np.array([road.id for road in roads], dtype=object)
+    offsets = table.road_geometry_offsets(len(roads))
+    start_x, start_y, start_hdg = geometry_poses(table, at_end=False)
+    end_x, end_y, end_hdg = geometry_poses(table, at_end=True)
+
+    # consecutive geometries of one road: end pose of j against start pose of j + 1, and s of j + 1
+    j = np.flatnonzero(table.road_index[:-1] == table.road_index[1:])
+    road = table.road_index[j]
+    next_index = j + 1 - offsets[road]
+    other = np.full(len(j), '', dtype=object)
+    for check, value, tolerance in (
+            ('geometry_gap', np.hypot(end_x[j] - start_x[j + 1], end_y[j] - start_y[j + 1]), position_tolerance),
+            ('geometry_heading', np.abs(_wrap(end_hdg[j] - start_hdg[j + 1])), heading_tolerance),
+            ('geometry_s', np.abs(table.s[j] + table.length[j] - table.s[j + 1]), length_tolerance)):
+        bad = value > tolerance
+        issues += _issues(check, road_ids[road[bad]], next_index[bad], other[bad], value[bad], tolerance)
+
+    # s starts at 0 and the last geometry ends at Road.length
+    has_geometry = np.flatnonzero(offsets[1:] > offsets[:-1])
+    first = offsets[has_geometry]
+    last = offsets[has_geometry + 1] - 1
+    road_length = np.array([road.length for road in roads], dtype=np.float64)[has_geometry]
+    value = np.abs(table.s[first])
+    bad = value > length_tolerance
+    issues += _issues('geometry_s', road_ids[has_geometry[bad]], np.zeros(np.count_nonzero(bad)), np.full(np.count_nonzero(bad), ''), value[bad], length_tolerance)
+    value = np.abs(table.s[last] + table.length[last] - road_length)
+    bad = value > length_tolerance
+    issues += _issues('road_length', road_ids[has_geometry[bad]], np.full(np.count_nonzero(bad), -1), np.full(np.count_nonzero(bad), ''), value[bad], length_tolerance)
+
+    # road ends: [:, 0] start, [:, 1] end, road_hdg along s; leaving through the start heads the opposite way
+    n = len(roads)
+    end_point_x = np.full((n, 2), np.nan)
+    end_point_y = np.full((n, 2), np.nan)
+    road_hdg = np.full((n, 2), np.nan)
+    end_point_x[has_geometry, 0], end_point_y[has_geometry, 0], road_hdg[has_geometry, 0] = start_x[first], start_y[first], start_hdg[first]
+    end_point_x[has_geometry, 1], end_point_y[has_geometry, 1], road_hdg[has_geometry, 1] = end_x[last], end_y[last], end_hdg[last]
+    out_hdg = road_hdg + np.array([np.pi, 0.0])
+
+    # pairs of road ends that must meet: road links, then junction connections
+    index_by_id = {road.id:i for i, road in enumerate(roads)}
+    junction_ids = {junction.id for junction in junctions}
+    junction_end = {} # (road index, junction id) -> end of the road linked to that junction
+    pairs = {'link':[], 'connection':[]}
+    for i, road in enumerate(roads):
+        for end, name, link_end in ((0, 'predecessor', road.link.predecessor), (1, 'successor', road.link.successor)):
+            if link_end.element_type == 'junction':
+                junction_end[(i, link_end.element_id)] = end
+                if link_end.element_id not in junction_ids:
+                    issues.append(constants.ValidationIssue('link_missing', road.id, -1, f'{name} junction {link_end.element_id}', np.nan, 0.0))
+            elif link_end.element_type == 'road':
+                other_road = index_by_id.get(link_end.element_id)
+                description = f'{name} road {link_end.element_id} ({link_end.contact_point})'
+                if other_road is None:
+                    issues.append(constants.ValidationIssue('link_missing', road.id, -1, description, np.nan, 0.0))
+                elif link_end.contact_point not in CONTACT_INDEX:
+                    issues.append(constants.ValidationIssue('link_contact', road.id, -1, description, np.nan, 0.0))
+                else:
+                    pairs['link'].append((i, end, other_road, CONTACT_INDEX[link_end.contact_point], description,
+                                          _road_lane_pairs(road, end)))
+    for junction in junctions:
+        for connection in junction.connections:
+            description = f'junction {junction.id} connection {connection.id} to road {connection.connecting_road_id} ({connection.contact_point})'
+            incoming = index_by_id.get(connection.incomming_road_id)
+            connecting = index_by_id.get(connection.connecting_road_id)
+            if incoming is None or connecting is None:
+                issues.append(constants.ValidationIssue('connection_missing', connection.incomming_road_id, -1, description, np.nan, 0.0))
+            elif connection.contact_point not in CONTACT_INDEX:
+                issues.append(constants.ValidationIssue('connection_contact', connection.incomming_road_id, -1, description, np.nan, 0.0))
+            elif (incoming, junction.id) not in junction_end:
+                # the incoming road has no predecessor/successor link to this junction
+                issues.append(constants.ValidationIssue('connection_unlinked', connection.incomming_road_id, -1, description, np.nan, 0.0))
+            else:
+                lane_pairs = []
+                for lane_link in connection.lane_links:
+                    try:
+                        lane_pairs.append((int(lane_link.from_lane_id), int(lane_link.to_lane_id)))
+                    except ValueError:
+                        # <laneLink> without a usable from/to: reported, and left out of the lane pairing
+                        issues.append(constants.ValidationIssue('connection_lane_link', connection.incomming_road_id, -1,
+                                                                f'{description} laneLink from="{lane_link.from_lane_id}" to="{lane_link.to_lane_id}"',
+                                                                np.nan, 0.0))
+                pairs['connection'].append((incoming, junction_end[(incoming, junction.id)], connecting,
+                                            CONTACT_INDEX[connection.contact_point], description, lane_pairs))
+
+    # leaving one end means entering the other: same point, opposite out headings
+    lane_cache = {}
+    for kind, kind_pairs in pairs.items():
+        if not kind_pairs:
+            continue
+        a, a_end, b, b_end = (np.array(column, dtype=np.int64) for column in list(zip(*kind_pairs))[:4])
+        description = np.array([pair[4] for pair in kind_pairs], dtype=object)
+        gap = np.hypot(end_point_x[a, a_end] - end_point_x[b, b_end], end_point_y[a, a_end] - end_point_y[b, b_end])
+        # reference lines apart: accepted only where the linked lanes meet edge to edge, only these pairs need lane widths
+        offset = np.zeros(len(a), dtype=bool)
+        for k in np.flatnonzero(gap > position_tolerance):
+            lane_gap = _lane_gap(roads, a[k], a_end[k], b[k], b_end[k], kind_pairs[k][5], end_point_x, end_point_y, road_hdg, lane_cache)
+            if lane_gap is None:
+                offset[k] = True
+            else:
+                gap[k] = lane_gap
+        issues += _issues(f'{kind}_offset', road_ids[a[offset]], np.full(np.count_nonzero(offset), -1), description[offset], gap[offset], position_tolerance)
+        gap[offset] = 0.0
+        turn = np.abs(_wrap(out_hdg[a, a_end] - out_hdg[b, b_end] - np.pi))
+        for check, value, tolerance in ((f'{kind}_gap', gap, position_tolerance), (f'{kind}_heading', turn, heading_tolerance)):
+            bad = value > tolerance
+            issues += _issues(check, road_ids[a[bad]], np.full(np.count_nonzero(bad), -1), description[bad], value[bad], tolerance)
+    return issues
+
+def describe(issue:constants.ValidationIssue) -> str:
+    text = f'{issue.check}: road {issue.road_id}'
+    if issue.geometry >= 0:
+        text += f' geometry {issue.geometry}'
+    if issue.other:
+        text += f', {issue.other}'
+    if np.isfinite(issue.value):
+        text += f': {issue.value:.6g} > {issue.tolerance:g}'
+    return text
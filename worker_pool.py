@@ -0,0 +1,23 @@
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
+
+# 进程池：解析、采样与瓦片渲染共用一个进程池，在进程生命周期内保留。
+
+# kept for the life of the process: under the spawn start method (the default on macOS/Windows, and inside
+# spawned processes) each worker starts a new interpreter and imports the caller's modules, which costs more
+# than parsing a large map
+_pool:ProcessPoolExecutor = None
+_pool_workers:int = 0
+
+def shared_pool(workers:int) -> ProcessPoolExecutor:
+    # the pool with this many workers, replacing the current one when the count differs
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+        # shut the pool down when this process exits, also when it is itself a multiprocessing worker (there atexit does
+        # not run and exit joins the pool's processes); the priority runs it before the finalizers that close its queues
+        multiprocessing.util.Finalize(_pool, _pool.shutdown, exitpriority=100)
+    return _pool